@@ -6,9 +6,10 @@ Press Ctrl-C on the command line or send a signal to the process to stop the
 bot.
 """
 import os
-import logging, requests 
+import asyncio, logging, requests 
+from datetime import datetime
 from dotenv import load_dotenv
-from os import getenv, remove
+from os import getenv
 from telegram import  Update
 from telegram.ext import (
     Application,
@@ -16,18 +17,60 @@ from telegram.ext import (
     ContextTypes,
     ConversationHandler,
     MessageHandler,
+    TypeHandler,
     filters,
 )
 from requests.exceptions import ConnectionError 
-from pdf_utils import generate_vocabulary_pdf, generate_tuition_debit_note
-from utils import parse_tuition_file, format_multiple_news_articles, fetch_news
+from utils import parse_tuition_file, format_multiple_news_articles, fetch_news, lesson_total, get_translator
+from reports import generate_report
 from chat import GrokChat
+from circuit_breaker import CircuitBreaker, CircuitOpenError, breakers
+from update_processing import PerUserUpdateProcessor
+from webhook import run_webhook
+from persistence import SQLitePersistence
+from send_queue import BULK, SendQueue
+from render_queue import create_job_queue, render_locally
+from validation import validate_tuition_files, format_validation_report
+from housekeeping import UserDataLRU, sweep_temp_files, user_data_stats
+from functools import partial
 
 
 load_dotenv()
 TG_BOT_TOKEN = getenv("TG_BOT_TOKEN")
 NEWS_API_TOKEN = getenv("NEWS_API_TOKEN")
+# Articles sent by /news, and how many the news API returns per request on the current plan
+NEWS_ARTICLES = int(getenv("NEWS_ARTICLES", "10"))
+NEWS_PAGE_SIZE = int(getenv("NEWS_PAGE_SIZE", "3"))
 MASTER_ID = getenv("MASTER_ID")
+TUITION_DATA_DIR = getenv("TUITION_DATA_DIR", "tuition_data")
+# Updates handled at the same time across all users, each user's own updates stay in order
+MAX_CONCURRENT_UPDATES = int(getenv("MAX_CONCURRENT_UPDATES", "16"))
+# "polling" or "webhook"
+BOT_MODE = getenv("BOT_MODE", "polling")
+WEBHOOK_URL = getenv("WEBHOOK_URL")            # public URL Telegram posts updates to
+WEBHOOK_PATH = getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = getenv("WEBHOOK_SECRET")      # a random one is registered when unset
+WEBHOOK_HOST = getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(getenv("PORT", "8443"))
+UPDATE_QUEUE_SIZE = int(getenv("UPDATE_QUEUE_SIZE", "256"))
+# Conversations and user_data survive restarts in this SQLite file, empty to keep them in memory only
+PERSISTENCE_PATH = getenv("PERSISTENCE_PATH", "bot_state.db")
+# Conversations left unanswered this long (seconds) are ended and their uploads deleted
+CONVERSATION_TIMEOUT = float(getenv("CONVERSATION_TIMEOUT", "900"))
+# At most this many users keep user_data, the least recently active ones are dropped first
+MAX_USER_DATA = int(getenv("MAX_USER_DATA", "200"))
+TEMP_DIR = "temp_files"
+TEMP_FILE_MAX_AGE = float(getenv("TEMP_FILE_MAX_AGE", "3600"))
+SWEEP_INTERVAL = float(getenv("SWEEP_INTERVAL", "600"))
+# PDFs that take longer than this (seconds) to make are given up on
+RENDER_TIMEOUT = float(getenv("RENDER_TIMEOUT", "120"))
+# SQLite file or redis:// URL that render_queue.py workers take PDFs to make from, empty to make them here
+RENDER_QUEUE = getenv("RENDER_QUEUE", "")
+# Seconds to wait for the joke API to answer
+JOKE_TIMEOUT = float(getenv("JOKE_TIMEOUT", "5"))
+JOKE_BREAKER = CircuitBreaker("joke")
+# Point the bot at another Bot API server, e.g. a local fake one for testing
+TELEGRAM_API_URL = getenv("TELEGRAM_API_URL", "https://api.telegram.org")
 
 # Enable logging
 logging.basicConfig(
@@ -41,6 +84,10 @@ logger = logging.getLogger(__name__)
 ASKING_FOR_NAME, WAITING_FOR_LIST = range(2)
 WAITING_FOR_FILE, WAITING_FOR_NOTES = range(2)
 
+# PDFs being made in the background, by user, so /cancel can stop them
+render_tasks = {}
+render_jobs = create_job_queue(RENDER_QUEUE) if RENDER_QUEUE else None
+
 def auth(id: int) -> bool:
     return id == int(MASTER_ID)
 
@@ -66,7 +113,8 @@ async def tuition_note_start(update: Update, _: ContextTypes.DEFAULT_TYPE) -> in
 async def vocab_start(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
     if auth(update.effective_chat.id):
         await update.message.reply_text(
-            "Hi! 1) Send me the name of the student first~\n\n"
+            "Hi! 1) Send me the name of the student first~\n"
+            "For a whole class, send all the names separated by commas.\n\n"
             "Send /cancel to stop ^.^",
         )
         return ASKING_FOR_NAME 
@@ -93,12 +141,20 @@ async def receive_file(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
             return WAITING_FOR_FILE
         
         # Create a temporary directory if it doesn't exist
-        temp_dir = "temp_files"
-        os.makedirs(temp_dir, exist_ok=True)
+        os.makedirs(TEMP_DIR, exist_ok=True)
         
         # Download the file to local storage
-        local_file_path = os.path.join(temp_dir, original_filename)
+        local_file_path = os.path.join(TEMP_DIR, original_filename)
         await file.download_to_drive(local_file_path)
+        # Check the whole file first, so every problem is reported at once
+        errors = validate_tuition_files([local_file_path])
+        if errors:
+            os.remove(local_file_path)
+            await update.message.reply_text(
+                f"❌ {format_validation_report(errors, limit=20).replace(local_file_path, original_filename)}\n\n"
+                f"Please fix the file and send it again."
+            )
+            return WAITING_FOR_FILE
         # Parse the CSV file
         try:
             tuition_data, course_desc, student_name, months, month_name = parse_tuition_file(local_file_path)
@@ -110,13 +166,9 @@ async def receive_file(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
             context.user_data['months'] = months
             context.user_data['month_name'] = month_name
             context.user_data['file_path'] = local_file_path
-            context.user_data["lesson_data"] = tuition_data
             
-            # Calculate total amount
-            total_amount = sum(
-                float(lesson['amount'].replace(' HKD', '').replace(',', ''))
-                for lesson in tuition_data
-            )
+            # Calculate total amount, one list of lessons per month
+            total_amount = sum(lesson_total(lessons) for lessons in tuition_data)
             
             # Send confirmation message with summary
             summary_message = (
@@ -124,7 +176,7 @@ async def receive_file(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
                 f"📋 **Summary:**\n"
                 f"👤 Student: {student_name}\n"
                 f"📚 Course: {course_desc}\n"
-                f"📝 Total Lessons: {len(tuition_data)}\n"
+                f"📝 Total Lessons: {sum(len(lessons) for lessons in tuition_data)}\n"
                 f"💰 Total Amount: ${total_amount:,.0f} HKD\n\n"
                 f"Please send any notes you'd like to add to the invoice, or send /skip to generate without notes."
             )
@@ -166,18 +218,17 @@ async def receive_notes(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     """
     Receives notes from the user and generates the PDF invoice.
     """
+    return await generate_invoice(update, context, update.message.text)
+
+async def generate_invoice(update: Update, context: ContextTypes.DEFAULT_TYPE, notes: str) -> int:
     try:
-        # Get the notes
-        notes = update.message.text
-        
         # Retrieve stored data
         tuition_data = context.user_data.get('tuition_data')
-        course_name = context.user_data.get('course_name')
+        course_name = context.user_data.get('course_desc')
         student_name = context.user_data.get('student_name')
         months = context.user_data.get('months')
         month_name = context.user_data.get('month_name')
         file_path = context.user_data.get('file_path')
-        lesson_data = context.user_data.get("lesson_data")
         
         if not all([tuition_data, course_name, student_name, months]):
             await update.message.reply_text(
@@ -188,43 +239,20 @@ async def receive_notes(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         # Generate PDF filename
         pdf_filename = f"{student_name}_{month_name}_2025.pdf"
         
-        # Generate the PDF
-        await update.message.reply_text("⏳ Generating PDF invoice...")
-        
-        # Format lessons for PDF generation
-        
-        # Generate the PDF (using your existing function)
-        generate_tuition_debit_note(
-            filename=pdf_filename,
-            student_name=student_name,
-            months=[months],
-            lesson_data=lesson_data,
-            course_name=course_name,
-            notes=notes if notes else [""] 
-        )
-        
-        # Send the PDF file
-        with open(pdf_filename, 'rb') as pdf_file:
-            await update.message.reply_document(
-                document=pdf_file,
-                filename=pdf_filename,
-                caption=f"✅ Invoice generated for {student_name} - {month_name}"
-            )
+        # Rendered in the background, so /cancel can stop it
+        status = await update.message.reply_text("⏳ Generating PDF invoice...")
+        start_render(context, update.effective_user.id, send_debit_note(
+            update.message, status, pdf_filename, student_name, months, tuition_data, course_name,
+            [notes] if notes else [""], month_name
+        ))
         
         # Clean up temporary files
         if file_path and os.path.exists(file_path):
             os.remove(file_path)
-        if os.path.exists(pdf_filename):
-            os.remove(pdf_filename)
         
         # Clear user data
         context.user_data.clear()
         
-        await update.message.reply_text(
-            "✨ Invoice sent successfully!\n\n"
-            "Send another CSV file to generate a new invoice."
-        )
-        
         return ConversationHandler.END
         
     except Exception as e:
@@ -235,21 +263,70 @@ async def receive_notes(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         return ConversationHandler.END
 
 
+async def send_debit_note(message, status, pdf_filename, student_name, months, tuition_data, course_name, notes, month_name):
+    async def show_progress(done, total):
+        if total > 1:
+            await status.edit_text(f"⏳ Generating PDF invoice... page {done}/{total}")
+
+    try:
+        pdf = await render("debit_note", {
+            "student_name": student_name, "months": months, "lesson_data": tuition_data,
+            "course_name": course_name, "notes": notes,
+        }, progress=show_progress)
+        await message.reply_document(
+            document=pdf,
+            filename=pdf_filename,
+            caption=f"✅ Invoice generated for {student_name} - {month_name}"
+        )
+        await message.reply_text(
+            "✨ Invoice sent successfully!\n\n"
+            "Send another CSV file to generate a new invoice."
+        )
+    except asyncio.TimeoutError:
+        await message.reply_text("❌ Generating the PDF took too long, please try again later.")
+    except Exception as e:
+        logger.error(e, exc_info=True)
+        await message.reply_text(
+            f"❌ Error generating PDF: {str(e)}\n\n"
+            f"Please try again or contact support."
+        )
+
+async def render(kind: str, payload: dict, progress=None) -> bytes:
+    """Make a PDF in a render worker when RENDER_QUEUE is set, in this process otherwise. Progress is only reported here."""
+    if render_jobs is not None:
+        return await render_jobs.run(kind, payload, timeout=RENDER_TIMEOUT)
+    return await render_locally(kind, payload, progress=progress, timeout=RENDER_TIMEOUT)
+
+def start_render(context: ContextTypes.DEFAULT_TYPE, user_id: int, coroutine):
+    """
+    Run a render and its reply as a task of its own. The handler returns straight away,
+    which lets the user's next update, like /cancel, be handled while it runs.
+    """
+    previous = render_tasks.get(user_id)
+    if previous is not None:
+        previous.cancel()
+    task = context.application.create_task(coroutine)
+    render_tasks[user_id] = task
+    task.add_done_callback(lambda _: render_tasks.pop(user_id, None) if render_tasks.get(user_id) is task else None)
+
 async def skip_notes(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """
     Skip notes and generate PDF without them.
     """
-    # Just set empty notes and call receive_notes
-    update.message.text = ""
-    return await receive_notes(update, context)
+    return await generate_invoice(update, context, "")
 
 
 async def receive_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     text = update.message.text.strip()
-    context.user_data["student_name"] = text
+    student_names = [name.strip() for name in text.replace("，", ",").split(",") if name.strip()]
+    if not student_names:
+        await update.message.reply_text("❌ Please send the student's name, or several separated by commas.")
+        return ASKING_FOR_NAME
+    context.user_data["student_name"] = student_names[0]
+    context.user_data["student_names"] = student_names
 
     await update.message.reply_text(
-        f"Got it! This note is for {text} n.n \n\n" 
+        f"Got it! This note is for {', '.join(student_names)} n.n \n\n" 
         "Now send me the vocabulary list in this exact format:\n\n"
         "`word1,pos,(customised meaning [optional]);word2,pos,(customised meaning [optional]);word3,pos,(customised meaning [optional])`\n\n"
         "Example:\n"
@@ -283,64 +360,195 @@ async def receive_list(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
         )
         return WAITING_FOR_LIST
 
+    student_names = context.user_data.get("student_names", [])
+    if len(student_names) > 1:
+        start_render(context, update.effective_user.id, send_class_vocabulary(update, vocab_data, student_names))
+    else:
+        start_render(context, update.effective_user.id, send_vocabulary(update, vocab_data, context.user_data["student_name"]))
+    return ConversationHandler.END
+
+async def send_vocabulary(update: Update, vocab_data, student_name):
     # ---- Generate the PDF (reuse YOUR existing function) ----
-    output_filename = f"review_notes_{context.user_data['student_name']}.pdf"
+    output_filename = f"review_notes_{student_name}.pdf"
     try:
-        await generate_vocabulary_pdf(output_filename, vocab_data)
+        pdf = await render("vocabulary", {"vocab_data": vocab_data})
         # ---- Send the PDF back to the user ----
-        with open(output_filename, "rb") as pdf_file:
-            await update.message.reply_document(
-                document=pdf_file,
-                filename=f"{output_filename}",
-                caption="Here’s your vocabulary review notes!",
-            )
+        await update.message.reply_document(
+            document=pdf,
+            filename=f"{output_filename}",
+            caption="Here’s your vocabulary review notes!",
+        )
         await update.message.reply_text("Done! Send /vocab again anytime.")
     except Exception as e:
         logger.error(e, exc_info=True)
         await update.message.reply_text("Something went wrong while creating the PDF >.< \n\n Try /vocab again later")
-    finally:
-        remove(output_filename)
-        return ConversationHandler.END
 
 
-async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    file_path = context.user_data.get('file_path')
-    
-    # Clean up temporary file if exists
+async def send_class_vocabulary(update: Update, vocab_data, student_names):
+    """Translate the list once and send every student's copy in one zip."""
+    output_filename = f"review_notes_{datetime.now():%Y%m%d_%H%M%S}.zip"
+    try:
+        await update.message.reply_text(f"Making the notes for {len(student_names)} students, wait a moment~")
+        zip_file = await render("class_vocabulary", {"vocab_data": vocab_data, "student_names": student_names})
+        await update.message.reply_document(
+            document=zip_file,
+            filename=output_filename,
+            caption=f"Here are the vocabulary review notes for {', '.join(student_names)}!",
+        )
+        await update.message.reply_text("Done! Send /vocab again anytime.")
+    except Exception as e:
+        logger.error(e, exc_info=True)
+        await update.message.reply_text("Something went wrong while creating the PDFs >.< \n\n Try /vocab again later")
+
+def cleanup_user_data(user_data: dict):
+    """Delete the user's uploaded file, if any, and forget everything stored for them."""
+    file_path = user_data.get('file_path')
     if file_path and os.path.exists(file_path):
         os.remove(file_path)
-    
-    context.user_data.clear()
+    user_data.clear()
+
+async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    task = render_tasks.pop(update.effective_user.id, None)
+    if task is not None:
+        task.cancel()
+    cleanup_user_data(context.user_data)
     await update.message.reply_text("Cancelled.")
     return ConversationHandler.END
 
+async def conversation_timeout(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    cleanup_user_data(context.user_data)
+    if update and update.effective_chat:
+        await context.bot.send_message(
+            update.effective_chat.id, "⌛ I stopped waiting, that took too long. Start again whenever you're ready~",
+            rate_limit_args=BULK,
+        )
+    return ConversationHandler.END
+
+async def track_user(user_lru: UserDataLRU, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Runs before every other handler, drops the user_data of the least recently active users past the cap."""
+    if update.effective_user is None:
+        return
+    user_lru.touch(update.effective_user.id)
+    for user_id in user_lru.to_evict(context.application.user_data):
+        cleanup_user_data(context.application.user_data.get(user_id, {}))
+        context.application.drop_user_data(user_id)
+        logger.info("Dropped user_data of inactive user %s", user_id)
+
+async def sweep_temp_files_job(context: ContextTypes.DEFAULT_TYPE):
+    """Delete uploads no conversation refers to any more and log how much user_data is held."""
+    user_data = context.application.user_data
+    in_use = [data.get('file_path') for data in user_data.values()]
+    removed = await asyncio.to_thread(sweep_temp_files, TEMP_DIR, TEMP_FILE_MAX_AGE, in_use)
+    stats = user_data_stats(user_data)
+    logger.info(
+        "Housekeeping: removed %d temp file(s), user_data for %d user(s), %d entries, ~%d bytes",
+        len(removed), stats["users"], stats["entries"], stats["bytes"]
+    )
+
+def send_queue_stats(send_queue: SendQueue) -> str:
+    if send_queue is None:
+        return ""
+    metrics = send_queue.metrics()
+    lines = [f"\n📤 Sent: {metrics['sent']}, flood control retries: {metrics['retries']}"]
+    for name, lane in metrics["lanes"].items():
+        lines.append(
+            f"  {name}: {lane['queued']} queued, waited p50 {lane['wait_p50']:.2f}s, "
+            f"p95 {lane['wait_p95']:.2f}s, max {lane['wait_max']:.2f}s"
+        )
+    return "\n".join(lines)
+
+def translator_stats() -> str:
+    metrics = get_translator().metrics()
+    lines = [f"\n🈯 Translations: {metrics['requests']}, hedged {metrics['hedges']}, won by the hedge {metrics['hedge_wins']}"]
+    for name, provider in metrics["providers"].items():
+        lines.append(
+            f"  {name}: health {provider['health']:.2f}, {provider['answered']} answered, {provider['failed']} failed, "
+            f"p50 {provider['p50']:.2f}s, p90 {provider['p90']:.2f}s"
+        )
+    return "\n".join(lines)
+
+def render_queue_stats() -> str:
+    if render_jobs is None:
+        return ""
+    counts = ", ".join(f"{count} {status}" for status, count in sorted(render_jobs.counts().items())) or "empty"
+    return f"\n🖨 Render queue: {counts}"
+
+def breaker_stats() -> str:
+    lines = ["\n🔌 Circuits:"]
+    for name, breaker in sorted(breakers.items()):
+        metrics = breaker.metrics()
+        line = (f"  {name}: {metrics['state']}, {metrics['failures']} of {metrics['calls']} calls failed, "
+                f"{metrics['rejected']} rejected, opened {metrics['times_opened']} time(s)")
+        if metrics["state"] != "closed" and metrics["last_error"]:
+            line += f" ({metrics['last_error']})"
+        lines.append(line)
+    return "\n".join(lines)
+
+async def send_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    if not auth(update.effective_chat.id):
+        await update.message.reply_text("Nothing to see here!")
+        return ConversationHandler.END
+    stats = user_data_stats(context.application.user_data)
+    temp_files = len(os.listdir(TEMP_DIR)) if os.path.isdir(TEMP_DIR) else 0
+    await update.message.reply_text(
+        f"📊 user_data: {stats['users']} user(s), {stats['users_with_data']} with data, "
+        f"{stats['entries']} entries, ~{stats['bytes'] / 1024:.1f} KB\n"
+        f"🗂 Temp files: {temp_files}"
+        f"{send_queue_stats(context.bot.rate_limiter)}"
+        f"{translator_stats()}"
+        f"{breaker_stats()}"
+        f"{render_queue_stats()}"
+    )
+    return ConversationHandler.END
+
+def _get_joke() -> dict:
+    response = requests.get("http://www.official-joke-api.appspot.com/random_joke", timeout=(3.05, JOKE_TIMEOUT))
+    response.raise_for_status()
+    return response.json()
+
 async def random_joke(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
-    joke = requests.get("http://www.official-joke-api.appspot.com/random_joke").json()
-    await update.message.reply_text(f"Let me tell you something random hehe...\n\n{joke['setup']}\n{joke['punchline']}\n\nHave a nice day!")
+    try:
+        # Blocking requests run in a thread so other users' updates keep being processed
+        joke = await asyncio.to_thread(JOKE_BREAKER.call, _get_joke)
+        text = f"Let me tell you something random hehe...\n\n{joke['setup']}\n{joke['punchline']}\n\nHave a nice day!"
+    except CircuitOpenError as e:
+        await update.message.reply_text(f"Molly ran out of jokes for now, ask again in {e.retry_in:.0f}s hehe")
+        return ConversationHandler.END
+    except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+        logger.warning("Could not get a joke: %s", e)
+        await update.message.reply_text("The joke machine is broken >.< Try /random again later")
+        return ConversationHandler.END
+    await update.message.reply_text(text)
     return ConversationHandler.END
 
-async def send_news(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+async def send_news(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     try:
         if not auth(update.effective_chat.id):
             await update.message.reply_text("Why don't you search the news yourself!")
             return ConversationHandler.END
 
-        articles = fetch_news(NEWS_API_TOKEN)
+        articles = await asyncio.to_thread(fetch_news, NEWS_API_TOKEN, NEWS_ARTICLES, NEWS_PAGE_SIZE)
         if not articles:
             await update.message.reply_text("📰 No news articles found at the moment.")
             return ConversationHandler.END
 
         await update.message.reply_text("Okay, fetching news now! Please wait...")
-        formatted_messages = format_multiple_news_articles(articles, max_articles=3)
+        formatted_messages = format_multiple_news_articles(articles, max_articles=NEWS_ARTICLES)
         
         for message in formatted_messages:
-            await update.message.reply_text(
+            await context.bot.send_message(
+                update.effective_chat.id,
                 message,
                 parse_mode="Markdown",
-                disable_web_page_preview=False  # Set to True to hide link previews
+                disable_web_page_preview=False,  # Set to True to hide link previews
+                rate_limit_args=BULK,
             )
 
         return ConversationHandler.END
+    except CircuitOpenError as e:
+        await update.message.reply_text(
+            f"📰 The news service is down at the moment, Molly will check again in {e.retry_in:.0f}s. Please try again later T.T"
+        )
     except TimeoutError as e:
         print(e)
         await update.message.reply_text(
@@ -364,6 +572,33 @@ async def send_news(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
     finally:
         return ConversationHandler.END
 
+async def send_report(update: Update, _: ContextTypes.DEFAULT_TYPE) -> int:
+    if not auth(update.effective_chat.id):
+        await update.message.reply_text("Molly doesn't share the books with strangers!")
+        return ConversationHandler.END
+
+    await update.message.reply_text("📊 Crunching the numbers...")
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    report_files = []
+    try:
+        # Loading every CSV is blocking work, keep it off the event loop
+        report_files = await asyncio.to_thread(
+            generate_report, TUITION_DATA_DIR, TEMP_DIR, f"RevenueReport_{datetime.now():%Y%m%d}"
+        )
+        for path in report_files:
+            with open(path, "rb") as report_file:
+                await update.message.reply_document(document=report_file, filename=os.path.basename(path))
+    except FileNotFoundError as e:
+        await update.message.reply_text(f"❌ {e}")
+    except Exception as e:
+        logger.error(e, exc_info=True)
+        await update.message.reply_text("Something went wrong while building the report >.<")
+    finally:
+        for path in report_files:
+            if os.path.exists(path):
+                os.remove(path)
+    return ConversationHandler.END
+
 async def send_chat(update: Update, _:ContextTypes.DEFAULT_TYPE) -> int:
     try:
         if not auth(update.effective_chat.id):
@@ -371,25 +606,45 @@ async def send_chat(update: Update, _:ContextTypes.DEFAULT_TYPE) -> int:
             return ConversationHandler.END
         else:
             agent = GrokChat()
-            response = agent.send_message(update.message.text)
+            response = await asyncio.to_thread(agent.send_message, update.message.text)
             await update.message.reply_text(response, parse_mode="Markdown")
             return ConversationHandler.END
+    except CircuitOpenError as e:
+        await update.message.reply_text(f"Molly's brain is offline right now, ask again in {e.retry_in:.0f}s!")
     except Exception as e:
        logger.exception(f"Error in chat handler: {e}")
     finally:
         return ConversationHandler.END
 
 
-def main() -> None:
-    app = Application.builder().token(TG_BOT_TOKEN).build()
+def build_application(token: str = None, api_url: str = None, persistence_path: str = None) -> Application:
+    api_url = (api_url or TELEGRAM_API_URL).rstrip("/")
+    builder = (
+        Application.builder()
+        .token(token or TG_BOT_TOKEN)
+        .base_url(f"{api_url}/bot")
+        .base_file_url(f"{api_url}/file/bot")
+        .update_queue(asyncio.Queue(maxsize=UPDATE_QUEUE_SIZE))
+        .concurrent_updates(PerUserUpdateProcessor(MAX_CONCURRENT_UPDATES))
+        .rate_limiter(SendQueue())
+    )
+    if persistence_path is None:
+        persistence_path = PERSISTENCE_PATH
+    if persistence_path:
+        builder = builder.persistence(SQLitePersistence(persistence_path))
+    app = builder.build()
 
     vocab_conv_handler = ConversationHandler(
         entry_points=[CommandHandler("vocab", vocab_start)],
         states={
             ASKING_FOR_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_name)],
             WAITING_FOR_LIST: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_list)],
+            ConversationHandler.TIMEOUT: [TypeHandler(Update, conversation_timeout)],
         },
         fallbacks=[CommandHandler("cancel", cancel)],
+        name="vocab",
+        conversation_timeout=CONVERSATION_TIMEOUT,
+        persistent=bool(persistence_path),
     )
 
     tuition_conv_handler = ConversationHandler(
@@ -397,21 +652,41 @@ def main() -> None:
         states={
             WAITING_FOR_FILE: [MessageHandler(filters.Document.FileExtension("csv") & ~filters.COMMAND, receive_file)],
             WAITING_FOR_NOTES: [MessageHandler(filters.TEXT, receive_notes), CommandHandler("skip", skip_notes)],
+            ConversationHandler.TIMEOUT: [TypeHandler(Update, conversation_timeout)],
         },
         fallbacks=[CommandHandler("cancel", cancel)],
+        name="tuition",
+        conversation_timeout=CONVERSATION_TIMEOUT,
+        persistent=bool(persistence_path),
     )
 
+    app.add_handler(TypeHandler(Update, partial(track_user, UserDataLRU(MAX_USER_DATA))), group=-1)
     app.add_handler(vocab_conv_handler)
     app.add_handler(tuition_conv_handler)
 
     app.add_handler(CommandHandler("start", start_handler))
     app.add_handler(CommandHandler("random", random_joke))
     app.add_handler(CommandHandler("news", send_news))
+    app.add_handler(CommandHandler("report", send_report))
+    # Outside a conversation /cancel still stops a PDF being made
+    app.add_handler(CommandHandler("cancel", cancel))
+    app.add_handler(CommandHandler("stats", send_stats))
+    app.job_queue.run_repeating(sweep_temp_files_job, interval=SWEEP_INTERVAL, first=SWEEP_INTERVAL)
     
     app.add_handler(MessageHandler(filters.TEXT, send_chat))
+    return app
+
 
-    print("Bot is running…")
-    app.run_polling(allowed_updates=Update.ALL_TYPES)
+def main() -> None:
+    app = build_application()
+    if BOT_MODE == "webhook":
+        if not (WEBHOOK_SECRET or WEBHOOK_URL):
+            raise SystemExit("Set WEBHOOK_SECRET to the secret token the webhook was registered with, or WEBHOOK_URL")
+        print(f"Bot is running with a webhook on port {WEBHOOK_PORT}…")
+        asyncio.run(run_webhook(app, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_URL, WEBHOOK_SECRET))
+    else:
+        print("Bot is running…")
+        app.run_polling(allowed_updates=Update.ALL_TYPES)
 
 
 if __name__ == "__main__":
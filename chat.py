@@ -3,9 +3,14 @@ from dotenv import load_dotenv
 from xai_sdk import Client
 from xai_sdk.chat import user, system 
 from xai_sdk.tools import web_search 
+from circuit_breaker import CircuitBreaker
 
 
 load_dotenv()
+# Seconds one answer may take, searching the web included
+GROK_TIMEOUT = float(os.getenv("GROK_TIMEOUT", "120"))
+# Shared by every GrokChat, so once xAI keeps failing new chats fail at once too
+GROK_BREAKER = CircuitBreaker("chat")
 
 class GrokChat:
     def __init__(self):
@@ -15,7 +20,7 @@ class GrokChat:
       
       self.client = Client(
           api_key=GROK_KEY,
-          timeout=3600, # Override default timeout with longer timeout for reasoning models
+          timeout=GROK_TIMEOUT, # Long enough for reasoning with web search, short enough not to pile users up
       )
       self.conversation = self.client.chat.create(model="grok-4-1-fast",  
             tools=[
@@ -29,5 +34,10 @@ class GrokChat:
 
     def send_message(self, message):
       self.conversation.append(user(message))
-      response = self.conversation.sample()
+      try:
+        response = GROK_BREAKER.call(self.conversation.sample)
+      except BaseException:
+        # Unanswered, so it doesn't stay in the conversation the next message is sent with
+        del self.conversation.messages[-1]
+        raise
       return response.content
\ No newline at end of file
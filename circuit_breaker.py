@@ -0,0 +1,136 @@
+import logging, threading, time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# Every breaker by name, for /stats
+breakers = {}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose breaker is open."""
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} is unavailable, trying again in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+class CircuitBreaker:
+    """
+    Stops calling a backend after failure_threshold failures in a row, so requests fail
+    at once instead of each waiting for the backend's timeout.
+
+    After reset_timeout seconds one call is let through as a probe (half-open): if it
+    works the breaker closes again, if not it stays open for another reset_timeout.
+    Exceptions in `ignore` mean the backend answered, e.g. a word a dictionary doesn't
+    know, and don't count as failures. Thread-safe, for backends called with to_thread.
+    """
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0, ignore: tuple = ()):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.ignore = ignore
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self.consecutive_failures = 0
+        # Metrics
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.times_opened = 0
+        self.last_error = None
+        breakers[name] = self
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def _before_call(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._state == OPEN:
+                retry_in = self._opened_at + self.reset_timeout - now
+                if retry_in > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, retry_in)
+                self._state = HALF_OPEN
+                logger.info("Circuit %s half-open, probing", self.name)
+            if self._state == HALF_OPEN:
+                if self._probing:
+                    # Only one probe at a time, everyone else keeps failing fast
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.reset_timeout)
+                self._probing = True
+            self.calls += 1
+
+    def _on_success(self):
+        with self._lock:
+            self._probing = False
+            self.consecutive_failures = 0
+            if self._state != CLOSED:
+                self._state = CLOSED
+                logger.info("Circuit %s closed, %s is back", self.name, self.name)
+
+    def _on_failure(self, error: BaseException):
+        with self._lock:
+            self._probing = False
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+            if self._state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.times_opened += 1
+                    logger.warning(
+                        "Circuit %s opened after %d failure(s) in a row, failing fast for %.0fs. Last error: %s",
+                        self.name, self.consecutive_failures, self.reset_timeout, self.last_error
+                    )
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def _on_cancel(self):
+        # Neither an answer nor a failure, e.g. the losing side of a hedged request
+        with self._lock:
+            self._probing = False
+
+    def call(self, func, *args, **kwargs):
+        self._before_call()
+        try:
+            result = func(*args, **kwargs)
+        except self.ignore:
+            self._on_success()
+            raise
+        except Exception as e:
+            self._on_failure(e)
+            raise
+        except BaseException:
+            self._on_cancel()
+            raise
+        self._on_success()
+        return result
+
+    async def call_async(self, func, *args, **kwargs):
+        self._before_call()
+        try:
+            result = await func(*args, **kwargs)
+        except self.ignore:
+            self._on_success()
+            raise
+        except Exception as e:
+            self._on_failure(e)
+            raise
+        except BaseException:
+            self._on_cancel()
+            raise
+        self._on_success()
+        return result
+
+    def metrics(self) -> dict:
+        return {"state": self.state, "calls": self.calls, "failures": self.failures, "rejected": self.rejected,
+                "consecutive_failures": self.consecutive_failures, "times_opened": self.times_opened,
+                "last_error": self.last_error}
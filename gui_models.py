@@ -0,0 +1,117 @@
+import os
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+
+
+class TuitionFileModel(QAbstractListModel):
+    """
+    The uploaded CSV files and their scanned metadata.
+
+    Rows are only inserted, removed or marked as changed, so views never rebuild
+    their items, and sorting and filtering are left to a QSortFilterProxyModel.
+    """
+    PATH_ROLE = Qt.UserRole
+    NAME_ROLE = Qt.UserRole + 1
+    STUDENT_ROLE = Qt.UserRole + 2
+    COURSE_ROLE = Qt.UserRole + 3
+    MONTH_ROLE = Qt.UserRole + 4
+    SIZE_ROLE = Qt.UserRole + 5
+    ROWS_ROLE = Qt.UserRole + 6
+
+    # Metadata key returned for each sort role, and its value before the file is scanned
+    _METADATA_ROLES = {
+        STUDENT_ROLE: ("student", ""),
+        COURSE_ROLE: ("course", ""),
+        MONTH_ROLE: ("month", 0),
+        SIZE_ROLE: ("size", 0),
+        ROWS_ROLE: ("rows", 0),
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._files = []
+        self._rows = {}      # path -> row
+        self._metadata = {}  # path -> {"size", "student", "course", "month", "rows"}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._files)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._files):
+            return None
+        path = self._files[index.row()]
+        if role == Qt.DisplayRole:
+            return f"  📄 {os.path.basename(path)}"
+        if role == Qt.ToolTipRole:
+            return self.describe(path)
+        if role == self.PATH_ROLE:
+            return path
+        if role == self.NAME_ROLE:
+            return os.path.basename(path).lower()
+        if role in self._METADATA_ROLES:
+            key, default = self._METADATA_ROLES[role]
+            return self._metadata.get(path, {}).get(key, default)
+        return None
+
+    def files(self) -> list[str]:
+        return list(self._files)
+
+    def __contains__(self, path):
+        return path in self._rows
+
+    def add_files(self, paths):
+        paths = [path for path in dict.fromkeys(paths) if path not in self._rows]
+        if not paths:
+            return
+        first = len(self._files)
+        self.beginInsertRows(QModelIndex(), first, first + len(paths) - 1)
+        for path in paths:
+            self._rows[path] = len(self._files)
+            self._files.append(path)
+        self.endInsertRows()
+
+    def remove_files(self, paths):
+        rows = sorted((self._rows[path] for path in set(paths) if path in self._rows), reverse=True)
+        if not rows:
+            return
+        if len(rows) == 1:
+            self.beginRemoveRows(QModelIndex(), rows[0], rows[0])
+            self._remove_rows(rows)
+            self.endRemoveRows()
+        else:
+            # Bulk removal, one reset is cheaper than a signal per row
+            self.beginResetModel()
+            self._remove_rows(rows)
+            self.endResetModel()
+
+    def _remove_rows(self, rows):
+        for row in rows:
+            path = self._files.pop(row)
+            self._metadata.pop(path, None)
+        self._rows = {path: row for row, path in enumerate(self._files)}
+
+    def clear(self):
+        self.beginResetModel()
+        self._files.clear()
+        self._rows.clear()
+        self._metadata.clear()
+        self.endResetModel()
+
+    def set_metadata(self, path, metadata: dict):
+        row = self._rows.get(path)
+        if row is None:
+            return
+        self._metadata[path] = metadata
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def metadata(self, path):
+        return self._metadata.get(path)
+
+    def describe(self, path) -> str:
+        metadata = self._metadata.get(path)
+        if metadata is None:
+            return f"Scanning... | Path: {path}"
+        return (
+            f"Size: {metadata['size'] / 1024:.1f} KB | Student: {metadata['student']} | "
+            f"Course: {metadata['course']} | Month: {metadata['month']} | Rows: {metadata['rows']} | Path: {path}"
+        )
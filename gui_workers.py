@@ -0,0 +1,82 @@
+import threading
+import traceback
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class BatchSignals(QObject):
+    """Signals emitted by a TaskBatch. They are delivered on the UI thread."""
+    progress = pyqtSignal(int, int)       # completed tasks, total tasks
+    result = pyqtSignal(object, object)   # task key, return value
+    error = pyqtSignal(object, str)       # task key, error message
+    finished = pyqtSignal(bool)           # True if the batch was cancelled
+
+
+class _Task(QRunnable):
+    def __init__(self, batch, key, fn, args, kwargs):
+        super().__init__()
+        # The batch keeps a reference to every task, so Qt must not delete them
+        self.setAutoDelete(False)
+        self.batch = batch
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        try:
+            if self.batch.is_cancelled():
+                return
+            value = self.fn(*self.args, **self.kwargs)
+            if not self.batch.is_cancelled():
+                self.batch.signals.result.emit(self.key, value)
+        except Exception as e:
+            traceback.print_exc()
+            self.batch.signals.error.emit(self.key, str(e))
+        finally:
+            self.batch._task_done()
+
+
+class TaskBatch:
+    """
+    A group of functions run on a QThreadPool.
+
+    Every task reports its own result or error, the batch reports overall progress,
+    and `finished` is emitted once when all tasks have run or been skipped.
+    Cancelling skips the tasks that have not started yet; long running functions
+    can also poll `cancel_event` to stop early.
+    """
+    def __init__(self, pool: QThreadPool = None):
+        self.pool = pool or QThreadPool.globalInstance()
+        self.signals = BatchSignals()
+        self.cancel_event = threading.Event()
+        self._tasks = []
+        self._completed = 0
+        self._lock = threading.Lock()
+
+    def add(self, key, fn, *args, **kwargs):
+        self._tasks.append(_Task(self, key, fn, args, kwargs))
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def start(self):
+        if not self._tasks:
+            self.signals.finished.emit(False)
+            return
+        for task in self._tasks:
+            self.pool.start(task)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def _task_done(self):
+        with self._lock:
+            self._completed += 1
+            completed = self._completed
+        total = len(self._tasks)
+        self.signals.progress.emit(completed, total)
+        if completed == total:
+            self.signals.finished.emit(self.is_cancelled())
@@ -0,0 +1,63 @@
+import os, sys, time
+
+def estimate_size(obj, _seen=None) -> int:
+    """Rough number of bytes an object takes, including everything it contains."""
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(key, seen) + estimate_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, seen) for item in obj)
+    return size
+
+def user_data_stats(user_data) -> dict:
+    """How many users have data held, how many keys they hold and roughly how many bytes."""
+    return {
+        "users": len(user_data),
+        "users_with_data": sum(1 for data in user_data.values() if data),
+        "entries": sum(len(data) for data in user_data.values()),
+        "bytes": sum(estimate_size(data) for data in user_data.values()),
+    }
+
+class UserDataLRU:
+    """
+    Tracks when each user was last active so the least recently active users' data can
+    be dropped once more than max_users have data held.
+    """
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._last_seen = {}   # user_id -> monotonic time
+
+    def touch(self, user_id: int):
+        self._last_seen[user_id] = time.monotonic()
+
+    def to_evict(self, user_ids) -> list[int]:
+        """The users to drop so at most max_users remain. Users never seen, e.g. restored after a restart, go first."""
+        user_ids = list(user_ids)
+        excess = len(user_ids) - self.max_users
+        if excess <= 0:
+            return []
+        evicted = sorted(user_ids, key=lambda user_id: self._last_seen.get(user_id, float("-inf")))[:excess]
+        for user_id in evicted:
+            self._last_seen.pop(user_id, None)
+        return evicted
+
+def sweep_temp_files(directory: str, max_age: float, keep=()) -> list[str]:
+    """Delete files in directory older than max_age seconds, except the paths in keep. Returns what was deleted."""
+    if not os.path.isdir(directory):
+        return []
+    keep = {os.path.abspath(path) for path in keep if path}
+    cutoff = time.time() - max_age
+    removed = []
+    for entry in os.scandir(directory):
+        path = os.path.abspath(entry.path)
+        if entry.is_file() and path not in keep and entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(path)
+                removed.append(path)
+            except FileNotFoundError:
+                pass
+    return removed
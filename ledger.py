@@ -0,0 +1,232 @@
+import calendar, csv, json, os, sqlite3, threading
+from utils import TUITION_SCHEMA, find_tuition_files, infer_tuition_year, parse_tuition_filename
+
+LEDGER_PATH = "tuition_ledger.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS source_files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    student_name TEXT NOT NULL,
+    course_code TEXT NOT NULL,
+    year_month INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lessons (
+    id INTEGER PRIMARY KEY,
+    source_path TEXT NOT NULL REFERENCES source_files(path) ON DELETE CASCADE,
+    line INTEGER NOT NULL,
+    student_name TEXT NOT NULL,
+    course_code TEXT NOT NULL,
+    year_month INTEGER NOT NULL,
+    payment TEXT,
+    status TEXT,
+    amount INTEGER,
+    is_makeup INTEGER NOT NULL,
+    row_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lessons_student ON lessons(student_name, course_code, year_month);
+CREATE INDEX IF NOT EXISTS idx_lessons_course ON lessons(course_code, year_month);
+CREATE INDEX IF NOT EXISTS idx_lessons_year_month ON lessons(year_month);
+CREATE INDEX IF NOT EXISTS idx_lessons_payment ON lessons(payment, student_name);
+CREATE INDEX IF NOT EXISTS idx_lessons_source ON lessons(source_path);
+"""
+
+def to_year_month(value) -> int | None:
+    """Convert '2025-11', (2025, 11) or 202511 to the 202511 form used by the ledger."""
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, tuple):
+        year, month = value
+    else:
+        year, month = value.split("-")
+    return int(year) * 100 + int(month)
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+class TuitionLedger:
+    """
+    SQLite store of every lesson in the tuition CSVs, indexed by student, course,
+    year-month and payment status.
+
+    Files are imported incrementally: a file is only re-read when its mtime or size
+    changed since the last import. Lessons keep their original CSV row, so queries
+    return exactly what parse_tuition_file would.
+    """
+    def __init__(self, path: str = LEDGER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def import_files(self, files: list[str]) -> tuple[int, int]:
+        """Import new or changed files. Returns (imported, unchanged) file counts."""
+        imported = unchanged = 0
+        with self._lock, self.conn:
+            known = dict(((path, (mtime_ns, size)) for path, mtime_ns, size
+                          in self.conn.execute("SELECT path, mtime_ns, size FROM source_files")))
+            for file in files:
+                path = os.path.abspath(file)
+                stat = os.stat(path)
+                if known.get(path) == (stat.st_mtime_ns, stat.st_size):
+                    unchanged += 1
+                    continue
+                self._import_file(path, stat)
+                imported += 1
+        return imported, unchanged
+
+    def import_directory(self, directory: str = "tuition_data") -> tuple[int, int, int]:
+        """Bring the ledger in line with a folder. Returns (imported, unchanged, removed) file counts."""
+        files = [os.path.abspath(file) for file in find_tuition_files([directory])]
+        imported, unchanged = self.import_files(files)
+        prefix = os.path.join(os.path.abspath(directory), "")
+        present = set(files)
+        with self._lock, self.conn:
+            stored = [path for (path,) in self.conn.execute("SELECT path FROM source_files")]
+            removed = [path for path in stored if path.startswith(prefix) and path not in present]
+            self.conn.executemany("DELETE FROM source_files WHERE path = ?", [(path,) for path in removed])
+        return imported, unchanged, len(removed)
+
+    def _import_file(self, path, stat):
+        course_code, student_name, month = parse_tuition_filename(path)
+        with open(path, "r") as f:
+            reader = csv.DictReader(f)
+            rows = [(reader.line_num, row) for row in reader]
+        year_month = infer_tuition_year(path, month, [row for _, row in rows]) * 100 + month
+
+        # Replacing the source row cascades to its old lessons
+        self.conn.execute("DELETE FROM source_files WHERE path = ?", (path,))
+        self.conn.execute(
+            "INSERT INTO source_files (path, mtime_ns, size, student_name, course_code, year_month) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, stat.st_mtime_ns, stat.st_size, student_name, course_code, year_month)
+        )
+        self.conn.executemany(
+            "INSERT INTO lessons (source_path, line, student_name, course_code, year_month, payment, status, amount, is_makeup, row_json) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (path, line, student_name, course_code, year_month, row.get("payment"), row.get("status"),
+                 _to_int(row.get("amount")), row.get("makeup") is not None, json.dumps(row, ensure_ascii=False))
+                for line, row in rows
+            ]
+        )
+
+    def students(self) -> list[tuple[str, str]]:
+        """Every (student_name, course_code) in the ledger."""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT DISTINCT student_name, course_code FROM lessons ORDER BY student_name, course_code"
+            ).fetchall()
+
+    def query_lessons(self, student_name: str, course_code: str = None, start=None, end=None):
+        """
+        Lessons of one student between two year-months (inclusive), e.g. start="2025-01", end="2025-12".
+
+        Returns the same (lesson_data, course_desc, student_name, months, month_name) tuple as
+        parse_tuition_file, with months ordered by real year-month, most recent first.
+        Pass course_code when the student takes more than one course.
+        """
+        query = "SELECT course_code, year_month, row_json FROM lessons WHERE student_name = ?"
+        params = [student_name]
+        if course_code:
+            query += " AND course_code = ?"
+            params.append(course_code)
+        if start is not None:
+            query += " AND year_month >= ?"
+            params.append(to_year_month(start))
+        if end is not None:
+            query += " AND year_month <= ?"
+            params.append(to_year_month(end))
+        query += " ORDER BY year_month DESC, source_path, line"
+
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        if not rows:
+            raise ValueError(f"No lessons found for {student_name}")
+
+        lesson_data, year_months = [], []
+        for code, year_month, row_json in rows:
+            if not year_months or year_months[-1] != year_month:
+                year_months.append(year_month)
+                lesson_data.append([])
+            row = json.loads(row_json)
+            lesson_data[-1].append({key: TUITION_SCHEMA.get(val, val) for (key, val) in row.items()})
+
+        months = [year_month % 100 for year_month in year_months]
+        return lesson_data, TUITION_SCHEMA[code], student_name, months, calendar.month_abbr[months[0]]
+
+    def statement_months(self, student_name: str, start=None, end=None) -> list[tuple[int, str, list]]:
+        """
+        A student's lessons in every course between two year-months (inclusive), for a
+        statement: one (year_month, course_desc, lessons) tuple per month and course,
+        ordered by real year-month, oldest first.
+        """
+        query = "SELECT course_code, year_month, row_json FROM lessons WHERE student_name = ?"
+        params = [student_name]
+        if start is not None:
+            query += " AND year_month >= ?"
+            params.append(to_year_month(start))
+        if end is not None:
+            query += " AND year_month <= ?"
+            params.append(to_year_month(end))
+        query += " ORDER BY year_month, course_code, source_path, line"
+
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        months = []
+        for code, year_month, row_json in rows:
+            if not months or months[-1][0] != year_month or months[-1][1] != TUITION_SCHEMA[code]:
+                months.append((year_month, TUITION_SCHEMA[code], []))
+            row = json.loads(row_json)
+            months[-1][2].append({key: TUITION_SCHEMA.get(val, val) for (key, val) in row.items()})
+        return months
+
+    def query_year_months(self, student_name: str, course_code: str = None, start=None, end=None) -> list[int]:
+        """The year-months (e.g. 202511) a student has lessons in, most recent first."""
+        query = "SELECT DISTINCT year_month FROM lessons WHERE student_name = ?"
+        params = [student_name]
+        if course_code:
+            query += " AND course_code = ?"
+            params.append(course_code)
+        if start is not None:
+            query += " AND year_month >= ?"
+            params.append(to_year_month(start))
+        if end is not None:
+            query += " AND year_month <= ?"
+            params.append(to_year_month(end))
+        with self._lock:
+            return [year_month for (year_month,) in self.conn.execute(query + " ORDER BY year_month DESC", params)]
+
+    def pending_lessons(self, student_name: str = None) -> list[dict]:
+        """Pending (unpaid) lessons summarised per student, course and month."""
+        query = (
+            "SELECT student_name, course_code, year_month, COUNT(*), COALESCE(SUM(amount), 0) FROM lessons "
+            "WHERE payment = 'PE'"
+        )
+        params = []
+        if student_name:
+            query += " AND student_name = ?"
+            params.append(student_name)
+        query += " GROUP BY student_name, course_code, year_month ORDER BY student_name, course_code, year_month"
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [
+            {"student_name": name, "course_code": code, "year_month": year_month, "lessons": count, "amount": amount}
+            for name, code, year_month, count, amount in rows
+        ]
@@ -0,0 +1,578 @@
+"""
+Load test for bot.py that runs fully offline.
+
+A stand-in for the Telegram Bot API (getUpdates, getFile, file downloads, sendMessage,
+sendDocument, ...) and the virtual users talking to it run in a process of their own.
+The real application from bot.build_application polls that stand-in from this process,
+with news, joke and chat backends replaced by fakes with a set latency. Vocabulary is
+translated by the bot's own hedged translator, over two stand-in translation services
+that sometimes stall.
+
+    python loadtest.py --users 50 --conversations 4 --mix tuition=2,vocab=2,news=1,chat=1,joke=1
+
+Reports throughput, p50/p95/p99 latency per handler (from the update being available
+to getUpdates until the reply the user waits for reaches the API) and the bot process's
+peak memory. With --render-workers N the PDFs are made by N render_queue.py workers.
+
+    python loadtest.py --translation-benchmark 3000
+
+only translates words against the stand-in services, once with a single service and
+once hedged over all of them, and reports the p50/p99 latency of each word.
+"""
+import argparse, asyncio, json, multiprocessing, os, random, resource, sys, tempfile, time, tracemalloc
+from collections import Counter
+from functools import partial
+from aiohttp import web
+
+TOKEN = "123456:LOADTEST"
+SCENARIOS = ("tuition", "vocab", "news", "chat", "joke")
+
+# ---- Telegram side: fake Bot API and virtual users, in their own process ----
+
+class FakeTelegram:
+    """Just enough of the Bot API for the bot's handlers, recording what the bot sends to each chat."""
+    def __init__(self):
+        self.updates = []
+        self.next_update_id = 1
+        self.next_message_id = 1
+        self.new_updates = asyncio.Event()
+        self.inboxes = {}       # chat_id -> asyncio.Queue of (method, data, time received)
+        self.files = {}         # file_id -> bytes
+        self.calls = Counter()
+
+    def web_app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        app.router.add_get("/file/bot{token}/documents/{file_id}", self.download)
+        return app
+
+    def inbox(self, chat_id: int) -> asyncio.Queue:
+        return self.inboxes.setdefault(chat_id, asyncio.Queue())
+
+    def push_update(self, message: dict) -> float:
+        """Make an update available to getUpdates, returning the time it was."""
+        self.updates.append({"update_id": self.next_update_id, "message": message})
+        self.next_update_id += 1
+        self.new_updates.set()
+        return time.perf_counter()
+
+    def add_file(self, content: bytes) -> str:
+        file_id = f"file{len(self.files)}"
+        self.files[file_id] = content
+        return file_id
+
+    def _message(self, chat_id, **fields) -> dict:
+        self.next_message_id += 1
+        return {"message_id": self.next_message_id, "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"}, **fields}
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        data = await request.json() if request.content_type == "application/json" else dict(await request.post())
+        if method == "getUpdates":
+            result = await self.get_updates(int(data.get("offset") or 0), float(data.get("timeout") or 0))
+        elif method == "getMe":
+            result = {"id": 123456, "is_bot": True, "first_name": "Molly", "username": "molly_loadtest_bot"}
+        elif method == "getFile":
+            file_id = data["file_id"]
+            result = {"file_id": file_id, "file_unique_id": file_id, "file_size": len(self.files[file_id]),
+                      "file_path": f"documents/{file_id}"}
+        elif method in ("sendMessage", "sendDocument", "editMessageText"):
+            chat_id = int(data["chat_id"])
+            if method == "sendDocument":
+                document = data["document"]
+                file_name = getattr(document, "filename", "document")
+                result = self._message(chat_id, document={"file_id": "sent", "file_unique_id": "sent", "file_name": file_name})
+            else:
+                result = self._message(chat_id, text=data.get("text", ""))
+            self.inbox(chat_id).put_nowait((method, data, time.perf_counter()))
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def get_updates(self, offset: int, timeout: float) -> list:
+        self.updates = [update for update in self.updates if update["update_id"] >= offset]
+        if not self.updates and timeout:
+            self.new_updates.clear()
+            try:
+                await asyncio.wait_for(self.new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.updates[:100]
+
+    async def download(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.files[request.match_info["file_id"]])
+
+class FakeTranslationService:
+    """
+    Stand-in for a translation service as HTTPTranslationProvider expects one. Answers
+    after latency seconds give or take half, and on a stall_rate share of requests
+    stalls for another stall seconds, the slow tail hedging is meant to cut off.
+    """
+    def __init__(self, latency: float, stall_rate: float, stall: float, seed: int):
+        self.latency = latency
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.random = random.Random(seed)
+        self.requests = 0
+
+    def web_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/translate", self.translate)
+        return app
+
+    async def translate(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        self.requests += 1
+        delay = self.latency * self.random.uniform(0.5, 1.5)
+        if self.random.random() < self.stall_rate:
+            delay += self.stall
+        await asyncio.sleep(delay)
+        return web.json_response({"translation": f"{data['text']}的意思"})
+
+def translation_urls(options: dict) -> list:
+    return [f"http://127.0.0.1:{options['port'] + 1 + i}/translate" for i in range(options["translation_services"])]
+
+async def start_translation_services(options: dict) -> tuple[list, list]:
+    """Serve the stand-in translation services on the ports after --port, returning them and their runners."""
+    services, runners = [], []
+    for i in range(options["translation_services"]):
+        service = FakeTranslationService(options["translate_latency"], options["translate_stall_rate"],
+                                         options["translate_stall"], options["seed"] + i)
+        runner = web.AppRunner(service.web_app())
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", options["port"] + 1 + i).start()
+        services.append(service)
+        runners.append(runner)
+    return services, runners
+
+def sample_tuition_csv(lessons: int = 8) -> bytes:
+    rows = ["date,amount,payment,status,makeup"]
+    rows += [f"2025-11-{day:02d},400,{'PA' if day % 2 else 'PE'},C" for day in range(1, lessons + 1)]
+    return ("\n".join(rows) + "\n").encode()
+
+def sample_vocabulary(words: int) -> str:
+    return ";".join(f"word{i},{'n' if i % 2 else 'v'}," for i in range(words))
+
+def is_text(fragment: str):
+    return lambda method, data: method == "sendMessage" and fragment in data.get("text", "")
+
+def is_message(method, data) -> bool:
+    return method == "sendMessage"
+
+def is_document(method, data) -> bool:
+    return method == "sendDocument"
+
+class VirtualUser:
+    """One Telegram user in a private chat with the bot, running scripted conversations."""
+    def __init__(self, telegram: FakeTelegram, user_id: int, samples: list, options: dict):
+        self.telegram = telegram
+        self.user_id = user_id
+        self.samples = samples      # [handler, latency in seconds or None when it failed]
+        self.options = options
+        self.inbox = telegram.inbox(user_id)
+
+    def message(self, text: str = None, document: dict = None) -> dict:
+        message = {"message_id": random.randrange(1, 2**31), "date": int(time.time()),
+                   "chat": {"id": self.user_id, "type": "private"},
+                   "from": {"id": self.user_id, "is_bot": False, "first_name": f"User{self.user_id}"}}
+        if text is not None:
+            message["text"] = text
+            if text.startswith("/"):
+                message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        if document is not None:
+            message["document"] = document
+        return message
+
+    async def step(self, handler: str, message: dict, until) -> bool:
+        """Send a message and wait for the reply that `until` recognises, recording the latency."""
+        await asyncio.sleep(random.uniform(0, self.options["think_time"]))
+        sent = self.telegram.push_update(message)
+        return await self.wait_for(until, handler, sent)
+
+    async def wait_for(self, until, handler: str = None, sent: float = None) -> bool:
+        deadline = time.perf_counter() + self.options["step_timeout"]
+        while True:
+            try:
+                method, data, received = await asyncio.wait_for(self.inbox.get(), deadline - time.perf_counter())
+            except asyncio.TimeoutError:
+                if handler:
+                    self.samples.append([handler, None])
+                return False
+            if until(method, data):
+                if handler:
+                    self.samples.append([handler, received - sent])
+                return True
+            if method == "sendMessage" and data.get("text", "").startswith("❌"):
+                if handler:
+                    self.samples.append([handler, None])
+                return False
+
+    async def drain(self, quiet: float = 0.5):
+        """Let the rest of a multi-message reply arrive before the next conversation starts."""
+        while True:
+            try:
+                await asyncio.wait_for(self.inbox.get(), quiet)
+            except asyncio.TimeoutError:
+                return
+
+    async def tuition(self):
+        if not await self.step("tuition_note_start", self.message("/tuition"), is_message):
+            return
+        file_name = f"JS-User{self.user_id}-11.csv"
+        file_id = self.telegram.add_file(sample_tuition_csv())
+        document = {"file_id": file_id, "file_unique_id": file_id, "file_name": file_name, "mime_type": "text/csv"}
+        if not await self.step("receive_file", self.message(document=document), is_text("File received")):
+            return
+        if await self.step("receive_notes (PDF sent)", self.message("Paid by FPS, thank you!"), is_document):
+            await self.wait_for(is_text("Invoice sent"))
+
+    async def vocab(self):
+        if not await self.step("vocab_start", self.message("/vocab"), is_message):
+            return
+        if not await self.step("receive_name", self.message(f"Student{self.user_id}"), is_message):
+            return
+        if await self.step("receive_list (PDF sent)", self.message(sample_vocabulary(self.options["words"])), is_document):
+            await self.wait_for(is_text("Done!"))
+
+    async def news(self):
+        if await self.step("send_news", self.message("/news"), is_text("Latest News")):
+            await self.drain()
+
+    async def chat(self):
+        await self.step("send_chat", self.message("Molly, what should I teach tomorrow?"), is_message)
+
+    async def joke(self):
+        await self.step("random_joke", self.message("/random"), is_message)
+
+    async def run(self, conversations: int, mix: dict):
+        scenarios, weights = zip(*mix.items())
+        for _ in range(conversations):
+            await getattr(self, random.choices(scenarios, weights)[0])()
+
+async def _run_users(port: int, options: dict, conn):
+    telegram = FakeTelegram()
+    runner = web.AppRunner(telegram.web_app())
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    services, service_runners = await start_translation_services(options)
+    conn.send("ready")
+    await asyncio.to_thread(conn.recv)      # the bot is polling
+
+    random.seed(options["seed"])
+    samples = []
+    users = [VirtualUser(telegram, 100000 + i, samples, options) for i in range(options["users"])]
+    started = time.perf_counter()
+    await asyncio.gather(*(user.run(options["conversations"], options["mix"]) for user in users))
+    elapsed = time.perf_counter() - started
+    conn.send({"samples": samples, "elapsed": elapsed, "calls": dict(telegram.calls),
+               "updates": telegram.next_update_id - 1,
+               "translation_requests": sum(service.requests for service in services)})
+    await asyncio.to_thread(conn.recv)      # the bot has stopped polling
+    await runner.cleanup()
+    for service_runner in service_runners:
+        await service_runner.cleanup()
+
+def run_telegram_side(port: int, options: dict, conn):
+    asyncio.run(_run_users(port, options, conn))
+
+# ---- Bot side: the real application with fake backends ----
+
+def install_fake_backends(bot, options: dict):
+    """Replace news, jokes and chat with fakes; Telegram and translation have stand-in servers."""
+    def fetch_news(token, limit=3, page_size=3):
+        time.sleep(options["news_latency"])
+        return [{"title": f"Headline {i}", "description": "Something happened_today. " * 8,
+                 "url": f"https://news.invalid/{i}"} for i in range(limit)]
+    bot.fetch_news = fetch_news
+
+    class FakeResponse:
+        def json(self):
+            return {"setup": "Why did the PDF go to school?", "punchline": "To improve its layout."}
+
+        def raise_for_status(self):
+            pass
+
+    def get(*args, **kwargs):
+        time.sleep(options["joke_latency"])
+        return FakeResponse()
+    bot.requests.get = get
+
+    class FakeChat:
+        def send_message(self, message):
+            time.sleep(options["chat_latency"])
+            return f"Teach them to say no to sarcasm. You asked: {message}"
+    bot.GrokChat = FakeChat
+
+    # Every virtual user is let in like the master
+    bot.auth = lambda chat_id: True
+
+def run_render_worker(queue_path: str, options: dict):
+    """A render_queue.py worker, translating through the same stand-in services as the bot."""
+    import render_queue
+    asyncio.run(render_queue.run_worker(render_queue.create_job_queue(queue_path), poll_interval=0.05))
+
+async def run_bot_side(api_url: str, options: dict, conn) -> dict:
+    os.environ.setdefault("MASTER_ID", "0")
+    import bot, utils
+    from send_queue import SendQueue
+    from telegram import Update
+
+    install_fake_backends(bot, options)
+    if not options["flood_limits"]:
+        bot.SendQueue = partial(SendQueue, global_rate=1e6, private_chat_rate=1e6, group_chat_rate=1e6, chat_burst=1e6)
+    if options["tracemalloc"]:
+        tracemalloc.start()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    app = bot.build_application(token=TOKEN, api_url=api_url, persistence_path=options["persistence"] or "")
+    async with app:
+        await app.start()
+        await app.updater.start_polling(poll_interval=0, timeout=10, allowed_updates=Update.ALL_TYPES)
+        conn.send("polling")
+        result = await asyncio.to_thread(conn.recv)
+        await app.updater.stop()
+        await app.stop()
+    conn.send("stopped")
+
+    result["translator"] = utils.get_translator().metrics()
+    result["rss_before_kb"] = rss_before
+    result["rss_peak_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if options["tracemalloc"]:
+        result["heap_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+# ---- Translation benchmark: the hedged translator alone ----
+
+async def _translate_words(translator, words: int, concurrency: int) -> list:
+    """Translate words distinct words, concurrency at a time, returning each one's latency."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def translate(word):
+        async with semaphore:
+            started = time.perf_counter()
+            await translator.translate(word)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(translate(f"word{i}") for i in range(words)))
+    return latencies
+
+async def _serve_translation(options: dict, conn):
+    services, runners = await start_translation_services(options)
+    conn.send("ready")
+    while True:
+        command = await asyncio.to_thread(conn.recv)
+        if command == "reset":
+            for i, service in enumerate(services):
+                service.random.seed(options["seed"] + i)
+            conn.send("reset")
+        elif command == "requests":
+            conn.send(sum(service.requests for service in services))
+        else:
+            break
+    for runner in runners:
+        await runner.cleanup()
+
+def run_translation_services(options: dict, conn):
+    """The stand-in translation services in a process of their own, so they don't slow the translator down."""
+    asyncio.run(_serve_translation(options, conn))
+
+def _ask(conn, command: str):
+    conn.send(command)
+    return conn.recv()
+
+async def run_translation_benchmark(options: dict) -> dict:
+    """Translate the same words over one stand-in service, then hedged over all of them."""
+    import utils
+    context = multiprocessing.get_context("spawn")
+    conn, child_conn = context.Pipe()
+    server = context.Process(target=run_translation_services, args=(options, child_conn), daemon=True)
+    server.start()
+    if conn.recv() != "ready":
+        sys.exit("Stand-in translation services did not start")
+    urls = translation_urls(options)
+    runs = {}
+    try:
+        for label, run_urls in (("one service", urls[:1]), (f"hedged over {len(urls)}", urls)):
+            await asyncio.to_thread(_ask, conn, "reset")
+            translator = utils.HedgedTranslator([utils.HTTPTranslationProvider(url, name=f"bench {i}")
+                                                 for i, url in enumerate(run_urls)])
+            # Until each provider has answered min_samples times its p90 is a guess
+            await _translate_words(translator, options["translation_warmup"], options["translation_concurrency"])
+            requests_before = await asyncio.to_thread(_ask, conn, "requests")
+            hedges_before = translator.hedges
+            latencies = sorted(await _translate_words(translator, options["translation_benchmark"],
+                                                      options["translation_concurrency"]))
+            words = len(latencies)
+            runs[label] = {
+                "words": words,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p90_ms": percentile(latencies, 90) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "max_ms": latencies[-1] * 1000,
+                "requests_per_word": (await asyncio.to_thread(_ask, conn, "requests") - requests_before) / words,
+                "hedged": (translator.hedges - hedges_before) / words,
+                "providers": translator.metrics()["providers"],
+            }
+    finally:
+        conn.send("stop")
+        server.join(timeout=10)
+    return runs
+
+def print_translation_benchmark(runs: dict, options: dict):
+    print(f"\n{options['translation_benchmark']} words, {options['translation_concurrency']} at a time; each service answers in "
+          f"{options['translate_latency'] * 1000:.0f} ms +-50% and stalls {options['translate_stall']}s on "
+          f"{options['translate_stall_rate']:.0%} of requests")
+    print(f"\n{'':<18}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'requests/word':>15}{'hedged':>8}")
+    for label, run in runs.items():
+        print(f"{label:<18}{run['p50_ms']:>9.0f}{run['p90_ms']:>9.0f}{run['p99_ms']:>9.0f}{run['max_ms']:>9.0f}"
+              f"{run['requests_per_word']:>15.2f}{run['hedged']:>8.1%}")
+
+# ---- Report ----
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))]
+
+def summarize(result: dict) -> dict:
+    by_handler = {}
+    for handler, latency in result["samples"]:
+        by_handler.setdefault(handler, []).append(latency)
+    handlers = {}
+    for handler, latencies in sorted(by_handler.items()):
+        ok = sorted(latency for latency in latencies if latency is not None)
+        handlers[handler] = {
+            "count": len(latencies),
+            "failed": len(latencies) - len(ok),
+            "p50_ms": percentile(ok, 50) * 1000,
+            "p95_ms": percentile(ok, 95) * 1000,
+            "p99_ms": percentile(ok, 99) * 1000,
+            "max_ms": ok[-1] * 1000 if ok else 0.0,
+        }
+    elapsed = result["elapsed"]
+    summary = {
+        "elapsed_s": elapsed,
+        "updates": result["updates"],
+        "updates_per_s": result["updates"] / elapsed if elapsed else 0.0,
+        "bot_requests_per_s": sum(count for method, count in result["calls"].items() if method != "getUpdates") / elapsed if elapsed else 0.0,
+        "handlers": handlers,
+        "rss_peak_mb": result["rss_peak_kb"] / 1024,
+        "rss_growth_mb": (result["rss_peak_kb"] - result["rss_before_kb"]) / 1024,
+    }
+    if "heap_peak_bytes" in result:
+        summary["heap_peak_mb"] = result["heap_peak_bytes"] / 1e6
+    summary["translation_requests"] = result["translation_requests"]
+    summary["translator"] = result["translator"]
+    return summary
+
+def print_report(summary: dict, options: dict):
+    mix = ",".join(f"{name}={weight}" for name, weight in options["mix"].items())
+    rendering = f"{options['render_workers']} render worker(s)" if options["render_workers"] else "rendering in the bot"
+    print(f"\n{options['users']} users x {options['conversations']} conversations ({mix}), {rendering}, in {summary['elapsed_s']:.1f}s")
+    print(f"Throughput: {summary['updates_per_s']:.1f} updates/s, {summary['bot_requests_per_s']:.1f} bot API requests/s")
+    print(f"\n{'handler':<26}{'count':>7}{'failed':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for handler, stats in summary["handlers"].items():
+        print(f"{handler:<26}{stats['count']:>7}{stats['failed']:>8}{stats['p50_ms']:>10.0f}{stats['p95_ms']:>10.0f}"
+              f"{stats['p99_ms']:>10.0f}{stats['max_ms']:>10.0f}")
+    translator = summary["translator"]
+    if translator["requests"]:
+        print(f"\nTranslations in the bot: {translator['requests']} words, {translator['hedges']} hedged, "
+              f"{translator['hedge_wins']} won by the hedge; {summary['translation_requests']} requests to the stand-in services")
+        for name, provider in translator["providers"].items():
+            print(f"  {name}: {provider['answered']} answered, {provider['failed']} failed, {provider['cancelled']} cancelled, "
+                  f"p50 {provider['p50'] * 1000:.0f} ms, p90 {provider['p90'] * 1000:.0f} ms")
+    memory = f"\nPeak RSS {summary['rss_peak_mb']:.0f} MB ({summary['rss_growth_mb']:+.0f} MB during the run)"
+    if "heap_peak_mb" in summary:
+        memory += f", Python heap peak {summary['heap_peak_mb']:.1f} MB"
+    print(memory)
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name}, choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test bot.py against a local fake Telegram Bot API.")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--conversations", type=int, default=3, help="conversations each user runs one after another")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("tuition=2,vocab=2,news=1,chat=1,joke=1"),
+                        help="scenario weights, e.g. tuition=2,vocab=1")
+    parser.add_argument("--words", type=int, default=30, help="words in each vocabulary list")
+    parser.add_argument("--think-time", type=float, default=0.5, help="longest pause (s) before each message a user sends")
+    parser.add_argument("--step-timeout", type=float, default=60, help="seconds to wait for a reply before counting a failure")
+    parser.add_argument("--translate-latency", type=float, default=0.05, help="typical seconds a stand-in translation service takes")
+    parser.add_argument("--translate-stall-rate", type=float, default=0.05, help="share of translation requests that stall")
+    parser.add_argument("--translate-stall", type=float, default=2.0, help="seconds a stalled translation request takes longer")
+    parser.add_argument("--translation-services", type=int, default=2, help="stand-in translation services to hedge over")
+    parser.add_argument("--translation-benchmark", type=int, metavar="WORDS",
+                        help="only benchmark translating this many words, one service against hedged over all")
+    parser.add_argument("--translation-warmup", type=int, default=200, help="words translated before the benchmark measures")
+    parser.add_argument("--translation-concurrency", type=int, default=10, help="words the benchmark translates at a time")
+    parser.add_argument("--news-latency", type=float, default=0.3)
+    parser.add_argument("--chat-latency", type=float, default=1.0)
+    parser.add_argument("--joke-latency", type=float, default=0.2)
+    parser.add_argument("--no-flood-limits", dest="flood_limits", action="store_false",
+                        help="lift the send queue's Telegram rate limits to measure the handlers alone")
+    parser.add_argument("--render-workers", type=int, default=0,
+                        help="render PDFs in this many render_queue.py worker processes instead of the bot's")
+    parser.add_argument("--persistence", type=str, default="", help="SQLite file to persist state to, none by default")
+    parser.add_argument("--tracemalloc", action="store_true", help="also report the Python heap peak (slows the bot down)")
+    parser.add_argument("--port", type=int, default=18765)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", type=str, help="also write the results to this file")
+    options = vars(parser.parse_args())
+
+    if options["translation_benchmark"]:
+        runs = asyncio.run(run_translation_benchmark(options))
+        print_translation_benchmark(runs, options)
+        if options["json"]:
+            with open(options["json"], "w") as f:
+                json.dump({"options": options, "translation": runs}, f, indent=2)
+        return
+
+    # Read by utils.create_translator in the bot and the render workers
+    os.environ["TRANSLATION_PROVIDERS"] = "http"
+    os.environ["TRANSLATION_SERVICE_URL"] = ",".join(translation_urls(options))
+
+    # The bot writes its temporary files to the working directory
+    json_path = os.path.abspath(options["json"]) if options["json"] else None
+    os.chdir(tempfile.mkdtemp(prefix="molly-loadtest-"))
+
+    context = multiprocessing.get_context("spawn")
+    workers = []
+    if options["render_workers"]:
+        # Read by bot.py when it is imported
+        os.environ["RENDER_QUEUE"] = os.path.abspath("render_jobs.db")
+        for _ in range(options["render_workers"]):
+            worker = context.Process(target=run_render_worker, args=(os.environ["RENDER_QUEUE"], options), daemon=True)
+            worker.start()
+            workers.append(worker)
+    conn, child_conn = context.Pipe()
+    telegram = context.Process(target=run_telegram_side, args=(options["port"], options, child_conn), daemon=True)
+    telegram.start()
+    if conn.recv() != "ready":
+        sys.exit("Fake Telegram server did not start")
+    try:
+        result = asyncio.run(run_bot_side(f"http://127.0.0.1:{options['port']}", options, conn))
+    finally:
+        telegram.join(timeout=10)
+        for worker in workers:
+            worker.terminate()
+
+    summary = summarize(result)
+    print_report(summary, options)
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump({"options": options, "summary": summary}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
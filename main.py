@@ -1,48 +1,139 @@
-from utils import parse_vocab_file, parse_tuition_file, parse_note_txt
-from pdf_utils import generate_vocabulary_pdf, generate_tuition_debit_note
+from utils import parse_vocab_file, parse_tuition_file, parse_note_txt, get_output_dir, find_tuition_files, group_tuition_files, parse_tuition_filename
+from pdf_utils import generate_vocabulary_pdf, generate_class_vocabulary_pdfs, render_tuition_debit_note, generate_combined_debit_notes, render_tuition_statement
+from ledger import TuitionLedger
+from reports import generate_report
+from watcher import watch_tuition_data
+from validation import validate_tuition_files, format_validation_report
 from datetime import datetime
-from pathlib import Path
-import argparse, asyncio, shutil, os
+import argparse, asyncio, logging, os
 
 
+def student_files(directory: str, student_name: str) -> list[str]:
+    """Every tuition file of one student, whatever the course. Files with other names are left out."""
+    files = []
+    for file in find_tuition_files([directory]):
+        try:
+            _, name, _ = parse_tuition_filename(file)
+        except ValueError:
+            continue
+        if name == student_name:
+            files.append(file)
+    return files
+
+def year_month(value: str) -> str:
+    """argparse type for --from/--to: a month written YYYY-MM, returned as such."""
+    try:
+        date = datetime.strptime(value.strip(), "%Y-%m")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a month like 2025-01 (YYYY-MM, month 1 to 12)") from None
+    return f"{date.year:04d}-{date.month:02d}"
+
 def main():
-    VC, TU = "vc", "tu"
+    VC, TU, LD, RP, CB, VA, ST = "vc", "tu", "ld", "rp", "cb", "va", "st"
     parser = argparse.ArgumentParser(prog="LT ENG PDF Generator", description="Generate PDF for vocabulary list or tuition debit note.")
-    parser.add_argument('-t', '--type', type=str, choices=[VC, TU], required=True, default="vc", help="Type of PDF to generate: vc = vocab list, tu = tuition debit note")
+    parser.add_argument('-t', '--type', type=str, choices=[VC, TU, LD, RP, CB, VA, ST], required=False, help="Type of PDF to generate: vc = vocab list, tu = tuition debit note, ld = update the tuition ledger and list pending lessons, rp = revenue report, cb = one PDF with every student's debit note, va = only check every tuition CSV for problems, st = statement of one student's lessons over a range of months")
     parser.add_argument('-o', '--output', type=str, default="vocabulary_list.pdf",
                         help="Output PDF filename (default: vocabulary_list.pdf)")
-    parser.add_argument('-f', '--file', type=str, help="Input vocabulary csv file name (vocab.csv)", required=True)
+    parser.add_argument('-f', '--file', type=str, help="Input vocabulary csv file name (vocab.csv)", required=False)
+    parser.add_argument('-s', '--students', type=str, required=False,
+                        help="Comma separated student names, makes one vocab list per student in a zip named after --output")
+    parser.add_argument('--student', type=str, help="Student name for -t st, as in the tuition file names")
+    parser.add_argument('--from', dest="start", type=year_month, default=f"{datetime.now().year}-01",
+                        help="First month of the statement, YYYY-MM (default: January this year)")
+    parser.add_argument('--to', dest="end", type=year_month, default=f"{datetime.now().year}-12",
+                        help="Last month of the statement, YYYY-MM (default: December this year)")
     parser.add_argument('-n', '--note', type=str, help="Input txt file name for notes (notes.csv)", required=False)
+    parser.add_argument('-w', '--watch', action="store_true",
+                        help="Watch tuition_data and re-render a student's debit note into tuition_notes whenever their CSVs change")
     # Parse arguments
     args = parser.parse_args()
     csv_filename = args.file
     note_filename = args.note
-    if args.type == VC: 
+    if not args.type and not args.watch:
+        parser.error("-t/--type or -w/--watch is required")
+    if args.type in (VC, TU) and not csv_filename:
+        parser.error(f"-f/--file is required for -t {args.type}")
+    if args.type == ST and not args.student:
+        parser.error("--student is required for -t st")
+    if args.type == ST and args.start > args.end:
+        parser.error(f"--from {args.start} is after --to {args.end}")
+
+    # Fail before rendering anything when the tuition files have problems
+    if args.type in (TU, CB, VA, ST):
+        if args.type == TU:
+            paths = [os.path.join("tuition_data", csv_filename)]
+        elif args.type == ST:
+            paths = student_files("tuition_data", args.student)
+        else:
+            paths = ["tuition_data"]
+        errors = validate_tuition_files(paths)
+        if errors:
+            parser.exit(1, format_validation_report(errors) + "\n")
+        if args.type == VA:
+            parser.exit(0, "All tuition files are valid\n")
+
+    if args.watch:
+        logging.basicConfig(format="%(asctime)s - %(message)s", level=logging.INFO)
+        try:
+            watch_tuition_data("tuition_data", "tuition_notes")
+        except KeyboardInterrupt:
+            pass
+    elif args.type == RP:
+        pdf_path, csv_path = generate_report("tuition_data", get_output_dir(), f"RevenueReport_{datetime.now():%Y%m%d}")
+        print(f"Revenue report written to {pdf_path} and {csv_path}")
+    elif args.type == CB:
+        records = []
+        for _, files in sorted(group_tuition_files(find_tuition_files(["tuition_data"])).items()):
+            lesson_data, course_desc, student_name, months, _ = parse_tuition_file(files)
+            records.append({"student_name": student_name, "months": months, "lesson_data": lesson_data, "course_name": course_desc})
+        pdf_path = generate_combined_debit_notes(f"TuitionFeeDebitNotes_All_{datetime.now():%Y%m%d}.pdf", records, get_output_dir())
+        print(f"Combined debit notes for {len(records)} student(s) written to {pdf_path}")
+    elif args.type == ST:
+        with TuitionLedger() as ledger:
+            ledger.import_directory("tuition_data")
+            months = ledger.statement_months(args.student, args.start, args.end)
+        if not months:
+            parser.exit(1, f"No lessons for {args.student} from {args.start} to {args.end}\n")
+        notes = "\n".join(parse_note_txt(note_filename)) if note_filename else ""
+        pdf_path = asyncio.run(render_tuition_statement(
+            args.student, months, args.start, args.end, notes,
+            filename=f"TuitionStatement_{args.student}_{args.start}_{args.end}.pdf",
+            output_path=get_output_dir(),
+        ))
+        print(f"Statement of {len(months)} month(s) written to {pdf_path}")
+    elif args.type == LD:
+        with TuitionLedger() as ledger:
+            imported, unchanged, removed = ledger.import_directory("tuition_data")
+            print(f"Ledger updated: {imported} imported, {unchanged} unchanged, {removed} removed")
+            for entry in ledger.pending_lessons():
+                year, month = divmod(entry["year_month"], 100)
+                print(f"{entry['student_name']} ({entry['course_code']}) {year}-{month:02d}: {entry['lessons']} pending, ${entry['amount']:,} HKD")
+    elif args.type == VC: 
         output_filename = args.output
         vocab_data = parse_vocab_file(csv_filename)
-        # Generate PDF
-        asyncio.run(generate_vocabulary_pdf(output_filename, vocab_data))
+        if args.students:
+            zip_filename = f"{os.path.splitext(output_filename)[0]}.zip"
+            asyncio.run(generate_class_vocabulary_pdfs(zip_filename, vocab_data, args.students.split(",")))
+        else:
+            # Generate PDF
+            asyncio.run(generate_vocabulary_pdf(output_filename, vocab_data))
     else:
         note_data = "\n"
         if note_filename:
             note_data = "\n".join(parse_note_txt(note_filename)) 
         tuition_data_dir = "tuition_data"
-        lesson_data, course_desc, student_name, month, month_name = parse_tuition_file(os.path.join(tuition_data_dir, csv_filename))
+        lesson_data, course_desc, student_name, months, month_name = parse_tuition_file(os.path.join(tuition_data_dir, csv_filename))
         current_year = datetime.now().year
         file_name = f"TuitionFeeDebitNote_{student_name}_{month_name}_{current_year}.pdf"
-        generate_tuition_debit_note(
-            filename=file_name,
+        asyncio.run(render_tuition_debit_note(
             student_name=student_name,
-            months=[month],
+            months=months,
             lesson_data=lesson_data,
             course_name=course_desc,
-            notes=note_data
-        )
-        tuition_note_dir = "tuition_notes"
-        if not Path(tuition_note_dir).is_dir():
-            os.makedirs(tuition_note_dir)
-
-        shutil.move(file_name, os.path.join(tuition_note_dir, file_name))
+            notes=note_data,
+            filename=file_name,
+            output_path=get_output_dir(),
+        ))
         
 if __name__ == "__main__":
     main()
\ No newline at end of file
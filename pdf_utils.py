@@ -1,18 +1,38 @@
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, HRFlowable, Spacer, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, HRFlowable, Spacer, PageBreak, Frame, LayoutError
 from reportlab.lib.units import inch
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfbase.cidfonts import UnicodeCIDFont
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.pdfgen import canvas
 from datetime import datetime
-from utils import create_vocabulary_table, week_of_month, get_output_dir, get_resource_path
-from functools import reduce
-import os
+from utils import VOCABULARY_HEADER, translate_vocabulary_rows, week_of_month, get_output_dir, get_resource_path, lesson_total
+from functools import partial, reduce
+from io import BytesIO
+import asyncio, inspect, os, re, threading, zipfile
+import pymupdf
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape as xml_escape
+
+_font_lock = threading.Lock()
+_chinese_font = None
+
+# MuPDF must not be used from several threads at the same time
+pymupdf_lock = threading.Lock()
 
 def register_chinese_font() -> str:
+    # Fonts are registered once per process; parsing the TTF on every render is slow
+    # and registering from several render threads at once is not safe
+    global _chinese_font
+    with _font_lock:
+        if _chinese_font is None:
+            _chinese_font = _register_chinese_font()
+    return _chinese_font
+
+def _register_chinese_font() -> str:
     chinese_font = None
     try:
         # use a TrueType font for Chinese        
@@ -48,36 +68,145 @@ def style_vocabulary_table(chinese_font):
         ('BOTTOMPADDING', (0, 0), (-1, -1), 8),  # Bottom padding for all cells
     ])
 
-async def generate_vocabulary_pdf(filename, vocab_data):
-    """Generate a PDF with a vocabulary table."""
-    # Create PDF document
-    doc = SimpleDocTemplate(filename, pagesize=letter)
-    elements = []
-    chinese_font = register_chinese_font()
-    
-    # Title
+def vocabulary_title_text(student_name: str = None) -> str:
+    """The title of this week's vocabulary list, e.g. 'Nov 2025 Week 2', optionally for one student."""
+    dt = datetime.now()
+    title_text = f'{dt.strftime("%b")} {dt.year} Week {week_of_month(dt)}'
+    if student_name:
+        # Names may be Chinese, which the Helvetica title font cannot show
+        title_text = f'<font name="{register_chinese_font()}">{xml_escape(student_name)}</font> - {title_text}'
+    return title_text
+
+def _vocabulary_title(title_text) -> Paragraph:
     styles = getSampleStyleSheet()
     title_style = styles['Title']
     title_style.alignment = 0
     title_style.fontsize = 16
-    dt = datetime.now()
-    title_text = f'{dt.strftime("%b")} {dt.year} Week {week_of_month(dt)}'
-    title = Paragraph(title_text, title_style)
-    elements.append(title)
-    elements.append(HRFlowable(color=colors.black, thickness=2, spaceAfter=12, hAlign="LEFT"))
+    return Paragraph(title_text, title_style)
 
-    # Create and style table
-    table_data = await create_vocabulary_table(vocab_data)
-    table = Table(table_data, colWidths=[3 * inch, 3 * inch])
-    table.setStyle(style_vocabulary_table(chinese_font))
+class VocabularyPageWriter:
+    """
+    Lays a vocabulary table out on letter pages as its rows arrive.
 
-    # Add table to elements
-    elements.append(table)
+    Rows are held back until they fill the current page, then that page is drawn and
+    finished, so at most a page of rows is laid out at a time however long the list is.
+    Every page repeats the header row. Without a title_text the title's space is left
+    blank for stamp_vocabulary_title.
+    """
+    def __init__(self, filename, title_text, chinese_font):
+        self.canv = canvas.Canvas(filename, pagesize=letter)
+        self.table_style = style_vocabulary_table(chinese_font)
+        self.rows = []
+        self._new_frame()
+        self.frame.add(_vocabulary_title(title_text or "&nbsp;"), self.canv)
+        self.frame.add(HRFlowable(color=colors.black, thickness=2, spaceAfter=12, hAlign="LEFT"), self.canv)
 
-    # Build PDF
-    doc.build(elements)
+    def _new_frame(self):
+        # The frame SimpleDocTemplate uses with its default one inch margins
+        width, height = letter
+        self.frame = Frame(inch, inch, width - 2*inch, height - 2*inch)
+
+    def _table(self, rows):
+        table = Table([VOCABULARY_HEADER] + rows, colWidths=[3 * inch, 3 * inch], repeatRows=1)
+        table.setStyle(self.table_style)
+        return table
+
+    def add_rows(self, rows):
+        """Add rows to the table, drawing every page they fill."""
+        self.rows.extend(rows)
+        while self.rows:
+            table = self._table(self.rows)
+            parts = self.frame.split(table, self.canv)
+            if parts == [table]:
+                return  # the rest fits on this page, wait for more rows
+            if parts:
+                self.frame.add(parts[0], self.canv)
+                self.rows = self.rows[parts[0]._nrows - 1:]
+            elif self.frame._atTop:
+                raise LayoutError("Vocabulary row is too tall for a page")
+            self.canv.showPage()
+            self._new_frame()
+
+    def close(self):
+        """Draw the remaining rows and save the PDF."""
+        self.frame.add(self._table(self.rows), self.canv)
+        self.canv.showPage()
+        self.canv.save()
+
+async def generate_vocabulary_pdf(filename, vocab_data, title_text: str = None, progress=None, timeout: float = None):
+    """
+    Generate a PDF with a vocabulary table.
+
+    Pages are laid out in a worker thread while the remaining words are still being
+    translated, so a long list is not translated and laid out one after the other.
+    filename may also be a file-like object. Like render_tuition_debit_note it can be
+    cancelled or given a timeout, and nothing is written unless it finishes;
+    progress(done_words, total_words) is called after every chunk of words.
+    """
+    await asyncio.wait_for(_generate_vocabulary_pdf(filename, vocab_data, title_text, progress), timeout)
     print(f"PDF generated: {filename}")
 
+async def _generate_vocabulary_pdf(filename, vocab_data, title_text, progress):
+    chinese_font = register_chinese_font()
+    if title_text is None:
+        title_text = vocabulary_title_text()
+    writer = await asyncio.to_thread(VocabularyPageWriter, filename, title_text, chinese_font)
+
+    done = 0
+    async for rows in translate_vocabulary_rows(vocab_data):
+        await asyncio.to_thread(writer.add_rows, rows)
+        done += len(rows)
+        if progress:
+            await _report_progress(progress, done, len(vocab_data))
+    # The canvas only writes to filename when it is saved
+    await asyncio.to_thread(writer.close)
+
+def stamp_vocabulary_title(pdf_bytes: bytes, title_text: str) -> bytes:
+    """Draw a title into the blank title space of a vocabulary PDF generated with title_text=""."""
+    title_pdf = BytesIO()
+    canv = canvas.Canvas(title_pdf, pagesize=letter)
+    width, height = letter
+    Frame(inch, inch, width - 2*inch, height - 2*inch).add(_vocabulary_title(title_text), canv)
+    canv.showPage()
+    canv.save()
+
+    with pymupdf_lock:
+        with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc, \
+                pymupdf.open(stream=title_pdf.getvalue(), filetype="pdf") as title_doc:
+            doc[0].show_pdf_page(doc[0].rect, title_doc, 0)
+            return doc.tobytes(garbage=1, deflate=True)
+
+async def generate_class_vocabulary_pdfs(zip_filename, vocab_data, student_names: list[str]) -> dict[str, str]:
+    """
+    Generate one vocabulary PDF per student and put them all in a zip file.
+
+    The list is translated and laid out once, with the title left blank, and each
+    student's copy only stamps its own title onto that first page. Returns the file
+    name used in the zip for each student.
+    """
+    body = BytesIO()
+    await generate_vocabulary_pdf(body, vocab_data, title_text="")
+    body = body.getvalue()
+
+    file_names = {
+        student_name: f"review_notes_{student_name.replace('/', '_')}.pdf"
+        for student_name in dict.fromkeys(name.strip() for name in student_names) if student_name
+    }
+
+    def stamp(student_name):
+        return stamp_vocabulary_title(body, vocabulary_title_text(student_name))
+
+    def write_zip():
+        # Titles are drawn in parallel, MuPDF then takes its lock to put each on the page
+        with ThreadPoolExecutor(max_workers=min(8, len(file_names) or 1)) as pool, \
+                zipfile.ZipFile(zip_filename, "w", zipfile.ZIP_DEFLATED) as zf:
+            for (student_name, file_name), pdf in zip(file_names.items(), pool.map(stamp, file_names)):
+                zf.writestr(file_name, pdf)
+
+    await asyncio.to_thread(write_zip)
+    print(f"{len(file_names)} vocabulary PDFs generated: {zip_filename}")
+    return file_names
+
 
 def set_tuition_debit_note_style(chinese_font):
     styles = getSampleStyleSheet()
@@ -144,6 +273,306 @@ def set_tuition_debit_note_style(chinese_font):
 
     return styles, table_style
 
+def debit_note_page_elements(styles, table_style, chinese_font, student_name, month, page_lessons, course_name, note):
+    """Flowables for one month's page of a tuition debit note."""
+    elements = []
+    # 1. Header
+    header = Paragraph("Louis English Tutorial Lesson", styles['TitleCenter'])
+    elements.append(header)
+    elements.append(Spacer(1, 6))
+
+    # 2. Main title (bilingual)
+    title = Paragraph("Tuition Fee Debit Note<br/><br/>學費單", styles['BilingualTitle'])
+    elements.append(title)
+
+    # 3. Student & Tutor info
+    info = Paragraph(
+        f"Student Name 學生姓名: <b>{student_name}</b><br/>"
+        f"Tutor Name 導師姓名: <b>Louis Tsang</b>",
+        styles['ChineseNormal']
+    )
+    elements.append(info)
+    elements.append(Spacer(1, 12))
+
+    # 4. Month
+    month_style = ParagraphStyle(
+        name='Month',
+        fontName=chinese_font,
+        fontSize=12,
+        leading=10,
+        alignment=TA_LEFT,
+        spaceAfter=8
+    )
+    elements.append(Paragraph(f'{month}月', month_style))
+    elements.append(Spacer(1, 12))
+    
+    if page_lessons:
+        # 5. Table data
+        table_data = [
+            ["Tuition Fees\n學費", "Payment\n付款狀態", "Lesson\n課堂狀態"]
+        ]
+
+        for lesson in page_lessons:
+            desc = f"補堂 -- {lesson['makeup']} ({lesson['date']})" if lesson["makeup"] else f"{course_name} ({lesson['date']}) - {lesson['amount']} HKD" 
+            row = [
+                desc,
+                lesson['payment'],
+                lesson['status']
+            ]
+            table_data.append(row)
+
+        # Add total row with proper spacing
+        total = reduce(lambda curr, next: curr + next, [int(lesson["amount"]) for lesson in page_lessons if lesson["makeup"] is None])
+        table_data.append(["Total 總數", "", f"${total:,} HKD"])
+
+        # 6. Table styling with fixed borders
+        table = Table(table_data, colWidths=[3.8*inch, 1.3*inch, 1.3*inch])
+        
+        table.setStyle(table_style)
+        elements.append(table)
+
+    # 7. Optional Notes
+    elements.append(Spacer(1, 20))
+    note_header = ParagraphStyle(
+        name='NoteHeader',
+        fontName=chinese_font,
+        fontSize=12,
+        leading=16,
+        spaceAfter=6
+    )
+    elements.append(Paragraph("<b>Notes 備註</b>", note_header))
+    note_style = ParagraphStyle(
+        name='NoteBody',
+        fontName=chinese_font,
+        fontSize=10,
+        leading=14
+    )
+    formatted_notes = note.replace('\\n', '<br/>')
+    elements.append(Paragraph(formatted_notes, note_style))
+    return elements
+
+# Geometry of the platypus debit note layout, so the canvas engine draws the same page.
+# y values are measured down from the top of the page, the way platypus stacks flowables.
+PAGE_WIDTH, PAGE_HEIGHT = A4
+NOTE_LEFT = inch + 6                                  # left margin + frame padding
+NOTE_TOP = 0.8*inch + 6                               # top margin + frame padding
+NOTE_BOTTOM = PAGE_HEIGHT - 0.8*inch - 6
+NOTE_FRAME_WIDTH = PAGE_WIDTH - 2*inch - 12
+NOTE_COLUMN_WIDTHS = [3.8*inch, 1.3*inch, 1.3*inch]
+NOTE_TABLE_WIDTH = sum(NOTE_COLUMN_WIDTHS)
+NOTE_TABLE_LEFT = NOTE_LEFT + (NOTE_FRAME_WIDTH - NOTE_TABLE_WIDTH) / 2   # centred, wider than the frame
+NOTE_COLUMN_X = [NOTE_TABLE_LEFT + sum(NOTE_COLUMN_WIDTHS[:i]) for i in range(4)]
+NOTE_CELL_PADDING = 8
+NOTE_CELL_SIDE_PADDING = 10
+NOTE_CELL_LEADING = 12
+NOTE_TITLE_TOP = NOTE_TOP + 12 + 10 + 6               # header leading, spaceAfter and Spacer
+NOTE_INFO_TOP = NOTE_TITLE_TOP + 3*12 + 10            # three title lines and spaceAfter
+NOTE_MONTH_TOP = NOTE_INFO_TOP + 2*16 + 12            # two info lines and Spacer
+NOTE_TABLE_TOP = NOTE_MONTH_TOP + 10 + 8 + 12         # month leading, spaceAfter and Spacer
+NOTE_TABLE_HEADER = ["Tuition Fees\n學費", "Payment\n付款狀態", "Lesson\n課堂狀態"]
+
+class CanvasDebitNoteRenderer:
+    """
+    Draws tuition debit notes straight onto a reportlab canvas, without platypus layout.
+
+    The chrome that is the same on every page (header, bilingual title, tutor block,
+    table header and notes heading) is drawn once per document as form XObjects and
+    reused. Names, months, lesson rows, totals and notes are placed with direct canvas
+    calls at the positions the platypus engine would give them.
+    """
+    CHROME_FORM = "DebitNoteChrome"
+    TABLE_HEADER_FORM = "DebitNoteTableHeader"
+    NOTES_HEADING_FORM = "DebitNoteNotesHeading"
+
+    def __init__(self, canv, chinese_font):
+        self.canv = canv
+        self.font = chinese_font
+        self.note_style = ParagraphStyle(name='NoteBody', fontName=chinese_font, fontSize=10, leading=14)
+        self.name_x = NOTE_LEFT + pdfmetrics.stringWidth("Student Name 學生姓名: ", chinese_font, 11)
+        self._define_forms()
+
+    @staticmethod
+    def _y(top):
+        return PAGE_HEIGHT - top
+
+    def _define_forms(self):
+        canv = self.canv
+        canv.beginForm(self.CHROME_FORM)
+        canv.setFont('Helvetica-Bold', 16)
+        canv.drawCentredString(PAGE_WIDTH / 2, self._y(NOTE_TOP + 16), "Louis English Tutorial Lesson")
+        canv.setFont(self.font, 14)
+        canv.drawCentredString(PAGE_WIDTH / 2, self._y(NOTE_TITLE_TOP + 14), "Tuition Fee Debit Note")
+        canv.drawCentredString(PAGE_WIDTH / 2, self._y(NOTE_TITLE_TOP + 14 + 2*12), "學費單")
+        canv.setFont(self.font, 11)
+        canv.drawString(NOTE_LEFT, self._y(NOTE_INFO_TOP + 11), "Student Name 學生姓名: ")
+        canv.drawString(NOTE_LEFT, self._y(NOTE_INFO_TOP + 11 + 16), "Tutor Name 導師姓名: Louis Tsang")
+        canv.endForm()
+
+        header_height = 2*NOTE_CELL_LEADING + 2*NOTE_CELL_PADDING
+        canv.beginForm(self.TABLE_HEADER_FORM)
+        canv.setFillColor(colors.lightgrey)
+        canv.rect(NOTE_TABLE_LEFT, self._y(NOTE_TABLE_TOP + header_height), NOTE_TABLE_WIDTH, header_height, stroke=0, fill=1)
+        canv.setFillColor(colors.black)
+        self._draw_rows([(NOTE_TABLE_HEADER, NOTE_TABLE_TOP, 11, False)])
+        self._stroke_grid([NOTE_TABLE_TOP, NOTE_TABLE_TOP + header_height], top_line=True)
+        canv.endForm()
+
+        # Drawn translated to wherever the notes start, its origin is the heading's baseline
+        canv.beginForm(self.NOTES_HEADING_FORM, lowerx=0, lowery=-6, upperx=NOTE_FRAME_WIDTH, uppery=16)
+        canv.setFont(self.font, 12)
+        canv.drawString(0, 0, "Notes 備註")
+        canv.endForm()
+
+    def _draw_rows(self, rows):
+        """Draw (cells, top, font_size, total_row) table rows as a single text object."""
+        text = self.canv.beginText()
+        current_size = None
+        for cells, top, font_size, total_row in rows:
+            if font_size != current_size:
+                text.setFont(self.font, font_size, NOTE_CELL_LEADING)
+                current_size = font_size
+            for column, cell in enumerate(cells):
+                for line_num, line in enumerate(str(cell).split("\n")):
+                    if not line:
+                        continue
+                    width = pdfmetrics.stringWidth(line, self.font, font_size)
+                    if column == 0 and total_row:
+                        # "Total" spans the first two columns and is right aligned
+                        x = NOTE_COLUMN_X[2] - NOTE_CELL_SIDE_PADDING - width
+                    elif column == 0:
+                        x = NOTE_COLUMN_X[0] + NOTE_CELL_SIDE_PADDING
+                    else:
+                        x = (NOTE_COLUMN_X[column] + NOTE_COLUMN_X[column + 1] - width) / 2
+                    text.setTextOrigin(x, self._y(top + NOTE_CELL_PADDING + font_size + line_num*NOTE_CELL_LEADING))
+                    text.textOut(line)
+        self.canv.drawText(text)
+
+    def _stroke_grid(self, boundaries, top_line, total_row_top=None):
+        """Stroke the grid of one page's part of the table, given the row boundaries from top to bottom."""
+        top, bottom = boundaries[0], boundaries[-1]
+        lines = [(NOTE_TABLE_LEFT, self._y(y), NOTE_COLUMN_X[3], self._y(y)) for y in boundaries[0 if top_line else 1:]]
+        for column, x in enumerate(NOTE_COLUMN_X):
+            # The total row merges the first two columns
+            column_bottom = total_row_top if column == 1 and total_row_top is not None else bottom
+            if column_bottom > top:
+                lines.append((x, self._y(top), x, self._y(column_bottom)))
+        self.canv.setLineWidth(1)
+        self.canv.lines(lines)
+
+    def _draw_table(self, page_lessons, course_name) -> float:
+        """Draw the lesson table and return where it ends, continuing on new pages if needed."""
+        canv = self.canv
+        canv.doForm(self.TABLE_HEADER_FORM)
+        rows = []
+        for lesson in page_lessons:
+            desc = f"補堂 -- {lesson['makeup']} ({lesson['date']})" if lesson["makeup"] else f"{course_name} ({lesson['date']}) - {lesson['amount']} HKD" 
+            rows.append(([desc, lesson['payment'], lesson['status']], 10, False))
+        rows.append((["Total 總數", "", f"${lesson_total(page_lessons):,} HKD"], 12, True))
+
+        row_height = NOTE_CELL_LEADING + 2*NOTE_CELL_PADDING
+        top = NOTE_TABLE_TOP + 2*NOTE_CELL_LEADING + 2*NOTE_CELL_PADDING
+        page_rows, boundaries, top_line, total_row_top = [], [top], False, None
+        for cells, font_size, total_row in rows:
+            if top + row_height > NOTE_BOTTOM:
+                # Like a split platypus Table, the rest continues at the top of the next page
+                self._draw_rows(page_rows)
+                self._stroke_grid(boundaries, top_line)
+                canv.showPage()
+                top = NOTE_TOP
+                page_rows, boundaries, top_line = [], [top], True
+            page_rows.append((cells, top, font_size, total_row))
+            if total_row:
+                total_row_top = top
+            top += row_height
+            boundaries.append(top)
+        self._draw_rows(page_rows)
+        self._stroke_grid(boundaries, top_line, total_row_top)
+        return top
+
+    def _draw_flowable(self, flowable, top) -> float:
+        """Draw a platypus flowable from top, splitting it over new pages like a frame would. Returns where it ends."""
+        canv = self.canv
+        while True:
+            available = NOTE_BOTTOM - top
+            width, height = flowable.wrapOn(canv, NOTE_FRAME_WIDTH, available)
+            parts = [flowable] if height <= available else flowable.split(NOTE_FRAME_WIDTH, available)
+            if parts:
+                if parts[0] is not flowable:
+                    width, height = parts[0].wrapOn(canv, NOTE_FRAME_WIDTH, available)
+                x = NOTE_LEFT + (NOTE_FRAME_WIDTH - width) / 2 if getattr(parts[0], 'hAlign', 'LEFT') == 'CENTER' else NOTE_LEFT
+                parts[0].drawOn(canv, x, self._y(top + height))
+                if len(parts) == 1:
+                    return top + height
+                flowable = parts[1]
+            canv.showPage()
+            top = NOTE_TOP
+
+    def _draw_notes(self, note, top):
+        canv = self.canv
+        top += 20
+        if top + 16 > NOTE_BOTTOM:
+            canv.showPage()
+            top = NOTE_TOP
+        canv.saveState()
+        canv.translate(NOTE_LEFT, self._y(top + 12))
+        canv.doForm(self.NOTES_HEADING_FORM)
+        canv.restoreState()
+        self._draw_flowable(Paragraph(note.replace('\\n', '<br/>'), self.note_style), top + 16 + 6)
+
+    def draw_summary(self, header, rows, total_row, table_style, title="Debit Notes Summary 學費單總覽", rows_per_table=30,
+                     details=(), note=""):
+        """
+        Draw a summary table of several notes, starting on a new page and ending its last page.
+
+        Rows are laid out rows_per_table at a time, each part repeating the header, so a long
+        summary never has to be laid out as one table. details are extra lines under the
+        date, and a note, if given, goes under the table.
+        """
+        canv = self.canv
+        canv.setFont('Helvetica-Bold', 16)
+        canv.drawCentredString(PAGE_WIDTH / 2, self._y(NOTE_TOP + 16), "Louis English Tutorial Lesson")
+        canv.setFont(self.font, 14)
+        canv.drawCentredString(PAGE_WIDTH / 2, self._y(NOTE_TITLE_TOP + 14), title)
+        canv.setFont(self.font, 11)
+        canv.drawString(NOTE_LEFT, self._y(NOTE_INFO_TOP + 11), f"Generated 日期: {datetime.now():%Y-%m-%d}")
+        for line_num, line in enumerate(details, start=1):
+            canv.drawString(NOTE_LEFT, self._y(NOTE_INFO_TOP + 16 * line_num + 11), line)
+
+        # Only the last part ends with the total row
+        part_style = TableStyle([command for command in table_style.getCommands() if command[1][1] != -1])
+        top = NOTE_INFO_TOP + 16 * (len(details) + 1) + 12
+        for first in range(0, len(rows) + 1, rows_per_table):
+            part = rows[first:first + rows_per_table]
+            is_last = first + rows_per_table > len(rows)
+            table = Table([header] + part + ([total_row] if is_last else []), colWidths=[1.6*inch, 2.6*inch, 1.1*inch, 1.1*inch], repeatRows=1)
+            table.setStyle(table_style if is_last else part_style)
+            top = self._draw_flowable(table, top)
+        if note:
+            self._draw_notes(note, top)
+        canv.showPage()
+
+    def draw_page(self, student_name, month, page_lessons, course_name, note):
+        """Draw one month of a debit note, ending its last page."""
+        canv = self.canv
+        canv.doForm(self.CHROME_FORM)
+        canv.setFont(self.font, 11)
+        canv.drawString(self.name_x, self._y(NOTE_INFO_TOP + 11), student_name)
+        canv.setFont(self.font, 12)
+        canv.drawString(NOTE_LEFT, self._y(NOTE_MONTH_TOP + 12), f'{month}月')
+
+        top = self._draw_table(page_lessons, course_name) if page_lessons else NOTE_TABLE_TOP
+        self._draw_notes(note, top)
+        canv.showPage()
+
+    def draw_note(self, student_name, months, lesson_data, course_name, notes):
+        for page_num, page_lessons in enumerate(lesson_data):
+            self.draw_page(student_name, months[page_num], page_lessons, course_name, notes[page_num])
+
+def _lesson_pages(lesson_data) -> list:
+    """Lesson data as a list of pages, a flat list of lessons being a single page."""
+    is_nested = lesson_data and isinstance(lesson_data[0], list)
+    return lesson_data if is_nested else [lesson_data]
+
 def generate_tuition_debit_note(
     filename: str,
     student_name: str,
@@ -151,108 +580,38 @@ def generate_tuition_debit_note(
     lesson_data: list,                  # List of dicts → see example below
     course_name: str,
     notes: list = [],               # Optional notes (e.g. payment received message)
-    output_path: str = get_output_dir()
+    output_path: str = None,        # defaults to get_output_dir()
+    engine: str = "platypus"        # "platypus" or "canvas", see CanvasDebitNoteRenderer
 ) -> None:
     """
     Generates a Tuition Fee Debit Note that looks identical to your PDF.
     """
+    if engine not in ("platypus", "canvas"):
+        raise ValueError(f"Unknown rendering engine: {engine}")
     chinese_font = register_chinese_font()
     
-    full_pdf_path = os.path.join(output_path, filename)
-    doc = SimpleDocTemplate(full_pdf_path, pagesize=A4, topMargin=0.8*inch, bottomMargin=0.8*inch)
-    elements = []
-    styles, table_style = set_tuition_debit_note_style(chinese_font)
+    full_pdf_path = os.path.join(output_path or get_output_dir(), filename)
 
-    is_nested = lesson_data and isinstance(lesson_data[0], list)
-    if not is_nested:
-        lesson_data = [lesson_data]
+    lesson_data = _lesson_pages(lesson_data)
     
     if len(notes) < len(lesson_data):
         notes = notes + ["" for _ in range(len(lesson_data) - 1)]
 
-    for page_num, page_lessons in enumerate(lesson_data, start=0):
-        # 1. Header
-        header = Paragraph("Louis English Tutorial Lesson", styles['TitleCenter'])
-        elements.append(header)
-        elements.append(Spacer(1, 6))
-
-        # 2. Main title (bilingual)
-        title = Paragraph("Tuition Fee Debit Note<br/><br/>學費單", styles['BilingualTitle'])
-        elements.append(title)
-
-        # 3. Student & Tutor info
-        info = Paragraph(
-            f"Student Name 學生姓名: <b>{student_name}</b><br/>"
-            f"Tutor Name 導師姓名: <b>Louis Tsang</b>",
-            styles['ChineseNormal']
-        )
-        elements.append(info)
-        elements.append(Spacer(1, 12))
-
-        # 4. Month
-        month_style = ParagraphStyle(
-            name='Month',
-            fontName=chinese_font,
-            fontSize=12,
-            leading=10,
-            alignment=TA_LEFT,
-            spaceAfter=8
-        )
-        elements.append(Paragraph(f'{months[page_num]}月', month_style))
-        elements.append(Spacer(1, 12))
-         # 1. Header with student name and page number
-        header_style = ParagraphStyle(
-            name='Header',
-            fontName=chinese_font,
-            fontSize=18,
-            leading=22,
-            alignment=TA_CENTER,
-            spaceAfter=12
-        )
-        
-        if page_lessons:
-            # 5. Table data
-            table_data = [
-                ["Tuition Fees\n學費", "Payment\n付款狀態", "Lesson\n課堂狀態"]
-            ]
+    if engine == "canvas":
+        canv = canvas.Canvas(full_pdf_path, pagesize=A4)
+        CanvasDebitNoteRenderer(canv, chinese_font).draw_note(student_name, months, lesson_data, course_name, notes)
+        canv.save()
+        print(f"Tuition debit note generated: {filename}")
+        return
 
-            for lesson in page_lessons:
-                desc = f"補堂 -- {lesson['makeup']} ({lesson['date']})" if lesson["makeup"] else f"{course_name} ({lesson['date']}) - {lesson['amount']} HKD" 
-                row = [
-                    desc,
-                    lesson['payment'],
-                    lesson['status']
-                ]
-                table_data.append(row)
-
-            # Add total row with proper spacing
-            total = reduce(lambda curr, next: curr + next, [int(lesson["amount"]) for lesson in page_lessons if lesson["makeup"] is None])
-            table_data.append(["Total 總數", "", f"${total:,} HKD"])
-
-            # 6. Table styling with fixed borders
-            table = Table(table_data, colWidths=[3.8*inch, 1.3*inch, 1.3*inch])
-            
-            table.setStyle(table_style)
-            elements.append(table)
-
-        # 7. Optional Notes
-        elements.append(Spacer(1, 20))
-        note_header = ParagraphStyle(
-            name='NoteHeader',
-            fontName=chinese_font,
-            fontSize=12,
-            leading=16,
-            spaceAfter=6
-        )
-        elements.append(Paragraph("<b>Notes 備註</b>", note_header))
-        note_style = ParagraphStyle(
-            name='NoteBody',
-            fontName=chinese_font,
-            fontSize=10,
-            leading=14
-        )
-        formatted_notes = notes[page_num].replace('\\n', '<br/>')
-        elements.append(Paragraph(formatted_notes, note_style))
+    doc = SimpleDocTemplate(full_pdf_path, pagesize=A4, topMargin=0.8*inch, bottomMargin=0.8*inch)
+    elements = []
+    styles, table_style = set_tuition_debit_note_style(chinese_font)
+
+    for page_num, page_lessons in enumerate(lesson_data, start=0):
+        elements.extend(debit_note_page_elements(
+            styles, table_style, chinese_font, student_name, months[page_num], page_lessons, course_name, notes[page_num]
+        ))
         
                 # Add page break if not the last page
         if page_num < len(lesson_data):
@@ -262,7 +621,386 @@ def generate_tuition_debit_note(
     doc.build(elements)
     print(f"Tuition debit note generated: {filename}")
 
+async def _report_progress(progress, done, total):
+    result = progress(done, total)
+    if inspect.isawaitable(result):
+        await result
+
+def _write_file(path, data: bytes):
+    # Written next to the target and moved into place, so nobody ever sees half a PDF
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.part"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+async def render_tuition_debit_note(student_name: str, months: list, lesson_data: list, course_name: str,
+                                    notes: list = (), filename: str = None, output_path: str = None,
+                                    progress=None, timeout: float = None, executor=None) -> str | bytes:
+    """
+    Render a debit note without blocking the event loop, the way every caller should.
+
+    Each month's page is drawn with the canvas engine in executor (the loop's default one
+    unless given) and control returns to the loop between pages, so cancelling the task
+    or going over timeout seconds (asyncio.TimeoutError) stops before the next page and
+    never leaves a partial file. progress(done_pages, total_pages) is called after every
+    page, and awaited if it returns an awaitable. Returns the path written, or the PDF
+    bytes when no filename is given.
+    """
+    return await asyncio.wait_for(
+        _render_tuition_debit_note(student_name, months, lesson_data, course_name, notes, filename, output_path,
+                                   progress, executor),
+        timeout
+    )
+
+async def _render_tuition_debit_note(student_name, months, lesson_data, course_name, notes, filename, output_path,
+                                     progress, executor):
+    loop = asyncio.get_running_loop()
+    chinese_font = await loop.run_in_executor(executor, register_chinese_font)
+    pages = _lesson_pages(lesson_data)
+    notes = [notes] if isinstance(notes, str) else list(notes)
+    notes += [""] * (len(pages) - len(notes))
+
+    buffer = BytesIO()
+    canv = canvas.Canvas(buffer, pagesize=A4)
+    renderer = await loop.run_in_executor(executor, CanvasDebitNoteRenderer, canv, chinese_font)
+    for page_num, page_lessons in enumerate(pages):
+        await loop.run_in_executor(
+            executor, renderer.draw_page, student_name, months[page_num], page_lessons, course_name, notes[page_num]
+        )
+        if progress:
+            await _report_progress(progress, page_num + 1, len(pages))
+    await loop.run_in_executor(executor, canv.save)
+
+    if filename is None:
+        return buffer.getvalue()
+    full_pdf_path = os.path.join(output_path or get_output_dir(), filename)
+    await loop.run_in_executor(executor, _write_file, full_pdf_path, buffer.getvalue())
+    print(f"Tuition debit note generated: {filename}")
+    return full_pdf_path
+
+def _year_month_label(year_month: int) -> str:
+    return f"{year_month // 100}-{year_month % 100:02d}"
+
+async def render_tuition_statement(student_name: str, months: list, start=None, end=None, notes: str = "",
+                                   filename: str = None, output_path: str = None, progress=None,
+                                   timeout: float = None, executor=None) -> str | bytes:
+    """
+    Render a statement of one student's lessons over a range of months, e.g. a whole year:
+    a summary page listing every month's lessons and fees, then a page per month.
+
+    months are (year_month, course_name, lessons) tuples, year_month like 202511, as
+    TuitionLedger.statement_months returns them; they are drawn by real year-month,
+    oldest first. The whole statement is one canvas and one CanvasDebitNoteRenderer, so
+    fonts, styles and the page chrome forms are set up once however many months it
+    has. start and end ('2025-01') are printed as the period, defaulting to the first
+    and last month; notes go on the summary page. Otherwise like render_tuition_debit_note.
+    """
+    return await asyncio.wait_for(
+        _render_tuition_statement(student_name, months, start, end, notes, filename, output_path, progress, executor),
+        timeout
+    )
+
+async def _render_tuition_statement(student_name, months, start, end, notes, filename, output_path, progress, executor):
+    if not months:
+        raise ValueError(f"No lessons to put on {student_name}'s statement")
+    loop = asyncio.get_running_loop()
+    chinese_font = await loop.run_in_executor(executor, register_chinese_font)
+    _, table_style = await loop.run_in_executor(executor, set_tuition_debit_note_style, chinese_font)
+    months = sorted(months, key=lambda month: month[0])
+
+    rows = []
+    grand_total = 0
+    for year_month, course_name, lessons in months:
+        total = lesson_total(lessons)
+        grand_total += total
+        rows.append([_year_month_label(year_month), course_name, str(len(lessons)), f"${total:,}"])
+    lesson_count = sum(len(lessons) for _, _, lessons in months)
+    period = f"{start or _year_month_label(months[0][0])} to {end or _year_month_label(months[-1][0])}"
+
+    buffer = BytesIO()
+    canv = canvas.Canvas(buffer, pagesize=A4)
+    canv.setTitle(f"Tuition Statement {student_name} {period}")
+    renderer = await loop.run_in_executor(executor, CanvasDebitNoteRenderer, canv, chinese_font)
+    canv.bookmarkPage("summary")
+    canv.addOutlineEntry("Summary 總覽", "summary", level=0)
+    await loop.run_in_executor(
+        executor, partial(
+            renderer.draw_summary,
+            ["Month\n月份", "Course\n課程", "Lessons\n堂數", "Total\n總數"], rows,
+            ["Total 總數", "", f"{lesson_count} lessons", f"${grand_total:,} HKD"], table_style,
+            title="Tuition Statement 學費結算單",
+            details=[f"Student Name 學生姓名: {student_name}", f"Period 期間: {period}"],
+            note=notes,
+        )
+    )
+    if progress:
+        await _report_progress(progress, 1, len(months) + 1)
+
+    for page_num, (year_month, course_name, lessons) in enumerate(months):
+        year, month = divmod(year_month, 100)
+        key = f"month{page_num}"
+        canv.bookmarkPage(key)
+        canv.addOutlineEntry(f"{year}年{month}月 {course_name}", key, level=0)
+        # draw_page adds the 月
+        await loop.run_in_executor(executor, renderer.draw_page, student_name, f"{year}年{month}", lessons, course_name, "")
+        if progress:
+            await _report_progress(progress, page_num + 2, len(months) + 1)
+    await loop.run_in_executor(executor, canv.save)
+
+    if filename is None:
+        return buffer.getvalue()
+    full_pdf_path = os.path.join(output_path or get_output_dir(), filename)
+    await loop.run_in_executor(executor, _write_file, full_pdf_path, buffer.getvalue())
+    print(f"Tuition statement generated: {filename}")
+    return full_pdf_path
+
+def render_tuition_debit_note_page(student_name: str, month: int, page_lessons: list, course_name: str, note: str = "",
+                                   engine: str = "platypus") -> bytes:
+    """Render a single month's page of a debit note to PDF bytes, used for previews."""
+    if engine not in ("platypus", "canvas"):
+        raise ValueError(f"Unknown rendering engine: {engine}")
+    chinese_font = register_chinese_font()
+    buffer = BytesIO()
+    if engine == "canvas":
+        canv = canvas.Canvas(buffer, pagesize=A4)
+        CanvasDebitNoteRenderer(canv, chinese_font).draw_note(student_name, [month], [page_lessons], course_name, [note])
+        canv.save()
+        return buffer.getvalue()
+
+    styles, table_style = set_tuition_debit_note_style(chinese_font)
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.8*inch, bottomMargin=0.8*inch)
+    doc.build(debit_note_page_elements(styles, table_style, chinese_font, student_name, month, page_lessons, course_name, note))
+    return buffer.getvalue()
+
+
+def _render_debit_note_chunk(records, chinese_font) -> tuple[bytes, list]:
+    """Draw the notes of a few students into one PDF. Returns it and its [level, title, page] outline."""
+    buffer = BytesIO()
+    canv = canvas.Canvas(buffer, pagesize=A4)
+    renderer = CanvasDebitNoteRenderer(canv, chinese_font)
+    outline = []
+    for record in records:
+        lesson_data = _lesson_pages(record["lesson_data"])
+        notes = list(record.get("notes") or [])
+        notes += [""] * (len(lesson_data) - len(notes))
+        outline.append([1, f"{record['student_name']} - {record['course_name']}", canv.getPageNumber()])
+        for page_num, page_lessons in enumerate(lesson_data):
+            month = record["months"][page_num]
+            outline.append([2, f"{month}月", canv.getPageNumber()])
+            renderer.draw_page(record["student_name"], month, page_lessons, record["course_name"], notes[page_num])
+    canv.save()
+    return buffer.getvalue(), outline
+
+def _add_outline_items(doc, root: int, outline: list, offset: int, previous: int = 0) -> tuple[int, int]:
+    """
+    Write a chunk's [level, title, page] outline (levels 1 and 2, pages counted from 1
+    after offset) into doc as bookmarks under the outline root, following the top-level
+    bookmark previous. Returns the chunk's first and last top-level bookmark.
+
+    Written with the chunk rather than with set_toc at the end, which builds every
+    bookmark of the document in memory at once.
+    """
+    items = []      # [xref, title, page, children]
+    for level, title, page in outline:
+        item = [doc.get_new_xref(), title, page, []]
+        if level == 1:
+            items.append(item)
+        else:
+            items[-1][3].append(item)
+
+    def write(siblings, parent, before=0):
+        for i, (xref, title, page, children) in enumerate(siblings):
+            fields = [f"/Title {pymupdf.get_pdf_str(title)}", f"/Parent {parent} 0 R",
+                      f"/Dest [{doc.page_xref(offset + page - 1)} 0 R /XYZ 0 {A4[1]:g} 0]"]
+            if i or before:
+                fields.append(f"/Prev {siblings[i - 1][0] if i else before} 0 R")
+            if i + 1 < len(siblings):
+                fields.append(f"/Next {siblings[i + 1][0]} 0 R")
+            if children:
+                # Collapsed, showing only the students until one is opened
+                fields.append(f"/First {children[0][0]} 0 R /Last {children[-1][0]} 0 R /Count -{len(children)}")
+                write(children, xref)
+            doc.update_object(xref, f"<<{' '.join(fields)}>>")
+
+    if not items:
+        return 0, previous
+    write(items, root, previous)
+    if previous:
+        doc.xref_set_key(previous, "Next", f"{items[0][0]} 0 R")
+    return items[0][0], items[-1][0]
+
+def _xref_key(doc, xref: int, key: str) -> int:
+    """The object an indirect reference like '12 0 R' under key points to."""
+    return int(doc.xref_get_key(xref, key)[1].split()[0])
+
+def _group_new_pages(doc, first: int):
+    """
+    Move the pages from first on, just appended with insert_pdf, out of their parent
+    into a page tree node of their own under the root. Otherwise every page hangs off
+    one node that each incremental save writes out again, making the file and the time
+    to build it grow with the square of the page count.
+    """
+    root = _xref_key(doc, doc.pdf_catalog(), "Pages")
+    pages = [doc.page_xref(i) for i in range(first, doc.page_count)]
+    parent = _xref_key(doc, pages[0], "Parent")
+    moved = set(pages)
+    kids = [int(xref) for xref in re.findall(r"(\d+) 0 R", doc.xref_get_key(parent, "Kids")[1])]
+    doc.xref_set_key(parent, "Kids", "[" + " ".join(f"{xref} 0 R" for xref in kids if xref not in moved) + "]")
+    if parent != root:
+        doc.xref_set_key(parent, "Count", str(int(doc.xref_get_key(parent, "Count")[1]) - len(pages)))
+    node = doc.get_new_xref()
+    doc.update_object(node, f"<</Type /Pages /Parent {root} 0 R /Kids [{' '.join(f'{xref} 0 R' for xref in pages)}] /Count {len(pages)}>>")
+    for xref in pages:
+        doc.xref_set_key(xref, "Parent", f"{node} 0 R")
+    root_kids = doc.xref_get_key(root, "Kids")[1]
+    doc.xref_set_key(root, "Kids", f"{root_kids[:-1].rstrip()} {node} 0 R]")
+
+def generate_combined_debit_notes(filename: str, records: list, output_path: str = None, chunk_size: int = 20) -> str:
+    """
+    Generate one PDF with the debit notes of many students, a summary first page and a
+    bookmark per student and month.
+
+    records are dicts of generate_tuition_debit_note's student_name, months, lesson_data,
+    course_name and notes arguments, read once for the summary and once for the notes.
+    The notes are drawn with the canvas engine chunk_size students at a time and each
+    finished chunk is appended to the file on disk with an incremental save, so memory
+    does not grow with the number of students the way one SimpleDocTemplate.build does.
+    """
+    chinese_font = register_chinese_font()
+    full_pdf_path = os.path.join(output_path or get_output_dir(), filename)
+    _, table_style = set_tuition_debit_note_style(chinese_font)
+
+    rows = []
+    grand_total = 0
+    for record in records:
+        total = sum(lesson_total(page_lessons) for page_lessons in _lesson_pages(record["lesson_data"]))
+        grand_total += total
+        rows.append([record["student_name"], record["course_name"], ", ".join(f"{month}月" for month in record["months"]), f"${total:,}"])
+
+    buffer = BytesIO()
+    canv = canvas.Canvas(buffer, pagesize=A4)
+    canv.setTitle("Tuition Fee Debit Notes")
+    CanvasDebitNoteRenderer(canv, chinese_font).draw_summary(
+        ["Student\n學生", "Course\n課程", "Months\n月份", "Total\n總數"], rows,
+        ["Total 總數", "", f"{len(rows)} notes", f"${grand_total:,} HKD"], table_style
+    )
+    canv.save()
+    del rows
+
+    # Built in a .part file that each chunk is appended to with an incremental save, so
+    # MuPDF only ever holds one chunk, not the whole document, until it is moved into place
+    temp_path = f"{full_pdf_path}.part"
+    _write_file(temp_path, buffer.getvalue())
+    del buffer
+    try:
+        with pymupdf_lock, pymupdf.open(temp_path) as combined:
+            # Only linked into the catalog at the end, so reopening the file never loads the bookmarks
+            root = combined.get_new_xref()
+            combined.update_object(root, "<</Type /Outlines>>")
+            first, last = _add_outline_items(combined, root, [[1, "Summary 總覽", 1]], 0)
+            combined.save(temp_path, incremental=True, encryption=pymupdf.PDF_ENCRYPT_KEEP)
+        top_level = 1
+        for start in range(0, len(records), chunk_size):
+            # Only the MuPDF calls hold its lock, chunks are drawn while previews can still rasterize
+            chunk, outline = _render_debit_note_chunk(records[start:start + chunk_size], chinese_font)
+            with pymupdf_lock, pymupdf.open(temp_path) as combined, pymupdf.open(stream=chunk, filetype="pdf") as chunk_doc:
+                offset = combined.page_count
+                combined.insert_pdf(chunk_doc)
+                _, last = _add_outline_items(combined, root, outline, offset, last)
+                _group_new_pages(combined, offset)
+                combined.save(temp_path, incremental=True, encryption=pymupdf.PDF_ENCRYPT_KEEP)
+            top_level += sum(1 for level, _, _ in outline if level == 1)
+        with pymupdf_lock, pymupdf.open(temp_path) as combined:
+            combined.update_object(root, f"<</Type /Outlines /First {first} 0 R /Last {last} 0 R /Count {top_level}>>")
+            combined.xref_set_key(combined.pdf_catalog(), "Outlines", f"{root} 0 R")
+            combined.save(temp_path, incremental=True, encryption=pymupdf.PDF_ENCRYPT_KEEP)
+        os.replace(temp_path, full_pdf_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    print(f"Combined debit notes generated: {filename}")
+    return full_pdf_path
+
+def generate_revenue_report_pdf(filename: str, summary: dict) -> str:
+    """Generate a revenue summary PDF from reports.summarize output."""
+    chinese_font = register_chinese_font()
+    styles, table_style = set_tuition_debit_note_style(chinese_font)
+    doc = SimpleDocTemplate(filename, pagesize=A4, topMargin=0.8*inch, bottomMargin=0.8*inch)
+    elements = [
+        Paragraph("Louis English Tutorial Lesson", styles['TitleCenter']),
+        Paragraph("Revenue Report 收入報告", styles['BilingualTitle']),
+        Paragraph(
+            f"Generated 日期: {datetime.now():%Y-%m-%d}<br/>"
+            f"Students 學生: <b>{summary['students']}</b> | Lessons 課堂: <b>{summary['lessons']}</b><br/>"
+            f"Billed 應收: <b>${summary['billed_total']:,} HKD</b> | Paid 已付: <b>${summary['paid_total']:,} HKD</b> | "
+            f"Pending 未付: <b>${summary['pending_total']:,} HKD</b><br/>"
+            f"Cancellation rate 取消率: <b>{summary['cancellation_rate']:.1%}</b> | "
+            f"Make-up lessons 補堂: <b>{summary['makeup_lessons']}</b>",
+            styles['ChineseNormal']
+        ),
+        Spacer(1, 12),
+    ]
+
+    month_rows = [["Month\n月份", "Revenue\n收入", "Paid\n已付", "Pending\n未付", "Lessons\n課堂", "Cancelled\n取消率", "Make-up\n補堂"]]
+    for entry in summary["by_month"]:
+        year, month = divmod(entry["year_month"], 100)
+        month_rows.append([
+            f"{year}-{month:02d}", f"${entry['revenue']:,}", f"${entry['paid']:,}", f"${entry['pending']:,}",
+            entry["lessons"], f"{entry['cancellation_rate']:.1%}", entry["makeup_lessons"]
+        ])
+    # The first two columns are merged for the label, so the billed total is in the summary above
+    month_rows.append([
+        "Total 總數", "", f"${summary['paid_total']:,}", f"${summary['pending_total']:,}",
+        summary["lessons"], f"{summary['cancellation_rate']:.1%}", summary["makeup_lessons"]
+    ])
+    month_table = Table(month_rows, colWidths=[1.0*inch] + [0.9*inch] * 6, repeatRows=1)
+    month_table.setStyle(table_style)
+    elements.append(month_table)
+    elements.append(Spacer(1, 20))
+
+    if summary["pending_by_student"]:
+        pending_rows = [["Student\n學生", "", "Pending\n未付"]]
+        pending_rows += [[entry["student_name"], "", f"${entry['pending']:,} HKD"] for entry in summary["pending_by_student"]]
+        pending_rows.append(["Total 總數", "", f"${summary['pending_total']:,} HKD"])
+        pending_table = Table(pending_rows, colWidths=[3.8*inch, 1.3*inch, 1.3*inch], repeatRows=1)
+        pending_table.setStyle(table_style)
+        elements.append(pending_table)
+
+    doc.build(elements)
+    print(f"Revenue report generated: {filename}")
+    return filename
+
 
 # testing
+def _compare_engines(student_name, month, page_lessons, course_name, note, dpi=100) -> float:
+    """Render one page with both engines and return the largest fraction of differing pixels on any page."""
+    import numpy as np
+    import pymupdf
+
+    def rasterize(pdf_bytes):
+        with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+            return [np.frombuffer(page.get_pixmap(dpi=dpi, colorspace=pymupdf.csGRAY).samples, dtype=np.uint8) for page in doc]
+
+    platypus_pages = rasterize(render_tuition_debit_note_page(student_name, month, page_lessons, course_name, note))
+    canvas_pages = rasterize(render_tuition_debit_note_page(student_name, month, page_lessons, course_name, note, engine="canvas"))
+    if len(platypus_pages) != len(canvas_pages):
+        raise AssertionError(f"page count differs: {len(platypus_pages)} platypus, {len(canvas_pages)} canvas")
+    # Anti-aliasing differs by a few grey levels, only count clearly different pixels
+    return max(float((np.abs(a.astype(int) - b.astype(int)) > 64).mean()) for a, b in zip(platypus_pages, canvas_pages))
+
 if __name__ == "__main__":
-    print("Testing...")
\ No newline at end of file
+    print("Testing...")
+    lesson = {"date": "2025-11-03", "payment": "Paid 已付", "status": "Completed 完成", "amount": "250", "makeup": None}
+    makeup = dict(lesson, makeup="2025-10-27", payment="", amount="")
+    cases = {
+        "single page": ([lesson, makeup, lesson], "Payment received\\nThank you"),
+        "table overflow": ([dict(lesson, date=f"2025-11-{day:02d}") for day in range(1, 41)], "long note " * 200),
+        "no lessons": ([], ""),
+    }
+    for name, (page_lessons, note) in cases.items():
+        difference = _compare_engines("陳大文", 11, page_lessons, "Junior English Course 初中英文課程", note)
+        print(f"{name}: {difference:.6%} of pixels differ")
+        assert difference < 0.001, name
+    print("Canvas and platypus engines render the same pages")
@@ -0,0 +1,153 @@
+import asyncio, json, logging, pickle, sqlite3, threading
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+PERSISTENCE_PATH = "bot_state.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (user_id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS chat_data (chat_id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS singletons (name TEXT PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS conversations (
+    name TEXT NOT NULL,
+    conversation_key TEXT NOT NULL,
+    state BLOB NOT NULL,
+    PRIMARY KEY (name, conversation_key)
+);
+"""
+
+# Marks a pending delete in the write-behind buffer
+_DELETE = object()
+
+class SQLitePersistence(BasePersistence):
+    """
+    Stores conversation states, user_data, chat_data and bot_data in SQLite.
+
+    Every user, chat and conversation is its own row, and only the ones PTB reports as
+    changed are written, so a save costs the same however many conversations exist.
+    Writes are buffered and committed together in one transaction, write_delay seconds
+    after the first one, from a worker thread. Loading on start is a handful of SELECTs.
+    """
+    def __init__(self, path: str = PERSISTENCE_PATH, update_interval: float = 5, write_delay: float = 0.5,
+                 store_data: PersistenceInput = None):
+        super().__init__(store_data=store_data, update_interval=update_interval)
+        self.path = path
+        self.write_delay = write_delay
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._db_lock = threading.Lock()
+        self._pending = {}    # (table, key) -> pickled value or _DELETE
+        self._flush_task = None
+        self._write_lock = asyncio.Lock()   # keeps batches committing in the order they were taken
+        self.writes = 0       # rows written, for monitoring
+
+    # ---- Loading ----
+
+    def _load(self, query, params=()):
+        with self._db_lock:
+            return self._conn.execute(query, params).fetchall()
+
+    async def get_user_data(self) -> dict:
+        return {user_id: pickle.loads(data) for user_id, data in self._load("SELECT user_id, data FROM user_data")}
+
+    async def get_chat_data(self) -> dict:
+        return {chat_id: pickle.loads(data) for chat_id, data in self._load("SELECT chat_id, data FROM chat_data")}
+
+    async def _get_singleton(self, name, default):
+        rows = self._load("SELECT data FROM singletons WHERE name = ?", (name,))
+        return pickle.loads(rows[0][0]) if rows else default
+
+    async def get_bot_data(self) -> dict:
+        return await self._get_singleton("bot_data", {})
+
+    async def get_callback_data(self):
+        return await self._get_singleton("callback_data", None)
+
+    async def get_conversations(self, name: str) -> dict:
+        rows = self._load("SELECT conversation_key, state FROM conversations WHERE name = ?", (name,))
+        return {tuple(json.loads(key)): pickle.loads(state) for key, state in rows}
+
+    # ---- Write-behind buffer ----
+
+    def _queue_write(self, table, key, value):
+        self._pending[(table, key)] = value if value is _DELETE else pickle.dumps(value)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.write_delay)
+        await self._write_pending()
+
+    async def _write_pending(self):
+        async with self._write_lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            await asyncio.to_thread(self._write, pending)
+
+    def _write(self, pending):
+        upserts = {"user_data": [], "chat_data": [], "singletons": [], "conversations": []}
+        deletes = {"user_data": [], "chat_data": [], "conversations": []}
+        for (table, key), value in pending.items():
+            row_key = key if isinstance(key, tuple) else (key,)
+            if value is _DELETE:
+                deletes[table].append(row_key)
+            else:
+                upserts[table].append(row_key + (value,))
+        with self._db_lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO user_data (user_id, data) VALUES (?, ?)", upserts["user_data"])
+            self._conn.executemany("INSERT OR REPLACE INTO chat_data (chat_id, data) VALUES (?, ?)", upserts["chat_data"])
+            self._conn.executemany("INSERT OR REPLACE INTO singletons (name, data) VALUES (?, ?)", upserts["singletons"])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO conversations (name, conversation_key, state) VALUES (?, ?, ?)", upserts["conversations"]
+            )
+            self._conn.executemany("DELETE FROM user_data WHERE user_id = ?", deletes["user_data"])
+            self._conn.executemany("DELETE FROM chat_data WHERE chat_id = ?", deletes["chat_data"])
+            self._conn.executemany("DELETE FROM conversations WHERE name = ? AND conversation_key = ?", deletes["conversations"])
+        self.writes += len(pending)
+
+    # ---- Updates from the application ----
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        self._queue_write("user_data", user_id, data)
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        self._queue_write("chat_data", chat_id, data)
+
+    async def update_bot_data(self, data) -> None:
+        self._queue_write("singletons", "bot_data", data)
+
+    async def update_callback_data(self, data) -> None:
+        self._queue_write("singletons", "callback_data", data)
+
+    async def update_conversation(self, name: str, key: tuple, new_state) -> None:
+        conversation_key = (name, json.dumps(list(key)))
+        # An ended conversation has no state left to restore
+        self._queue_write("conversations", conversation_key, _DELETE if new_state is None else new_state)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._queue_write("user_data", user_id, _DELETE)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._queue_write("chat_data", chat_id, _DELETE)
+
+    # The data held by the application is always the most recent, nothing to refresh
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    async def flush(self) -> None:
+        """Write everything still buffered, called by the application when it shuts down."""
+        await self._write_pending()
+        # A scheduled write still waiting for its delay has nothing left to do
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        logger.info("Persistence flushed to %s", self.path)
@@ -0,0 +1,52 @@
+import threading
+from collections import OrderedDict
+import pymupdf
+from pdf_utils import render_tuition_debit_note_page, pymupdf_lock
+
+PREVIEW_DPI = 48
+
+def rasterize_pdf(pdf_bytes: bytes, dpi: int = PREVIEW_DPI) -> list[bytes]:
+    """Render every page of a PDF to a low resolution PNG image."""
+    with pymupdf_lock:
+        with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+            return [page.get_pixmap(dpi=dpi).tobytes("png") for page in doc]
+
+class DebitNotePreviewCache:
+    """
+    Preview images of debit note pages, keyed by everything that affects a page's layout.
+
+    Each month of a note is rendered on its own, so editing the notes of one page
+    only re-renders that page. Least recently used pages are dropped past max_pages.
+    """
+    def __init__(self, max_pages: int = 128, engine: str = "canvas"):
+        self.max_pages = max_pages
+        self.engine = engine
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def page_key(student_name, month, page_lessons, course_name, note) -> tuple:
+        lessons = tuple(tuple(lesson.items()) for lesson in page_lessons)
+        return student_name, month, course_name, note, lessons
+
+    def get(self, key):
+        with self._lock:
+            images = self._pages.get(key)
+            if images is not None:
+                self._pages.move_to_end(key)
+            return images
+
+    def render(self, student_name, month, page_lessons, course_name, note="") -> list[bytes]:
+        """Return the PNG images of one month's page, rendering them if they are not cached."""
+        key = self.page_key(student_name, month, page_lessons, course_name, note)
+        images = self.get(key)
+        if images is not None:
+            return images
+
+        pdf_bytes = render_tuition_debit_note_page(student_name, month, page_lessons, course_name, note, engine=self.engine)
+        images = rasterize_pdf(pdf_bytes)
+        with self._lock:
+            self._pages[key] = images
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        return images
@@ -0,0 +1,361 @@
+"""
+Render PDFs in worker processes instead of the bot's own.
+
+The bot submits render jobs to the queue named by RENDER_QUEUE and waits for the result;
+workers started with the same RENDER_QUEUE (or --queue)
+
+    RENDER_QUEUE=render_jobs.db python render_queue.py
+
+take jobs one at a time, render them with pdf_utils and store the PDF back for the bot
+to send. Start more workers to render more PDFs at once. A SQLite file works for
+workers on the same machine, a redis:// URL (Redis or anything speaking its protocol)
+for workers on other machines too. On a host where each process gets its own disk
+(Heroku and the like), add a Procfile line
+
+    render: python render_queue.py
+
+only with RENDER_QUEUE set to the same redis:// URL for both processes.
+"""
+import argparse, asyncio, json, logging, os, socket, sqlite3, threading, time
+from io import BytesIO
+from pdf_utils import render_tuition_debit_note, generate_vocabulary_pdf, generate_class_vocabulary_pdfs
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# ---- What a job renders ----
+
+async def _render_debit_note(student_name, months, lesson_data, course_name, notes=(), progress=None, timeout=None) -> bytes:
+    return await render_tuition_debit_note(
+        student_name, months, lesson_data, course_name, notes, progress=progress, timeout=timeout
+    )
+
+async def _render_vocabulary(vocab_data, title_text=None, progress=None, timeout=None) -> bytes:
+    pdf = BytesIO()
+    await generate_vocabulary_pdf(pdf, vocab_data, title_text, progress=progress, timeout=timeout)
+    return pdf.getvalue()
+
+async def _render_class_vocabulary(vocab_data, student_names, progress=None, timeout=None) -> bytes:
+    zip_file = BytesIO()
+    await asyncio.wait_for(generate_class_vocabulary_pdfs(zip_file, vocab_data, student_names), timeout)
+    return zip_file.getvalue()
+
+RENDERERS = {
+    "debit_note": _render_debit_note,
+    "vocabulary": _render_vocabulary,
+    "class_vocabulary": _render_class_vocabulary,
+}
+
+async def render_locally(kind: str, payload: dict, progress=None, timeout: float = None) -> bytes:
+    """Render a job in this process. Returns the PDF (or zip of PDFs) as bytes."""
+    return await RENDERERS[kind](**payload, progress=progress, timeout=timeout)
+
+# ---- Queues ----
+
+class RenderJobError(RuntimeError):
+    """A worker could not render the job."""
+
+class JobQueue:
+    """What the bot and the workers need from a queue; see SQLiteJobQueue and RedisJobQueue."""
+    poll_interval = 0.1     # seconds between checks for a finished job
+
+    def submit(self, kind: str, payload: dict) -> int:
+        """Queue a job; payload is stored as JSON, so only plain strings, numbers, lists and dicts."""
+        raise NotImplementedError
+
+    def claim(self, worker: str):
+        """The oldest waiting job as (job_id, kind, payload), now leased to worker, or None."""
+        raise NotImplementedError
+
+    def complete(self, job_id: int, worker: str, result: bytes):
+        raise NotImplementedError
+
+    def fail(self, job_id: int, worker: str, error: str):
+        raise NotImplementedError
+
+    def cancel(self, job_id: int):
+        raise NotImplementedError
+
+    def take_result(self, job_id: int):
+        """(status, result, error) once the job has finished, removing it from the queue, else None."""
+        raise NotImplementedError
+
+    def purge(self, max_age: float):
+        """Forget finished jobs nobody collected within max_age seconds, e.g. after the bot restarted."""
+
+    def counts(self) -> dict:
+        raise NotImplementedError
+
+    async def run(self, kind: str, payload: dict, timeout: float = None) -> bytes:
+        """Submit a job and wait for a worker to render it. Cancelling or timing out withdraws the job."""
+        job_id = await asyncio.to_thread(self.submit, kind, payload)
+        try:
+            return await asyncio.wait_for(self._result(job_id), timeout)
+        except BaseException:
+            self.cancel(job_id)
+            raise
+
+    async def _result(self, job_id: int) -> bytes:
+        while True:
+            finished = await asyncio.to_thread(self.take_result, job_id)
+            if finished is not None:
+                status, result, error = finished
+                if status == DONE:
+                    return result
+                raise RenderJobError(error or f"render job {job_id} was {status}")
+            await asyncio.sleep(self.poll_interval)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS render_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    result BLOB,
+    error TEXT,
+    created REAL NOT NULL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS render_jobs_status ON render_jobs (status, id);
+"""
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Jobs in a SQLite table, for a bot and workers sharing one disk.
+
+    A claimed job is leased to its worker for `lease` seconds. If the worker dies
+    without finishing it, it is handed out again once the lease runs out, at most
+    max_attempts times in all.
+    """
+    def __init__(self, path: str, lease: float = 300, max_attempts: int = 3):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        # Autocommit, transactions are begun explicitly where several statements must go together
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def _execute(self, query: str, params=()):
+        with self._lock:
+            return self._conn.execute(query, params)
+
+    def submit(self, kind: str, payload: dict) -> int:
+        return self._execute(
+            "INSERT INTO render_jobs (kind, payload, status, created) VALUES (?, ?, ?, ?)",
+            (kind, json.dumps(payload), QUEUED, time.time())
+        ).lastrowid
+
+    def claim(self, worker: str):
+        with self._lock:
+            while True:
+                now = time.time()
+                # Taking the write lock first keeps two workers from claiming the same job
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self._conn.execute(
+                        "SELECT id, kind, payload, attempts FROM render_jobs "
+                        "WHERE status = ? OR (status = ? AND lease_until < ?) ORDER BY id LIMIT 1",
+                        (QUEUED, RUNNING, now)
+                    ).fetchone()
+                    if row is None:
+                        self._conn.execute("COMMIT")
+                        return None
+                    job_id, kind, payload, attempts = row
+                    if attempts >= self.max_attempts:
+                        self._conn.execute(
+                            "UPDATE render_jobs SET status = ?, error = ?, finished = ? WHERE id = ?",
+                            (FAILED, f"gave up after {attempts} attempts, the workers stopped while rendering it", now, job_id)
+                        )
+                        self._conn.execute("COMMIT")
+                        continue
+                    self._conn.execute(
+                        "UPDATE render_jobs SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                        (RUNNING, worker, now + self.lease, job_id)
+                    )
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                return job_id, kind, json.loads(payload)
+
+    def _finish(self, job_id: int, worker: str, status: str, result: bytes = None, error: str = None):
+        updated = self._execute(
+            "UPDATE render_jobs SET status = ?, result = ?, error = ?, finished = ? "
+            "WHERE id = ? AND status = ? AND worker = ?",
+            (status, result, error, time.time(), job_id, RUNNING, worker)
+        ).rowcount
+        if not updated:
+            # Cancelled while it was rendering, nobody is waiting for it any more
+            self._execute("DELETE FROM render_jobs WHERE id = ? AND status = ?", (job_id, CANCELLED))
+
+    def complete(self, job_id: int, worker: str, result: bytes):
+        self._finish(job_id, worker, DONE, result=result)
+
+    def fail(self, job_id: int, worker: str, error: str):
+        self._finish(job_id, worker, FAILED, error=error)
+
+    def cancel(self, job_id: int):
+        with self._lock:
+            self._conn.execute("DELETE FROM render_jobs WHERE id = ? AND status IN (?, ?, ?)", (job_id, QUEUED, DONE, FAILED))
+            self._conn.execute("UPDATE render_jobs SET status = ? WHERE id = ? AND status = ?", (CANCELLED, job_id, RUNNING))
+
+    def take_result(self, job_id: int):
+        with self._lock:
+            row = self._conn.execute("SELECT status, result, error FROM render_jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return CANCELLED, None, f"render job {job_id} is gone"
+            if row[0] not in (DONE, FAILED):
+                return None
+            self._conn.execute("DELETE FROM render_jobs WHERE id = ?", (job_id,))
+            return row
+
+    def purge(self, max_age: float):
+        self._execute(
+            "DELETE FROM render_jobs WHERE status IN (?, ?, ?) AND COALESCE(finished, created) < ?",
+            (DONE, FAILED, CANCELLED, time.time() - max_age)
+        )
+
+    def counts(self) -> dict:
+        return dict(self._execute("SELECT status, COUNT(*) FROM render_jobs GROUP BY status").fetchall())
+
+class RedisJobQueue(JobQueue):
+    """
+    Jobs in Redis, or anything speaking its protocol, so workers can run on other
+    machines. Needs the redis package. Each job is a hash, waiting job ids are a list.
+    Unlike SQLiteJobQueue a job whose worker dies is not handed out again; the bot's
+    render timeout ends the wait for it.
+    """
+    def __init__(self, url: str, prefix: str = "render", result_ttl: float = 3600):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("A redis:// render queue needs the redis package: pip install redis") from None
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.result_ttl = int(result_ttl)
+        self._waiting = f"{prefix}:queue"
+
+    def _key(self, job_id) -> str:
+        return f"{self.prefix}:job:{int(job_id)}"
+
+    def submit(self, kind: str, payload: dict) -> int:
+        job_id = self._redis.incr(f"{self.prefix}:next_id")
+        pipe = self._redis.pipeline()
+        pipe.hset(self._key(job_id), mapping={"kind": kind, "payload": json.dumps(payload), "status": QUEUED})
+        pipe.expire(self._key(job_id), self.result_ttl)
+        pipe.lpush(self._waiting, job_id)
+        pipe.execute()
+        return job_id
+
+    def claim(self, worker: str, wait: float = 1):
+        popped = self._redis.brpop(self._waiting, timeout=wait)
+        if popped is None:
+            return None
+        job_id = int(popped[1])
+        kind, payload, status = self._redis.hmget(self._key(job_id), "kind", "payload", "status")
+        if status is None or status.decode() != QUEUED:
+            self._redis.delete(self._key(job_id))   # cancelled while waiting
+            return None
+        self._redis.hset(self._key(job_id), mapping={"status": RUNNING, "worker": worker})
+        return job_id, kind.decode(), json.loads(payload)
+
+    def _finish(self, job_id: int, worker: str, fields: dict):
+        status, owner = self._redis.hmget(self._key(job_id), "status", "worker")
+        if status is None or status.decode() != RUNNING or owner.decode() != worker:
+            self._redis.delete(self._key(job_id))
+            return
+        pipe = self._redis.pipeline()
+        pipe.hset(self._key(job_id), mapping=fields)
+        pipe.expire(self._key(job_id), self.result_ttl)
+        pipe.execute()
+
+    def complete(self, job_id: int, worker: str, result: bytes):
+        self._finish(job_id, worker, {"status": DONE, "result": result})
+
+    def fail(self, job_id: int, worker: str, error: str):
+        self._finish(job_id, worker, {"status": FAILED, "error": error})
+
+    def cancel(self, job_id: int):
+        self._redis.hset(self._key(job_id), "status", CANCELLED)
+        self._redis.expire(self._key(job_id), self.result_ttl)
+
+    def take_result(self, job_id: int):
+        status, result, error = self._redis.hmget(self._key(job_id), "status", "result", "error")
+        if status is None:
+            return CANCELLED, None, f"render job {job_id} is gone"
+        status = status.decode()
+        if status not in (DONE, FAILED):
+            return None
+        self._redis.delete(self._key(job_id))
+        return status, result, error.decode() if error else None
+
+    def counts(self) -> dict:
+        return {QUEUED: self._redis.llen(self._waiting)}
+
+def create_job_queue(url: str) -> JobQueue:
+    """A RedisJobQueue for redis://, rediss:// and unix:// URLs, otherwise a SQLiteJobQueue at that path."""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisJobQueue(url)
+    if url.startswith("sqlite:///"):
+        url = url[len("sqlite:///"):]
+    return SQLiteJobQueue(url)
+
+# ---- Workers ----
+
+async def run_worker(queue: JobQueue, worker_id: str = None, poll_interval: float = 0.2, timeout: float = None,
+                     purge_interval: float = 600, result_max_age: float = 3600):
+    """Take jobs from queue and render them one after another, until cancelled."""
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    logger.info("Render worker %s waiting for jobs", worker_id)
+    purged = 0.0
+    while True:
+        if time.monotonic() - purged >= purge_interval:
+            await asyncio.to_thread(queue.purge, result_max_age)
+            purged = time.monotonic()
+        job = await asyncio.to_thread(queue.claim, worker_id)
+        if job is None:
+            await asyncio.sleep(poll_interval)
+            continue
+        job_id, kind, payload = job
+        started = time.perf_counter()
+        try:
+            result = await render_locally(kind, payload, timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Render job %s (%s) took longer than %ss", job_id, kind, timeout)
+            await asyncio.to_thread(queue.fail, job_id, worker_id, f"rendering took longer than {timeout}s")
+            continue
+        except Exception as e:
+            logger.exception("Render job %s (%s) failed", job_id, kind)
+            await asyncio.to_thread(queue.fail, job_id, worker_id, f"{type(e).__name__}: {e}")
+            continue
+        await asyncio.to_thread(queue.complete, job_id, worker_id, result)
+        logger.info("Rendered job %s (%s) in %.0f ms", job_id, kind, (time.perf_counter() - started) * 1000)
+
+def main():
+    parser = argparse.ArgumentParser(description="Render PDFs for the bot from a job queue.")
+    parser.add_argument("--queue", default=os.getenv("RENDER_QUEUE", ""),
+                        help="SQLite file or redis:// URL, RENDER_QUEUE by default")
+    parser.add_argument("--timeout", type=float, default=float(os.getenv("RENDER_TIMEOUT", "120")),
+                        help="seconds one job may take")
+    args = parser.parse_args()
+    if not args.queue:
+        parser.error("set RENDER_QUEUE or --queue to the queue the bot submits to")
+    logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
+    try:
+        asyncio.run(run_worker(create_job_queue(args.queue), timeout=args.timeout))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
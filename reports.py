@@ -0,0 +1,165 @@
+import csv, os
+import numpy as np
+from pdf_utils import generate_revenue_report_pdf
+from utils import TUITION_SCHEMA, find_tuition_files, infer_tuition_year, parse_tuition_filename
+
+COURSE_CODES = ["JS", "SS", "GS", "MC"]
+PAYMENT_CODES = ["PA", "PE", "NA"]
+STATUS_CODES = ["S", "C", "R", "CA"]
+UNKNOWN = -1
+
+class LessonTable:
+    """
+    Every lesson of every tuition file as parallel NumPy columns.
+
+    Codes are stored as indexes into COURSE_CODES, PAYMENT_CODES and STATUS_CODES
+    (-1 for anything else), students as indexes into `students`.
+    """
+    def __init__(self, amount, year_month, course, payment, status, is_makeup, student, students):
+        self.amount = amount            # int64, HKD
+        self.year_month = year_month    # int32, e.g. 202511
+        self.course = course            # int8
+        self.payment = payment          # int8
+        self.status = status            # int8
+        self.is_makeup = is_makeup      # bool
+        self.student = student          # int32
+        self.students = students        # list[str]
+
+    def __len__(self):
+        return len(self.amount)
+
+def load_lessons(directory: str = "tuition_data") -> LessonTable:
+    """Read every tuition CSV under a folder into a LessonTable."""
+    course_index = {code: i for i, code in enumerate(COURSE_CODES)}
+    payment_index = {code: i for i, code in enumerate(PAYMENT_CODES)}
+    status_index = {code: i for i, code in enumerate(STATUS_CODES)}
+    student_index = {}
+    columns = {name: [] for name in ("amount", "year_month", "course", "payment", "status", "is_makeup", "student")}
+
+    for file in find_tuition_files([directory]):
+        course_code, student_name, month = parse_tuition_filename(file)
+        with open(file, "r") as f:
+            rows = list(csv.DictReader(f))
+        year_month = infer_tuition_year(file, month, rows) * 100 + month
+        student = student_index.setdefault(student_name, len(student_index))
+        course = course_index.get(course_code, UNKNOWN)
+        for row in rows:
+            try:
+                amount = int(row.get("amount") or 0)
+            except ValueError:
+                amount = 0
+            columns["amount"].append(amount)
+            columns["year_month"].append(year_month)
+            columns["course"].append(course)
+            columns["payment"].append(payment_index.get(row.get("payment"), UNKNOWN))
+            columns["status"].append(status_index.get(row.get("status"), UNKNOWN))
+            columns["is_makeup"].append(row.get("makeup") is not None)
+            columns["student"].append(student)
+
+    return LessonTable(
+        amount=np.array(columns["amount"], dtype=np.int64),
+        year_month=np.array(columns["year_month"], dtype=np.int32),
+        course=np.array(columns["course"], dtype=np.int8),
+        payment=np.array(columns["payment"], dtype=np.int8),
+        status=np.array(columns["status"], dtype=np.int8),
+        is_makeup=np.array(columns["is_makeup"], dtype=bool),
+        student=np.array(columns["student"], dtype=np.int32),
+        students=list(student_index),
+    )
+
+def _group_sum(keys, weights=None):
+    """Sum weights (or count rows) per distinct key. Returns (keys, sums)."""
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    sums = np.bincount(inverse, weights=weights, minlength=len(unique_keys))
+    return unique_keys, sums
+
+def summarize(table: LessonTable) -> dict:
+    """
+    Revenue and lesson statistics across all students.
+
+    Billed lessons are the non make-up lessons, the same ones that are added up in a
+    debit note's total.
+    """
+    billed = ~table.is_makeup
+    billed_amount = np.where(billed, table.amount, 0)
+    paid = billed & (table.payment == PAYMENT_CODES.index("PA"))
+    pending = billed & (table.payment == PAYMENT_CODES.index("PE"))
+    cancelled = table.status == STATUS_CODES.index("CA")
+
+    summary = {
+        "lessons": len(table),
+        "students": len(table.students),
+        "billed_total": int(billed_amount.sum()),
+        "paid_total": int(table.amount[paid].sum()),
+        "pending_total": int(table.amount[pending].sum()),
+        "makeup_lessons": int(table.is_makeup.sum()),
+        "cancellation_rate": float(cancelled.mean()) if len(table) else 0.0,
+    }
+
+    months, month_revenue = _group_sum(table.year_month, billed_amount)
+    _, month_paid = _group_sum(table.year_month, np.where(paid, table.amount, 0))
+    _, month_pending = _group_sum(table.year_month, np.where(pending, table.amount, 0))
+    _, month_lessons = _group_sum(table.year_month)
+    _, month_cancelled = _group_sum(table.year_month, cancelled.astype(np.int64))
+    _, month_makeups = _group_sum(table.year_month, table.is_makeup.astype(np.int64))
+    summary["by_month"] = [
+        {
+            "year_month": int(year_month),
+            "revenue": int(revenue),
+            "paid": int(paid_amount),
+            "pending": int(pending_amount),
+            "lessons": int(lessons),
+            "cancellation_rate": float(cancelled_count / lessons) if lessons else 0.0,
+            "makeup_lessons": int(makeups),
+        }
+        for year_month, revenue, paid_amount, pending_amount, lessons, cancelled_count, makeups
+        in zip(months, month_revenue, month_paid, month_pending, month_lessons, month_cancelled, month_makeups)
+    ]
+
+    # One key per (month, course) pair keeps this a single grouping pass
+    month_course = table.year_month.astype(np.int64) * 100 + (table.course + 1)
+    keys, revenue = _group_sum(month_course, billed_amount)
+    _, lessons = _group_sum(month_course)
+    _, cancelled_counts = _group_sum(month_course, cancelled.astype(np.int64))
+    summary["by_month_course"] = [
+        {
+            "year_month": int(key // 100),
+            "course": COURSE_CODES[key % 100 - 1] if key % 100 else "Unknown",
+            "revenue": int(amount),
+            "lessons": int(count),
+            "cancellation_rate": float(cancelled_count / count) if count else 0.0,
+        }
+        for key, amount, count, cancelled_count in zip(keys, revenue, lessons, cancelled_counts)
+    ]
+
+    students, student_pending = _group_sum(table.student, np.where(pending, table.amount, 0))
+    summary["pending_by_student"] = sorted(
+        [
+            {"student_name": table.students[student], "pending": int(amount)}
+            for student, amount in zip(students, student_pending) if amount
+        ],
+        key=lambda entry: -entry["pending"]
+    )
+    return summary
+
+def write_report_csv(summary: dict, path: str) -> str:
+    """Write the per month and course breakdown of a summary to a CSV file."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["year_month", "course", "course_name", "revenue", "lessons", "cancellation_rate"])
+        for entry in summary["by_month_course"]:
+            year, month = divmod(entry["year_month"], 100)
+            writer.writerow([
+                f"{year}-{month:02d}", entry["course"], TUITION_SCHEMA.get(entry["course"], ""),
+                entry["revenue"], entry["lessons"], f"{entry['cancellation_rate']:.3f}"
+            ])
+    return path
+
+def generate_report(directory: str, output_dir: str, basename: str) -> tuple[str, str]:
+    """Summarise every tuition file under directory into a PDF and a CSV. Returns both paths."""
+    if not os.path.isdir(directory):
+        raise FileNotFoundError(f"Tuition data folder not found: {directory}")
+    summary = summarize(load_lessons(directory))
+    csv_path = write_report_csv(summary, os.path.join(output_dir, f"{basename}.csv"))
+    pdf_path = generate_revenue_report_pdf(os.path.join(output_dir, f"{basename}.pdf"), summary)
+    return pdf_path, csv_path
@@ -0,0 +1,202 @@
+import asyncio, collections, logging, time
+from datetime import timedelta
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes. Requests are interactive unless a bot method is called with rate_limit_args=BULK
+INTERACTIVE = 0
+BULK = 1
+LANE_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+# Telegram's documented flood limits
+GLOBAL_RATE = 30            # messages per second across all chats
+PRIVATE_CHAT_RATE = 1       # messages per second to one chat
+GROUP_CHAT_RATE = 20 / 60   # messages per second to one group
+CHAT_BURST = 3
+
+class TokenBucket:
+    """Allows `rate` sends per second on average, and bursts of up to `capacity`."""
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0    # set when Telegram answers with RetryAfter
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a send is allowed, 0 when one is allowed now."""
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, now: float, seconds: float):
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = 0
+
+    def is_idle(self, now: float) -> bool:
+        return self.delay(now) == 0 and self.tokens >= self.capacity
+
+class SendQueue(BaseRateLimiter):
+    """
+    Puts every request that targets a chat in a queue and lets them out within
+    Telegram's flood limits: a global token bucket, plus one per chat (slower for groups).
+
+    Interactive requests always go before bulk ones; within a lane, chats take turns so one
+    long broadcast doesn't hold up everyone else, and each chat's requests keep their order.
+    When Telegram still answers with RetryAfter, that chat is paused for the time asked and
+    the request is queued again, up to max_retries times. Requests without a chat, such as
+    getFile, are not limited.
+    """
+    def __init__(self, global_rate: float = GLOBAL_RATE, private_chat_rate: float = PRIVATE_CHAT_RATE,
+                 group_chat_rate: float = GROUP_CHAT_RATE, chat_burst: int = CHAT_BURST, max_retries: int = 3,
+                 max_chat_buckets: int = 1024):
+        self.private_chat_rate = private_chat_rate
+        self.group_chat_rate = group_chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.max_chat_buckets = max_chat_buckets
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats = {}     # chat_id -> TokenBucket
+        self._lanes = {lane: collections.OrderedDict() for lane in LANE_NAMES}   # chat_id -> deque of futures
+        self._wakeup = asyncio.Event()
+        self._dispatcher = None
+        # Metrics
+        self.sent = 0
+        self.retries = 0
+        self._waits = {lane: collections.deque(maxlen=1000) for lane in LANE_NAMES}
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for queue in self._lanes.values():
+            for futures in queue.values():
+                for future in futures:
+                    future.cancel()
+            queue.clear()
+
+    def _bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self.max_chat_buckets:
+                now = time.monotonic()
+                queued = {chat for queue in self._lanes.values() for chat in queue}
+                for key, old in list(self._chats.items()):
+                    if key not in queued and old.is_idle(now):
+                        del self._chats[key]
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            bucket = TokenBucket(self.group_chat_rate if is_group else self.private_chat_rate, self.chat_burst)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _next_ready(self, now: float):
+        """The first queued request whose chat may be sent to now, or None and how long until one may."""
+        soonest = None
+        for queue in self._lanes.values():
+            for chat_id, futures in list(queue.items()):
+                while futures and futures[0].done():   # cancelled while waiting
+                    futures.popleft()
+                if not futures:
+                    del queue[chat_id]
+                    continue
+                bucket = self._bucket(chat_id)
+                delay = bucket.delay(now)
+                if delay == 0:
+                    bucket.take(now)
+                    future = futures.popleft()
+                    if futures:
+                        queue.move_to_end(chat_id)
+                    else:
+                        del queue[chat_id]
+                    return future, None
+                soonest = delay if soonest is None else min(soonest, delay)
+        return None, soonest
+
+    async def _dispatch(self):
+        while True:
+            now = time.monotonic()
+            delay = self._global.delay(now)
+            if delay:
+                await asyncio.sleep(delay)
+                continue
+            future, delay = self._next_ready(now)
+            if future is not None:
+                self._global.take(now)
+                future.set_result(None)
+                continue
+            # Sleep until a chat may be sent to again or something new is queued
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _wait_turn(self, chat_id, lane: int, retry: bool = False):
+        """Wait until this chat's request may be sent. A retried request goes ahead of the chat's later ones."""
+        future = asyncio.get_running_loop().create_future()
+        futures = self._lanes[lane].setdefault(chat_id, collections.deque())
+        if retry:
+            futures.appendleft(future)
+        else:
+            futures.append(future)
+        queued_at = time.monotonic()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        self._wakeup.set()
+        await future
+        self._waits[lane].append(time.monotonic() - queued_at)
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get("chat_id")
+        if chat_id is None:
+            return await callback(*args, **kwargs)
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            pass    # @channelusername
+        lane = BULK if rate_limit_args == BULK else INTERACTIVE
+
+        for attempt in range(self.max_retries + 1):
+            await self._wait_turn(chat_id, lane, retry=attempt > 0)
+            try:
+                result = await callback(*args, **kwargs)
+                self.sent += 1
+                return result
+            except RetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                retry_after = e.retry_after
+                seconds = retry_after.total_seconds() if isinstance(retry_after, timedelta) else retry_after
+                self.retries += 1
+                self._bucket(chat_id).block(time.monotonic(), seconds)
+                logger.warning("%s to chat %s hit flood control, retrying in %ss", endpoint, chat_id, seconds)
+
+    @property
+    def queued(self) -> int:
+        return sum(len(futures) for queue in self._lanes.values() for futures in queue.values())
+
+    def metrics(self) -> dict:
+        """Queue depth and recent wait times (seconds) per lane, requests sent and RetryAfter retries."""
+        lanes = {}
+        for lane, name in LANE_NAMES.items():
+            waits = sorted(self._waits[lane])
+            lanes[name] = {
+                "queued": sum(len(futures) for futures in self._lanes[lane].values()),
+                "wait_p50": waits[len(waits) // 2] if waits else 0.0,
+                "wait_p95": waits[int(len(waits) * 0.95)] if waits else 0.0,
+                "wait_max": waits[-1] if waits else 0.0,
+            }
+        return {"sent": self.sent, "retries": self.retries, "lanes": lanes}
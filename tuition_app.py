@@ -1,34 +1,61 @@
 #!/usr/bin/env python
 
+import asyncio
 import sys
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLabel, QPushButton, QListWidget, 
                              QTextEdit, QFrame, QProgressBar, QFileDialog,
+                             QScrollArea, QListView, QLineEdit, QComboBox,
                              )
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont, QIcon
-from utils import parse_tuition_file, get_output_dir, get_resource_path
-from pdf_utils import generate_tuition_debit_note
+from PyQt5.QtCore import Qt, QThreadPool, QTimer, QSortFilterProxyModel
+from PyQt5.QtGui import QFont, QIcon, QPixmap
+from utils import TuitionParseCache, find_tuition_files, group_tuition_files, lesson_total, get_output_dir, get_resource_path
+from pdf_utils import render_tuition_debit_note, generate_combined_debit_notes
+from gui_workers import TaskBatch
+from gui_models import TuitionFileModel
+from preview import DebitNotePreviewCache
+from validation import validate_tuition_files, format_validation_report
 from datetime import datetime
 import os 
 import subprocess
+import time
 
 class TuitionNotesGenerator(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.uploaded_files = []
-        self.tuition_record = None
+        self.file_model = TuitionFileModel()
+        self.tuition_records = {}  # (student_name, course_code) -> record
+        self.student_notes = {}    # (student_name, course_code) -> notes text
+        self.current_student = None
+        self.parse_cache = TuitionParseCache()
         self.current_year = datetime.now().year
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(max(2, os.cpu_count() or 2))
+        self.active_batch = None
+        self.preview_cache = DebitNotePreviewCache()
+        self.preview_keys = []
+        self.preview_pending = set()
+        self.preview_batches = set()
         self.init_ui()
+
+    @property
+    def uploaded_files(self):
+        return self.file_model.files()
         
     def init_ui(self):
         self.setWindowTitle("Tuition Invoice Generator")
         self.setGeometry(100, 100, 900, 700)
+        # CSV files and folders can be dropped anywhere on the window
+        self.setAcceptDrops(True)
         
-        # Central widget
+        # Central widget, the preview pane sits to the right of the main column
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
-        main_layout = QVBoxLayout(central_widget)
+        root_layout = QHBoxLayout(central_widget)
+        root_layout.setContentsMargins(0, 0, 0, 0)
+        main_widget = QWidget()
+        root_layout.addWidget(main_widget)
+        main_layout = QVBoxLayout(main_widget)
         main_layout.setSpacing(15)
         main_layout.setContentsMargins(20, 20, 20, 20)
         
@@ -43,12 +70,18 @@ class TuitionNotesGenerator(QMainWindow):
         
         # File upload section
         self.create_file_section(main_layout)
+
+        # Students found in the uploaded files
+        self.create_student_section(main_layout)
         
         # Notes section
         self.create_notes_section(main_layout)
         
         # Action buttons
         self.create_action_buttons(main_layout)
+
+        # Preview pane
+        self.create_preview_pane(root_layout)
         
         # Status bar
         self.create_status_bar()
@@ -92,33 +125,67 @@ class TuitionNotesGenerator(QMainWindow):
         # Buttons
         button_layout = QHBoxLayout()
         
-        upload_btn = QPushButton("📁 Add File")
-        upload_btn.clicked.connect(self.upload_file)
-        button_layout.addWidget(upload_btn)
+        self.upload_btn = QPushButton("📁 Add File")
+        self.upload_btn.clicked.connect(self.upload_file)
+        button_layout.addWidget(self.upload_btn)
         
-        upload_multiple_btn = QPushButton("📁 Add Multiple Files")
-        upload_multiple_btn.clicked.connect(self.upload_multiple_files)
-        button_layout.addWidget(upload_multiple_btn)
+        self.upload_multiple_btn = QPushButton("📁 Add Multiple Files")
+        self.upload_multiple_btn.clicked.connect(self.upload_multiple_files)
+        button_layout.addWidget(self.upload_multiple_btn)
         
-        clear_btn = QPushButton("🗑️ Clear All")
-        clear_btn.clicked.connect(self.clear_all_files)
-        button_layout.addWidget(clear_btn)
+        self.clear_btn = QPushButton("🗑️ Clear All")
+        self.clear_btn.clicked.connect(self.clear_all_files)
+        button_layout.addWidget(self.clear_btn)
         
         button_layout.addStretch()
         layout.addLayout(button_layout)
         
+        # Filter and sort, applied by the proxy model without touching the list items
+        view_options_layout = QHBoxLayout()
+        self.file_filter_edit = QLineEdit()
+        self.file_filter_edit.setPlaceholderText("Filter files...")
+        view_options_layout.addWidget(self.file_filter_edit)
+
+        sort_label = QLabel("Sort by:")
+        sort_label.setStyleSheet("color: black")
+        view_options_layout.addWidget(sort_label)
+        self.file_sort_combo = QComboBox()
+        for label, role in [
+            ("Name", TuitionFileModel.NAME_ROLE),
+            ("Student", TuitionFileModel.STUDENT_ROLE),
+            ("Course", TuitionFileModel.COURSE_ROLE),
+            ("Month", TuitionFileModel.MONTH_ROLE),
+            ("Size", TuitionFileModel.SIZE_ROLE),
+            ("Rows", TuitionFileModel.ROWS_ROLE),
+        ]:
+            self.file_sort_combo.addItem(label, role)
+        view_options_layout.addWidget(self.file_sort_combo)
+        layout.addLayout(view_options_layout)
+
         # File list
-        self.file_list = QListWidget()
+        self.file_proxy = QSortFilterProxyModel(self)
+        self.file_proxy.setSourceModel(self.file_model)
+        self.file_proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.file_proxy.setFilterRole(TuitionFileModel.PATH_ROLE)
+        self.file_proxy.setDynamicSortFilter(True)
+        self.file_filter_edit.textChanged.connect(self.file_proxy.setFilterFixedString)
+        self.file_sort_combo.currentIndexChanged.connect(self.sort_files)
+        self.sort_files()
+
+        self.file_list = QListView()
+        self.file_list.setModel(self.file_proxy)
+        self.file_list.setUniformItemSizes(True)
         self.file_list.setMinimumHeight(150)
-        self.file_list.itemSelectionChanged.connect(self.on_file_select)
+        self.file_list.selectionModel().currentChanged.connect(self.on_file_select)
+        self.file_model.dataChanged.connect(self.on_file_select)
         layout.addWidget(self.file_list)
         
         # File actions
         file_actions_layout = QHBoxLayout()
         
-        remove_btn = QPushButton("X Remove Selected")
-        remove_btn.clicked.connect(self.remove_selected_file)
-        file_actions_layout.addWidget(remove_btn)
+        self.remove_btn = QPushButton("X Remove Selected")
+        self.remove_btn.clicked.connect(self.remove_selected_file)
+        file_actions_layout.addWidget(self.remove_btn)
         
         file_actions_layout.addStretch()
         
@@ -128,14 +195,36 @@ class TuitionNotesGenerator(QMainWindow):
         
         layout.addLayout(file_actions_layout)
         
-    def create_notes_section(self, layout):
+    def create_student_section(self, layout):
         # Section header
         header_layout = QHBoxLayout()
-        
-        section_label = QLabel("📝 Additional Notes (Optional)")
+
+        section_label = QLabel("👥 Students")
         section_label.setFont(QFont("Helvetica", 12, QFont.Bold))
         section_label.setStyleSheet("color: black")
         header_layout.addWidget(section_label)
+
+        self.student_count_label = QLabel("(0 students)")
+        self.student_count_label.setStyleSheet("color: #95a5a6;")
+        header_layout.addWidget(self.student_count_label)
+        header_layout.addStretch()
+
+        layout.addLayout(header_layout)
+
+        # One entry per student and course, selecting one edits its notes
+        self.student_list = QListWidget()
+        self.student_list.setMinimumHeight(90)
+        self.student_list.itemSelectionChanged.connect(self.on_student_select)
+        layout.addWidget(self.student_list)
+
+    def create_notes_section(self, layout):
+        # Section header
+        header_layout = QHBoxLayout()
+        
+        self.notes_label = QLabel("📝 Additional Notes (Optional)")
+        self.notes_label.setFont(QFont("Helvetica", 12, QFont.Bold))
+        self.notes_label.setStyleSheet("color: black")
+        header_layout.addWidget(self.notes_label)
         
         header_layout.addStretch()
         
@@ -154,6 +243,8 @@ class TuitionNotesGenerator(QMainWindow):
             "Use | to separate notes for each page."
         )
         self.notes_text.textChanged.connect(self.update_char_count)
+        self.notes_text.textChanged.connect(self.save_student_notes)
+        self.notes_text.textChanged.connect(self.schedule_preview)
         layout.addWidget(self.notes_text)
         
         # Quick templates
@@ -198,6 +289,11 @@ class TuitionNotesGenerator(QMainWindow):
         self.preview_btn.clicked.connect(self.preview_invoices)
         self.preview_btn.setEnabled(False)
         button_layout.addWidget(self.preview_btn)
+
+        self.combined_btn = QPushButton("Combined PDF")
+        self.combined_btn.clicked.connect(self.generate_combined_pdf)
+        self.combined_btn.setEnabled(False)
+        button_layout.addWidget(self.combined_btn)
         
         self.generate_btn = QPushButton("Generate Invoices")
         self.generate_btn.clicked.connect(self.generate_invoices)
@@ -209,6 +305,35 @@ class TuitionNotesGenerator(QMainWindow):
         
         layout.addLayout(button_layout)
         
+    def create_preview_pane(self, layout):
+        self.preview_panel = QWidget()
+        self.preview_panel.setMinimumWidth(440)
+        panel_layout = QVBoxLayout(self.preview_panel)
+        panel_layout.setContentsMargins(0, 20, 20, 20)
+
+        section_label = QLabel("🔍 Preview")
+        section_label.setFont(QFont("Helvetica", 12, QFont.Bold))
+        section_label.setStyleSheet("color: black")
+        panel_layout.addWidget(section_label)
+
+        self.preview_scroll = QScrollArea()
+        self.preview_scroll.setWidgetResizable(True)
+        pages_widget = QWidget()
+        self.preview_pages_layout = QVBoxLayout(pages_widget)
+        self.preview_pages_layout.setAlignment(Qt.AlignTop | Qt.AlignHCenter)
+        self.preview_scroll.setWidget(pages_widget)
+        panel_layout.addWidget(self.preview_scroll)
+        self.preview_page_widgets = []
+
+        # Re-render at most once per pause in typing
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(300)
+        self.preview_timer.timeout.connect(self.refresh_preview)
+
+        self.preview_panel.setVisible(False)
+        layout.addWidget(self.preview_panel)
+        
     def create_status_bar(self):
         self.status_bar = self.statusBar()
         self.status_label = QLabel("Ready")
@@ -219,6 +344,12 @@ class TuitionNotesGenerator(QMainWindow):
         self.progress_bar.setMaximumWidth(200)
         self.progress_bar.setVisible(False)
         self.status_bar.addPermanentWidget(self.progress_bar)
+
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setStyleSheet("QPushButton { padding: 4px 12px; }")
+        self.cancel_btn.clicked.connect(self.cancel_batch)
+        self.cancel_btn.setVisible(False)
+        self.status_bar.addPermanentWidget(self.cancel_btn)
         
     def apply_styles(self):
         self.setStyleSheet("""
@@ -241,7 +372,7 @@ class TuitionNotesGenerator(QMainWindow):
                 padding: 12px 24px;
                 color: black;
             }
-            QListWidget {
+            QListView {
                 background-color: #ecf0f1;
                 border: 2px solid #bdc3c7;
                 border-radius: 4px;
@@ -268,11 +399,7 @@ class TuitionNotesGenerator(QMainWindow):
         )
         
         if filename:
-            self.uploaded_files.append(filename)
-            self.update_file_list()
-            lesson_data, course_name, student_name, month, month_name = parse_tuition_file(self.uploaded_files)
-            self.add_tuition_record(course_name, lesson_data, student_name, month, month_name)
-            self.update_status(f"Added and Processed: {os.path.basename(filename)}", "success")
+            self.parse_files([filename], f"Added and Processed: {os.path.basename(filename)}")
             
     def upload_multiple_files(self):
         filenames, _ = QFileDialog.getOpenFileNames(
@@ -283,48 +410,164 @@ class TuitionNotesGenerator(QMainWindow):
         )
         
         if filenames:
-            self.uploaded_files.extend(filenames)
+            self.parse_files(filenames, f"Added {len(filenames)} files")
+
+    def dragEnterEvent(self, event):
+        if event.mimeData().hasUrls() and not self.active_batch:
+            event.acceptProposedAction()
+
+    def dropEvent(self, event):
+        paths = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+        if not paths:
+            return
+        event.acceptProposedAction()
+        # Walking a dropped folder can take a while, so it happens in the background too
+        batch = TaskBatch(self.thread_pool)
+        batch.add("find", find_tuition_files, paths)
+        batch.signals.result.connect(lambda _, files: self.import_files(files))
+        batch.signals.error.connect(lambda _, message: self.update_status(f"Failed to import: {message}", "error"))
+        self.run_batch(batch, "Searching for CSV files...")
+
+    def import_files(self, files):
+        if files:
+            self.parse_files(files, f"Added {len(files)} file{'s' if len(files) != 1 else ''}")
+        else:
+            self.update_status("No CSV files found", "warning")
+
+    def scan_file(self, file):
+        """Parse a file through the cache and return the metadata shown in the file list."""
+        lessons, course_code, student_name, month = self.parse_cache.parse(file)
+        return {
+            "size": os.path.getsize(file),
+            "student": student_name,
+            "course": course_code,
+            "month": month,
+            "rows": len(lessons),
+        }
+
+    def parse_files(self, new_files, success_message):
+        # New files are listed straight away and their metadata is filled in as they are scanned.
+        # Only new or changed files are parsed, the rest come from the parse cache
+        new_files = [file for file in dict.fromkeys(new_files) if file not in self.file_model]
+        self.file_model.add_files(new_files)
+        self.update_file_list()
+        batch = TaskBatch(self.thread_pool)
+        for file in self.uploaded_files:
+            if self.parse_cache.is_stale(file) or self.file_model.metadata(file) is None:
+                batch.add(file, self.scan_file, file)
+
+        failed = {}
+        batch.signals.result.connect(self.file_model.set_metadata)
+        batch.signals.error.connect(lambda file, message: failed.__setitem__(file, message))
+
+        def on_finished(cancelled):
+            if cancelled:
+                # Drop the new files that were never scanned
+                self.file_model.remove_files([file for file in new_files if self.file_model.metadata(file) is None])
+            self.file_model.remove_files(list(failed))
+            for file in failed:
+                self.parse_cache.discard(file)
             self.update_file_list()
-            lesson_data, course_name, student_name, month, month_name = parse_tuition_file(self.uploaded_files)
-            self.add_tuition_record(course_name, lesson_data, student_name, month, month_name) 
-            self.update_status(f"Added {len(filenames)} files", "success")
+            self.refresh_tuition_records()
+            if cancelled:
+                return
+            if failed:
+                details = "; ".join(f"{os.path.basename(file)}: {message}" for file, message in failed.items())
+                self.update_status(f"Failed to parse {len(failed)} file(s): {details}", "error")
+            else:
+                self.update_status(success_message, "success")
+
+        batch.signals.finished.connect(on_finished)
+        self.run_batch(batch, "Parsing files...")
+
+    def refresh_tuition_records(self):
+        """Rebuild one aggregate record per student and course from the parse cache."""
+        self.tuition_records = {}
+        try:
+            for key, files in group_tuition_files(self.uploaded_files).items():
+                lesson_data, course_name, student_name, month, month_name = self.parse_cache.aggregate(files)
+                self.add_tuition_record(key, course_name, lesson_data, student_name, month, month_name)
+        except Exception as e:
+            self.update_status(f"Failed to parse files: {e}", "error")
+        self.update_student_list()
+
+    def update_student_list(self):
+        selected = self.current_student
+        self.student_list.blockSignals(True)
+        self.student_list.clear()
+        for (student_name, course_code), record in self.tuition_records.items():
+            months = ", ".join(str(month) for month in record["month"])
+            total = sum(lesson_total(lessons) for lessons in record["lesson_data"])
+            self.student_list.addItem(f"  👤 {student_name} ({course_code}) | Months: {months} | Total: ${total:,} HKD")
+        self.student_list.blockSignals(False)
+        self.schedule_preview()
+
+        count = len(self.tuition_records)
+        self.student_count_label.setText(f"({count} student{'s' if count != 1 else ''})")
+
+        keys = list(self.tuition_records)
+        if keys:
+            self.student_list.setCurrentRow(keys.index(selected) if selected in keys else 0)
+        else:
+            self.on_student_select()
+
+    def on_student_select(self):
+        keys = list(self.tuition_records)
+        current_row = self.student_list.currentRow()
+        key = keys[current_row] if 0 <= current_row < len(keys) else None
+        if key == self.current_student:
+            return
+        # Switch the notes editor to the selected student
+        self.current_student = None
+        self.notes_text.setPlainText(self.student_notes.get(key, ""))
+        self.current_student = key
+        if key:
+            self.notes_label.setText(f"📝 Additional Notes for {key[0]} ({key[1]}) (Optional)")
+        else:
+            self.notes_label.setText("📝 Additional Notes (Optional)")
+        self.refresh_preview()
+
+    def save_student_notes(self):
+        if self.current_student:
+            self.student_notes[self.current_student] = self.notes_text.toPlainText()
             
     def remove_selected_file(self):
-        current_row = self.file_list.currentRow()
-        if current_row >= 0:
-            removed_file = self.uploaded_files.pop(current_row)
+        index = self.file_list.currentIndex()
+        if index.isValid():
+            removed_file = index.data(TuitionFileModel.PATH_ROLE)
+            self.file_model.remove_files([removed_file])
+            self.parse_cache.discard(removed_file)
             self.update_file_list()
+            self.refresh_tuition_records()
             self.update_status(f"Removed: {os.path.basename(removed_file)}", "info")
             
     def clear_all_files(self):
-        if self.uploaded_files:
-            self.uploaded_files.clear()
+        if self.file_model.rowCount():
+            self.file_model.clear()
+            self.parse_cache.clear()
             self.update_file_list()
+            self.refresh_tuition_records()
             self.update_status("All files cleared", "info")
             
     def update_file_list(self):
-        self.file_list.clear()
-        
-        for file_path in self.uploaded_files:
-            filename = os.path.basename(file_path)
-            self.file_list.addItem(f"  📄 {filename}")
-        
-        count = len(self.uploaded_files)
+        # The list view follows the model, only the counters and buttons need updating
+        count = self.file_model.rowCount()
         self.file_count_label.setText(f"({count} file{'s' if count != 1 else ''})")
         
-        enabled = count > 0
+        enabled = count > 0 and not self.active_batch
         self.generate_btn.setEnabled(enabled)
         self.preview_btn.setEnabled(enabled)
-        
-    def on_file_select(self):
-        current_row = self.file_list.currentRow()
-        if 0 <= current_row < len(self.uploaded_files):
-            file_path = self.uploaded_files[current_row]
-            file_size = os.path.getsize(file_path)
-            size_kb = file_size / 1024
-            self.file_details_label.setText(
-                f"Size: {size_kb:.1f} KB | Path: {file_path}"
-            )
+        self.combined_btn.setEnabled(enabled)
+
+    def sort_files(self):
+        self.file_proxy.setSortRole(self.file_sort_combo.currentData())
+        self.file_proxy.sort(0)
+        
+    def on_file_select(self, *_):
+        index = self.file_list.currentIndex()
+        if index.isValid():
+            # Details come from the background scan, no disk access on click
+            self.file_details_label.setText(self.file_model.describe(index.data(TuitionFileModel.PATH_ROLE)))
         else:
            # clear file details label
            self.file_details_label.setText("") 
@@ -339,10 +582,12 @@ class TuitionNotesGenerator(QMainWindow):
     def clear_notes(self):
         self.notes_text.clear()
         
-    def get_notes_content(self):
-        return self.notes_text.toPlainText().strip().split("|")
+    def get_notes_content(self, key=None):
+        if key is None:
+            return self.notes_text.toPlainText().strip().split("|")
+        return self.student_notes.get(key, "").strip().split("|")
 
-    def add_tuition_record(self, course_name, lesson_data, student_name, month, month_name):
+    def add_tuition_record(self, key, course_name, lesson_data, student_name, month, month_name):
         tuition_record = {
             "course_name": course_name,
             "lesson_data": lesson_data,
@@ -350,25 +595,215 @@ class TuitionNotesGenerator(QMainWindow):
             "month": month,
             "month_name": month_name
         }
-        self.tuition_record = tuition_record
-        
+        self.tuition_records[key] = tuition_record
+
+    @staticmethod
+    def render_debit_note(**kwargs):
+        """Render one debit note and return how long it took in seconds."""
+        start = time.perf_counter()
+        # Runs on a pool thread, which has no event loop of its own
+        asyncio.run(render_tuition_debit_note(**kwargs))
+        return time.perf_counter() - start
+        
+    def validate_files(self) -> bool:
+        """Check every loaded file before rendering, showing the problems if there are any."""
+        errors = validate_tuition_files(self.file_model.files())
+        if errors:
+            self.update_status(format_validation_report(errors, limit=5), "error")
+        return not errors
+
     def generate_invoices(self):
-        if not self.uploaded_files:
+        if not self.file_model.rowCount() or not self.tuition_records:
             self.update_status("No files to process", "error")
             return
+        if not self.validate_files():
+            return
         
-        notes = self.get_notes_content()
-        self.update_status("Generating invoices...", "processing")
-        course_name, lesson_data, student_name, months, month_name  = self.tuition_record.values()
-        file_name = f"TuitionFeeDebitNote_{student_name}_{month_name}_{self.current_year}.pdf"
-        generate_tuition_debit_note(filename=file_name, student_name=student_name, months=months, lesson_data=lesson_data, course_name=course_name, notes=notes, output_path=get_output_dir())
-        
-        self.update_status("Successfully generated tuition notes", "success")
-        return 
+        output_dir = get_output_dir()
+        course_counts = {}
+        for student_name, _ in self.tuition_records:
+            course_counts[student_name] = course_counts.get(student_name, 0) + 1
+
+        batch = TaskBatch(self.thread_pool)
+        # One render task per student, so all invoices are built at the same time
+        for key, record in self.tuition_records.items():
+            course_name, lesson_data, student_name, months, month_name = record.values()
+            # Students taking several courses get one note per course
+            course_suffix = f"_{key[1]}" if course_counts[student_name] > 1 else ""
+            file_name = f"TuitionFeeDebitNote_{student_name}{course_suffix}_{month_name}_{self.current_year}.pdf"
+            batch.add(file_name, self.render_debit_note, filename=file_name, student_name=student_name, months=months,
+                      lesson_data=lesson_data, course_name=course_name, notes=self.get_notes_content(key), output_path=output_dir)
+
+        generated, failed = {}, []
+        batch.signals.result.connect(lambda file_name, elapsed: generated.__setitem__(file_name, elapsed))
+        batch.signals.error.connect(lambda file_name, message: failed.append(f"{file_name}: {message}"))
+        start = time.perf_counter()
+
+        def on_finished(cancelled):
+            wall_time = time.perf_counter() - start
+            summary = f"{len(generated)} note(s) in {wall_time:.2f}s"
+            if generated:
+                slowest = max(generated, key=generated.get)
+                summary += f" (render time {sum(generated.values()):.2f}s, slowest {slowest} {generated[slowest]:.2f}s)"
+            if failed:
+                self.update_status(f"Generated {summary}. Failed to generate {len(failed)} note(s): {'; '.join(failed)}", "error")
+            elif cancelled:
+                self.update_status(f"Cancelled after generating {summary}", "warning")
+            else:
+                self.update_status(f"Successfully generated {summary}", "success")
+
+        batch.signals.finished.connect(on_finished)
+        self.run_batch(batch, "Generating invoices...")
+
+    def generate_combined_pdf(self):
+        if not self.file_model.rowCount() or not self.tuition_records:
+            self.update_status("No files to process", "error")
+            return
+        if not self.validate_files():
+            return
+
+        records = [
+            {
+                "student_name": record["student_name"],
+                "months": record["month"],
+                "lesson_data": record["lesson_data"],
+                "course_name": record["course_name"],
+                "notes": self.get_notes_content(key),
+            }
+            for key, record in sorted(self.tuition_records.items())
+        ]
+        file_name = f"TuitionFeeDebitNotes_All_{datetime.now():%Y%m%d}.pdf"
+        batch = TaskBatch(self.thread_pool)
+        batch.add(file_name, generate_combined_debit_notes, file_name, records, get_output_dir())
+        batch.signals.result.connect(
+            lambda file_name, path: self.update_status(f"Generated {file_name} with {len(records)} note(s)", "success")
+        )
+        batch.signals.error.connect(
+            lambda file_name, message: self.update_status(f"Failed to generate {file_name}: {message}", "error")
+        )
+        self.run_batch(batch, "Generating combined PDF...")
+
+    def run_batch(self, batch, message):
+        """Run a TaskBatch in the background and reflect its progress in the status bar."""
+        self.active_batch = batch
+        self.set_busy(True)
+        self.update_status(message, "processing")
+        self.progress_bar.setValue(0)
+        # A single task has no meaningful steps, show a busy indicator instead
+        self.progress_bar.setRange(0, len(batch) if len(batch) > 1 else 0)
+
+        def on_progress(completed, total):
+            self.progress_bar.setRange(0, total)
+            self.progress_bar.setValue(completed)
+
+        def on_finished(cancelled):
+            if cancelled and self.status_label.text() in (message, "Cancelling..."):
+                self.update_status("Cancelled", "warning")
+            # A follow-up batch may already have been started from this batch's results
+            if self.active_batch is batch:
+                self.active_batch = None
+                self.set_busy(False)
+
+        batch.signals.progress.connect(on_progress)
+        batch.signals.finished.connect(on_finished)
+        batch.start()
+
+    def cancel_batch(self):
+        if self.active_batch:
+            self.active_batch.cancel()
+            self.cancel_btn.setEnabled(False)
+            self.update_status("Cancelling...", "warning")
+
+    def set_busy(self, busy):
+        self.progress_bar.setVisible(busy)
+        self.cancel_btn.setVisible(busy)
+        self.cancel_btn.setEnabled(busy)
+        for button in (self.upload_btn, self.upload_multiple_btn, self.clear_btn, self.remove_btn):
+            button.setEnabled(not busy)
+        has_files = self.file_model.rowCount() > 0
+        self.generate_btn.setEnabled(not busy and has_files)
+        self.preview_btn.setEnabled(not busy and has_files)
+        self.combined_btn.setEnabled(not busy and has_files)
         
     def preview_invoices(self):
-        # TODO: Implement preview
-        self.update_status("Preview feature coming soon...", "info")
+        showing = not self.preview_panel.isVisible()
+        self.preview_panel.setVisible(showing)
+        self.preview_btn.setText("Hide Preview" if showing else "Preview")
+        if showing:
+            self.resize(max(self.width(), 1360), self.height())
+            self.refresh_preview()
+
+    def schedule_preview(self):
+        if self.preview_panel.isVisible():
+            self.preview_timer.start()
+
+    def refresh_preview(self):
+        """Show the selected student's note, rendering only the pages that changed."""
+        if not self.preview_panel.isVisible():
+            return
+        self.preview_timer.stop()
+
+        record = self.tuition_records.get(self.current_student)
+        pages = []
+        if record:
+            notes = self.get_notes_content(self.current_student)
+            for page_num, page_lessons in enumerate(record["lesson_data"]):
+                note = notes[page_num] if page_num < len(notes) else ""
+                pages.append((record["student_name"], record["month"][page_num], page_lessons, record["course_name"], note))
+
+        self.set_preview_page_count(len(pages))
+        self.preview_keys = [DebitNotePreviewCache.page_key(*page) for page in pages]
+
+        batch = TaskBatch(self.thread_pool)
+        for page_num, (page, key) in enumerate(zip(pages, self.preview_keys)):
+            images = self.preview_cache.get(key)
+            if images is not None:
+                self.show_preview_page(page_num, images)
+            elif key not in self.preview_pending:
+                self.preview_pending.add(key)
+                batch.add(key, self.preview_cache.render, *page)
+
+        def on_result(key, images):
+            self.preview_pending.discard(key)
+            if key in self.preview_keys:
+                self.show_preview_page(self.preview_keys.index(key), images)
+
+        def on_error(key, message):
+            self.preview_pending.discard(key)
+            self.update_status(f"Failed to render preview: {message}", "error")
+
+        batch.signals.result.connect(on_result)
+        batch.signals.error.connect(on_error)
+        batch.signals.finished.connect(lambda _: self.preview_batches.discard(batch))
+        self.preview_batches.add(batch)
+        batch.start()
+
+    def set_preview_page_count(self, count):
+        if len(self.preview_page_widgets) == count:
+            return
+        for widget in self.preview_page_widgets:
+            self.preview_pages_layout.removeWidget(widget)
+            widget.deleteLater()
+        self.preview_page_widgets = []
+        for _ in range(count):
+            page_widget = QWidget()
+            page_layout = QVBoxLayout(page_widget)
+            page_layout.addWidget(QLabel("Rendering..."))
+            self.preview_pages_layout.addWidget(page_widget)
+            self.preview_page_widgets.append(page_widget)
+
+    def show_preview_page(self, page_num, images):
+        # A month with many lessons can overflow onto more than one PDF page
+        page_layout = self.preview_page_widgets[page_num].layout()
+        while page_layout.count():
+            page_layout.takeAt(0).widget().deleteLater()
+        for image in images:
+            pixmap = QPixmap()
+            pixmap.loadFromData(image, "PNG")
+            label = QLabel()
+            label.setPixmap(pixmap)
+            label.setStyleSheet("border: 1px solid #bdc3c7;")
+            page_layout.addWidget(label)
     
     def open_folder(self):
         """Opens the specified folder in the native file explorer."""
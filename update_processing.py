@@ -0,0 +1,66 @@
+import asyncio
+from telegram.ext import BaseUpdateProcessor
+
+# Updates that may wait in the processor at once, on top of the ones being handled
+MAX_PENDING_UPDATES = 1024
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes updates concurrently while keeping each user's updates in order.
+
+    Updates from the same user (or chat, for updates without a user) wait on a lock of
+    their own, so ConversationHandler states and context.user_data are only ever touched
+    by one of that user's updates at a time. Different users proceed in parallel, at most
+    max_concurrent_updates at once.
+
+    PTB takes its own semaphore before the update reaches this processor, so that one only
+    caps how many updates may be waiting here. The global limit is applied after the
+    user's lock, otherwise a user sending many messages would fill every slot with updates
+    that are just waiting for their turn.
+    """
+    def __init__(self, max_concurrent_updates: int, max_pending_updates: int = MAX_PENDING_UPDATES):
+        super().__init__(max_concurrent_updates + max_pending_updates)
+        self.limit = max_concurrent_updates
+        self._running = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._user_locks = {}    # key -> [lock, updates holding or waiting for it]
+        self.processed = 0
+
+    @staticmethod
+    def user_key(update):
+        user = getattr(update, "effective_user", None)
+        if user is not None:
+            return "user", user.id
+        chat = getattr(update, "effective_chat", None)
+        if chat is not None:
+            return "chat", chat.id
+        return None
+
+    @property
+    def waiting_users(self) -> int:
+        """Users that have an update being processed or waiting."""
+        return len(self._user_locks)
+
+    async def do_process_update(self, update, coroutine):
+        key = self.user_key(update)
+        if key is None:
+            async with self._running:
+                await coroutine
+            self.processed += 1
+            return
+
+        entry = self._user_locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0], self._running:
+                await coroutine
+            self.processed += 1
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._user_locks[key]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
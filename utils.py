@@ -1,6 +1,10 @@
-import csv, asyncio, calendar, os, requests, sys
+import csv, asyncio, aiohttp, calendar, collections, os, requests, sys, threading, time, weakref
 from googletrans import Translator  # For translation
 from pathlib import Path
+from urllib.parse import urlsplit
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from circuit_breaker import CircuitBreaker, CircuitOpenError
 
 def get_resource_path(relative_path: str) -> str:
     """Return the absolute path to a resource.
@@ -64,56 +68,125 @@ def sort_files(files):
     else:
         return [files_dict[key] for key in sorted(files_dict, reverse=True)]
 
-def parse_tuition_file(files: list[str] | str):
-    TUITION_SCHEMA = {
-        "JS": "1 對 1 初中英文面授課",
-        "SS": "1 對 1 DSE 英文面授課",
-        "GS": "1 對 1 英文語法面授課",
-        "MC": "補堂",
-        "PE": "Pending 未付",
-        "PA": "Paid 已付",
-        "NA": "N/A",
-        "S": "Scheduled 已安排",
-        "C": "Completed 完成",
-        "R": "Rescheduled 調堂",
-        "CA": "Cancelled 取消"
-    }
+TUITION_SCHEMA = {
+    "JS": "1 對 1 初中英文面授課",
+    "SS": "1 對 1 DSE 英文面授課",
+    "GS": "1 對 1 英文語法面授課",
+    "MC": "補堂",
+    "PE": "Pending 未付",
+    "PA": "Paid 已付",
+    "NA": "N/A",
+    "S": "Scheduled 已安排",
+    "C": "Completed 完成",
+    "R": "Rescheduled 調堂",
+    "CA": "Cancelled 取消"
+}
 
-    if not isinstance(files, list):
-        files = [files]
+def parse_tuition_filename(file: str) -> tuple[str, str, int]:
+    """Split 'COURSECODE-NAME-Month.csv' into (course_code, student_name, month)."""
+    name_parts = file.split("/")[-1].split(".")[0].split("-") 
+    
+    if len(name_parts) != 3:
+        raise ValueError(f"Invalid file name error. Expected 'COURSECODE-NAME-Month.csv', but got {file}")
+    
+    course_code, student_name, month = name_parts 
+    
+    if "/" in course_code:
+        course_code = course_code.split("/")[1]
+
+    if course_code not in TUITION_SCHEMA:
+        raise ValueError(f"Invalid Course Code: {course_code} is not a valid course code")
 
+    return course_code, student_name, int(month)
+
+def read_tuition_csv(file: str) -> list[dict]:
+    """Read the lessons of one tuition file, with codes replaced by their descriptions."""
+    file_path = Path(file)
+    if not file_path.exists():
+        raise FileNotFoundError(f"File not found: {file}")
+
+    with open(file_path, "r") as f:
+        reader = csv.DictReader(f)
+        return [{key: TUITION_SCHEMA.get(val, val) for (key, val) in row.items()} for row in reader]
+
+def merge_tuition_records(records: dict):
+    """
+    Combine per-file parse results into the tuple returned by parse_tuition_file.
+
+    Args:
+        records: {file path: (lessons, course_code, student_name, month)}
+    """
     lesson_data = []
     months = []
+    for file in sort_files(list(records)):
+        lessons, course_code, student_name, month = records[file]
+        lesson_data.append(lessons)
+        months.append(month)
+
+    months = sort_recent_months(months)
+    month_name = calendar.month_abbr[months[0]]
+    return lesson_data, TUITION_SCHEMA[course_code], student_name, months, month_name
+
+def find_tuition_files(paths: list[str]) -> list[str]:
+    """Expand folders in paths into the CSV files they contain, searched recursively."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files.extend(os.path.join(root, name) for name in sorted(names) if name.lower().endswith(".csv"))
+        elif path.lower().endswith(".csv"):
+            files.append(path)
+    return files
+
+def group_tuition_files(files: list[str]) -> dict[tuple[str, str], list[str]]:
+    """Group tuition files by (student_name, course_code) taken from their file names."""
+    groups = {}
+    for file in files:
+        course_code, student_name, _ = parse_tuition_filename(file)
+        groups.setdefault((student_name, course_code), []).append(file)
+    return groups
+
+def lesson_total(lessons: list[dict]) -> int:
+    """Total fee of the lessons, make-up lessons are not charged."""
+    return sum(int(lesson["amount"]) for lesson in lessons if lesson["makeup"] is None)
+
+# Date formats accepted in a tuition file's date column
+LESSON_DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%d/%m/%Y", "%d-%m-%Y")
+# Dates may leave out the year, infer_tuition_year then works it out
+YEARLESS_LESSON_DATE_FORMATS = ("%d/%m", "%m-%d")
+
+def infer_tuition_year(file: str, month: int, rows: list[dict]) -> int:
+    """
+    Work out which year a 'COURSECODE-NAME-Month.csv' file belongs to.
+
+    The lesson dates are used when they carry a year, otherwise the file's modification
+    time, assuming the file was last edited in or after the month it describes.
+    """
+    for row in rows:
+        for date_format in LESSON_DATE_FORMATS:
+            try:
+                date = datetime.strptime((row.get("date") or "").strip(), date_format)
+            except ValueError:
+                continue
+            if date.month == month:
+                return date.year
+    modified = datetime.fromtimestamp(os.path.getmtime(file))
+    return modified.year if month <= modified.month else modified.year - 1
+
+def parse_tuition_file(files: list[str] | str):
+    if not isinstance(files, list):
+        files = [files]
+
+    records = {}
     sorted_files = sort_files(files)
     
     try:
         for file in sorted_files:
-            file_path = Path(file)
-            if not file_path.exists():
-                raise FileNotFoundError(f"File not found: {file}")
-
-            name_parts = file.split("/")[-1].split(".")[0].split("-") 
-            
-            if len(name_parts) != 3:
-                raise ValueError(f"Invalid file name error. Expected 'COURSECODE-NAME-Month.csv', but got {file}")
-            
-            course_code, student_name, month = name_parts 
-            
-            if "/" in course_code:
-                course_code = course_code.split("/")[1]
-
-            if course_code not in TUITION_SCHEMA:
-                raise ValueError(f"Invalid Course Code: {course_code} is not a valid course code")
-
-            months.append(int(month))
-
-            with open(file_path, "r") as f:
-                reader = csv.DictReader(f)
-                lesson_data.append([{key: TUITION_SCHEMA.get(val, val) for (key, val) in row.items()} for row in reader])
+            course_code, student_name, month = parse_tuition_filename(file)
+            records[file] = (read_tuition_csv(file), course_code, student_name, month)
         
-        months = sort_recent_months(months)
-        month_name = calendar.month_abbr[months[0]]
-        return lesson_data, TUITION_SCHEMA[course_code], student_name, months, month_name
+        return merge_tuition_records(records)
     except FileNotFoundError as e:
         print(f"Error: {e}")
         raise
@@ -124,6 +197,56 @@ def parse_tuition_file(files: list[str] | str):
         print(f"Unexpected error parsing file '{file}': {e}")
         raise
 
+class TuitionParseCache:
+    """
+    Per-file parse results keyed by path, reused until the file's mtime or size changes.
+
+    Adding a file only parses that file, and the aggregate for any set of cached
+    files is rebuilt in memory without touching the disk.
+    """
+    def __init__(self):
+        self._entries = {}  # path -> ((mtime, size), (lessons, course_code, student_name, month))
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(file):
+        stat = os.stat(file)
+        return stat.st_mtime_ns, stat.st_size
+
+    def is_stale(self, file) -> bool:
+        with self._lock:
+            entry = self._entries.get(file)
+        try:
+            return entry is None or entry[0] != self._signature(file)
+        except OSError:
+            return True
+
+    def parse(self, file):
+        """Return the parse result for one file, parsing it only if it is new or changed."""
+        signature = self._signature(file)
+        with self._lock:
+            entry = self._entries.get(file)
+        if entry and entry[0] == signature:
+            return entry[1]
+
+        course_code, student_name, month = parse_tuition_filename(file)
+        record = (read_tuition_csv(file), course_code, student_name, month)
+        with self._lock:
+            self._entries[file] = (signature, record)
+        return record
+
+    def discard(self, file):
+        with self._lock:
+            self._entries.pop(file, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def aggregate(self, files: list[str]):
+        """Same result as parse_tuition_file(files), parsing only new or changed files."""
+        return merge_tuition_records({file: self.parse(file) for file in files})
+
 def parse_note_txt(filename):
     try:
         if not os.path.exists(filename):
@@ -156,27 +279,283 @@ def week_of_month(dt):
     week_number_of_month = target_iso_week - first_day_iso_week + 1
     return week_number_of_month
 
+# Language the vocabulary meanings are translated to
+TRANSLATION_DEST = "zh-tw"
+
+class TranslationError(Exception):
+    """A provider could not translate a word, including an offline dictionary not knowing it."""
+
+class TranslationProvider:
+    """
+    One way of translating a word, with a health score: how often it answered and how
+    quickly, over its recent requests. Subclasses implement _translate.
+    """
+    name = "provider"
+
+    def __init__(self, name: str = None, window: int = 200, min_samples: int = 20, default_latency: float = 1.0):
+        self.name = name or self.name
+        # Not knowing a word is an answer, only errors reaching the backend open the breaker
+        self.breaker = CircuitBreaker(f"translate-{self.name}", ignore=(TranslationError,))
+        self.min_samples = min_samples
+        self.default_latency = default_latency    # assumed until min_samples answers were timed
+        self.latencies = collections.deque(maxlen=window)   # seconds, see translate
+        self.health = 1.0       # moving average of 1 for an answer and 0 for a failure
+        self.answered = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    async def _translate(self, text: str, dest: str) -> str:
+        raise NotImplementedError
+
+    async def translate(self, text: str, dest: str = TRANSLATION_DEST) -> str:
+        started = time.perf_counter()
+        try:
+            result = await self.breaker.call_async(self._translate, text, dest)
+        except CircuitOpenError:
+            raise   # not asked at all, neither an answer nor a failure
+        except asyncio.CancelledError:
+            # Lost a hedge race, so the answer would have taken at least this long. Left out,
+            # the slow answers would vanish from the window and p90 keep dropping; a short
+            # wait says nothing, e.g. a hedge cancelled just after it was sent
+            self.cancelled += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= self.latency(90):
+                self.latencies.append(elapsed)
+            raise
+        except Exception:
+            self.failed += 1
+            self.health *= 0.9
+            raise
+        self.answered += 1
+        self.health = self.health * 0.9 + 0.1
+        self.latencies.append(time.perf_counter() - started)
+        return result
+
+    def latency(self, percentile: float) -> float:
+        if len(self.latencies) < self.min_samples:
+            return self.default_latency
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+    def expected_time(self) -> float:
+        """Typical seconds to an answer, allowing for failures. Providers are tried lowest first."""
+        return max(self.latency(50), 0.001) / max(self.health, 0.01)
+
+    def metrics(self) -> dict:
+        return {"health": self.health, "answered": self.answered, "failed": self.failed, "cancelled": self.cancelled,
+                "p50": self.latency(50), "p90": self.latency(90), "circuit": self.breaker.state}
+
+class GoogleTranslateProvider(TranslationProvider):
+    """
+    googletrans, one client per event loop as its connection pool can't move between loops.
+    service_url picks the API: translate.googleapis.com is the one googletrans uses by
+    default, translate.google.com the web app's, served separately.
+    """
+    name = "google"
+
+    def __init__(self, service_url: str = "translate.googleapis.com", **kwargs):
+        super().__init__(**kwargs)
+        self.service_url = service_url
+        self._clients = weakref.WeakKeyDictionary()    # event loop -> Translator
+
+    async def _translate(self, text: str, dest: str) -> str:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = Translator(service_urls=(self.service_url,), raise_exception=True)
+        result = await client.translate(text, dest=dest)
+        return result.text
+
+class DictionaryProvider(TranslationProvider):
+    """Offline lookups in a CSV of word,meaning rows. Unknown words are failures so another provider is asked."""
+    name = "dictionary"
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(default_latency=0.0, **kwargs)
+        self.path = path
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            self.words = {row[0].strip().lower(): row[1].strip() for row in csv.reader(f) if len(row) >= 2}
+
+    async def _translate(self, text: str, dest: str) -> str:
+        meaning = self.words.get(text.strip().lower())
+        if meaning is None:
+            raise TranslationError(f"'{text}' is not in {os.path.basename(self.path)}")
+        return meaning
+
+class HTTPTranslationProvider(TranslationProvider):
+    """
+    A translation service on the local network, or a stand-in for one when testing:
+    POST {"text": ..., "dest": ...} to url, answered with {"translation": ...}.
+    """
+    name = "http"
+
+    def __init__(self, url: str, timeout: float = 10.0, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async def _translate(self, text: str, dest: str) -> str:
+        # A session per request: connecting to a local service is cheap and nothing is left open when a loop ends
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            async with session.post(self.url, json={"text": text, "dest": dest}) as response:
+                response.raise_for_status()
+                return (await response.json())["translation"]
+
+class HedgedTranslator:
+    """
+    Asks the provider expected to answer soonest first. If it hasn't answered within its
+    own p90 latency the next provider is asked as well and the first answer wins; a
+    provider that fails is replaced by the next one straight away.
+
+    Hedging after p90 means about one request in ten is sent twice, and at most
+    max_hedge_ratio of requests are hedged even when the latencies shift.
+    """
+    def __init__(self, providers: list, hedge_percentile: float = 90, max_hedge_ratio: float = 0.15):
+        if not providers:
+            raise ValueError("at least one translation provider is needed")
+        self.providers = providers
+        self.hedge_percentile = hedge_percentile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0     # answers that came from a hedged request
+
+    def _may_hedge(self) -> bool:
+        return self.hedges < self.max_hedge_ratio * self.requests + 1
+
+    async def translate(self, text: str, dest: str = TRANSLATION_DEST) -> str:
+        self.requests += 1
+        waiting = sorted(self.providers, key=lambda provider: provider.expected_time())
+        running = {}    # task -> (provider, whether it is a hedge)
+        errors = []
+
+        def ask(hedge: bool) -> float:
+            """Start the next provider, returning when to hedge it."""
+            provider = waiting.pop(0)
+            running[asyncio.ensure_future(provider.translate(text, dest))] = (provider, hedge)
+            return time.monotonic() + provider.latency(self.hedge_percentile)
+
+        hedge_at = ask(False)
+        try:
+            while running:
+                timeout = max(0.0, hedge_at - time.monotonic()) if waiting and hedge_at is not None else None
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Among the slowest tenth: ask the next provider too, unless the hedge budget is spent
+                    if self._may_hedge():
+                        self.hedges += 1
+                        hedge_at = ask(True)
+                    else:
+                        hedge_at = None
+                    continue
+                for task in done:
+                    provider, hedge = running.pop(task)
+                    if task.exception() is None:
+                        self.hedge_wins += hedge
+                        return task.result()
+                    errors.append(f"{provider.name}: {task.exception()}")
+                if waiting and not running:
+                    hedge_at = ask(False)
+        finally:
+            for task in running:
+                task.cancel()
+        raise TranslationError("; ".join(errors))
+
+    def metrics(self) -> dict:
+        return {"requests": self.requests, "hedges": self.hedges, "hedge_wins": self.hedge_wins,
+                "providers": {provider.name: provider.metrics() for provider in self.providers}}
+
+def create_translator(providers: str = None) -> HedgedTranslator:
+    """
+    The providers named in TRANSLATION_PROVIDERS (comma separated, default
+    "dictionary,google,google-web"):
+
+    - "google" is googletrans' translate.googleapis.com API
+    - "google-web" the translate.google.com web app API, a second route to hedge over
+      that needs no setup
+    - "dictionary" reads TRANSLATION_DICTIONARY (word,meaning rows, assets/dictionary.csv
+      by default, not shipped) and is left out when that file doesn't exist
+    - "http" posts to TRANSLATION_SERVICE_URL, one provider per comma separated URL
+    """
+    names = (providers or os.getenv("TRANSLATION_PROVIDERS", "dictionary,google,google-web")).split(",")
+    available = []
+    for name in (name.strip() for name in names):
+        if name == "google":
+            available.append(GoogleTranslateProvider())
+        elif name == "google-web":
+            available.append(GoogleTranslateProvider("translate.google.com", name="google-web"))
+        elif name == "dictionary":
+            path = os.getenv("TRANSLATION_DICTIONARY", get_resource_path(os.path.join("assets", "dictionary.csv")))
+            if os.path.exists(path):
+                available.append(DictionaryProvider(path))
+        elif name == "http":
+            urls = [url.strip() for url in os.getenv("TRANSLATION_SERVICE_URL", "").split(",") if url.strip()]
+            available += [HTTPTranslationProvider(url, name=f"http {urlsplit(url).netloc}") for url in urls]
+        elif name:
+            raise ValueError(f"unknown translation provider '{name}'")
+    return HedgedTranslator(available or [GoogleTranslateProvider()])
+
+_translator = None
+
+def get_translator() -> HedgedTranslator:
+    """The translator shared by everything in the process, so health scores build up across vocabulary lists."""
+    global _translator
+    if _translator is None:
+        _translator = create_translator()
+    return _translator
+
 async def translate_to_chinese(translator, text):
-    """Translate English text to Simplified Chinese."""
+    """Translate English text to Traditional Chinese."""
     try:
-        # Translate to 'zh-cn' (Simplified Chinese)
-        result = await translator.translate(text, dest='zh-tw')
-        return result.text
+        return await translator.translate(text)
     except Exception as e:
         print(f"Translation error for '{text}': {e}")
         return "Translation failed"  # Fallback
 
+VOCABULARY_HEADER = ['Vocabulary (Part of Speech)', 'Chinese Meaning']
+
+async def translate_vocabulary_rows(data, chunk_size: int = 40, concurrency: int = 100):
+    """
+    Yield the vocabulary table rows in order, chunk_size rows at a time, as soon as
+    their translations are done.
+
+    Every translation is started up front (at most `concurrency` at once, the size of
+    the translator's HTTP connection pool), so later chunks keep translating while the
+    caller handles the earlier ones. Words with a custom meaning are not translated.
+    """
+    translator = get_translator()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def meaning(vocab, custom_meaning):
+        if custom_meaning:
+            return custom_meaning
+        async with semaphore:
+            return await translate_to_chinese(translator, vocab)
+
+    tasks = [asyncio.ensure_future(meaning(vocab, custom_meaning)) for vocab, _, custom_meaning in data]
+    try:
+        for start in range(0, len(data), chunk_size):
+            meanings = await asyncio.gather(*tasks[start:start + chunk_size])
+            yield [[f"{vocab} ({pos})", chinese] for (vocab, pos, _), chinese in zip(data[start:start + chunk_size], meanings)]
+    finally:
+        for task in tasks:
+            task.cancel()
+
 async def create_vocabulary_table(data):
     """Create a table for the PDF from vocabulary data."""
-    table_data = [['Vocabulary (Part of Speech)', 'Chinese Meaning']]
-    translator = Translator()
-    tasks = [translate_to_chinese(translator, vocab) for vocab, _, _ in data]
-    translations = await asyncio.gather(*tasks)
-    for (vocab, pos, custom_meaning), chinese in zip(data, translations):
-        meaning = custom_meaning if custom_meaning else chinese
-        table_data.append([f"{vocab} ({pos})", meaning])
+    table_data = [VOCABULARY_HEADER]
+    async for rows in translate_vocabulary_rows(data):
+        table_data.extend(rows)
     return table_data
 
+# Telegram's limit on the length of one message
+MAX_MESSAGE_LENGTH = 4096
+
+# Characters Telegram's Markdown would read as formatting, built once and applied in a single pass
+MARKDOWN_ESCAPES = str.maketrans({char: "\\" + char for char in "_*`["})
+# Inside a bold entity nothing nests and a "*" can't be escaped, only ends it
+MARKDOWN_BOLD_ESCAPES = str.maketrans("", "", "*")
+
 def escape_markdown(text: str) -> str:
     """
     Escape special characters for Telegram Markdown.
@@ -189,15 +568,7 @@ def escape_markdown(text: str) -> str:
     """
     if not text:
         return ""
-    
-    # Characters that need to be escaped in Telegram Markdown
-    special_chars = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
-    
-    escaped_text = text
-    for char in special_chars:
-        escaped_text = escaped_text.replace(char, "")
-    
-    return escaped_text
+    return text.translate(MARKDOWN_ESCAPES)
 
 def format_news_article(article: dict) -> str:
     """
@@ -212,75 +583,112 @@ def format_news_article(article: dict) -> str:
     # Extract fields with fallbacks
     title = article.get('title', 'No Title')
     description = article.get('description', "")
-    url = article.get('url', article.get('url', ''))
+    url = article.get('url', '')
     
     # Build the formatted message
     message_parts = []
     
     # Title (bold and larger)
     if title:
-        # Escape special characters for Markdown
-        title_escaped = escape_markdown(title)
-        message_parts.append(f"*{title_escaped}*")
+        message_parts.append(f"*{title.translate(MARKDOWN_BOLD_ESCAPES)}*")
     
-    # Description
+    # Description, truncated before escaping so an escape is never cut in half
     if description:
-        desc_escaped = escape_markdown(description)
-        # Truncate if too long
-        if len(desc_escaped) > 300:
-            desc_escaped = desc_escaped[:297] + "..."
-        message_parts.append(f"\n{desc_escaped}")
+        if len(description) > 300:
+            description = description[:297] + "..."
+        message_parts.append(f"\n{escape_markdown(description)}")
     
-    # Read more link
+    # Read more link, a ")" would end the link early
     if url:
-        message_parts.append(f"\n[Read Full Article: {url}]")
+        message_parts.append(f"\n[Read Full Article]({url.replace(')', '%29')})")
     
     return "\n".join(message_parts)
 
+def pack_messages(parts: list[str], max_length: int = MAX_MESSAGE_LENGTH, separator: str = "\n\n") -> list[str]:
+    """
+    Join parts into as few messages as possible, each at most max_length characters.
 
-def format_multiple_news_articles(articles: list, max_articles: int = 3) -> list[str]:
+    Parts are kept whole and in order, a part that is longer than max_length on its
+    own is cut to fit.
     """
-    Format multiple news articles for Telegram, splitting into multiple messages if needed.
+    messages = []
+    current = ""
+    for part in parts:
+        if len(part) > max_length:
+            part = part[:max_length - 3] + "..."
+        if current and len(current) + len(separator) + len(part) <= max_length:
+            current += separator + part
+            continue
+        if current:
+            messages.append(current)
+        current = part
+    if current:
+        messages.append(current)
+    return messages
+
+def format_multiple_news_articles(articles: list, max_articles: int = 3, max_length: int = MAX_MESSAGE_LENGTH) -> list[str]:
+    """
+    Format multiple news articles for Telegram, packing as many as fit into each message.
     
     Args:
         articles: List of article dictionaries
         max_articles: Maximum number of articles to format
+        max_length: Maximum length of one message
         
     Returns:
-        List of formatted message strings (split to avoid Telegram's message length limit)
+        List of formatted message strings, each within Telegram's message length limit
     """
-    messages = []
-    max_length = 4000  # Telegram's limit is 4096, leave some buffer
-    header = f"📰 *Latest News* ({min(len(articles), max_articles)} articles)\n"
-    messages.append(header)
-    
-    for _, article in enumerate(articles[:max_articles]):
-        formatted_article = format_news_article(article)
-        article_length = len(formatted_article)
-        # Check if adding this article would exceed the limit
-        if article_length < max_length:
-            # Save current message and start a new one
-            messages.append(formatted_article)
-    return messages
+    articles = articles[:max_articles]
+    header = f"📰 *Latest News* ({len(articles)} articles)"
+    return pack_messages([header] + [format_news_article(article) for article in articles], max_length)
 
+def _fetch_news_page(session, NEWS_API_TOKEN, page: int, page_size: int) -> list:
+    res = session.get(
+        "https://api.thenewsapi.com/v1/news/all",
+        params={
+        'api_token': NEWS_API_TOKEN,
+        'categories': 'tech,business,general',
+        'language': "en",
+        'limit': page_size,
+        'page': page,
+        },
+        timeout=(3.05, 10))
 
-def fetch_news(NEWS_API_TOKEN):
+    res.raise_for_status()
+    news_data = res.json()
+    if 'error' in news_data:
+        raise ValueError(f"API error: {news_data['error']}")
+    return news_data.get("data", [])
+
+# Once the news API keeps failing, /news answers at once instead of waiting for its timeout
+NEWS_BREAKER = CircuitBreaker("news")
+
+def fetch_news(NEWS_API_TOKEN, limit: int = 3, page_size: int = 3):
+    """
+    Fetch up to `limit` articles. The API returns at most page_size per request (3 on
+    the free plan), so the pages are requested at the same time over one session.
+    Raises CircuitOpenError without calling the API while it is known to be down.
+    """
+    return NEWS_BREAKER.call(_fetch_news, NEWS_API_TOKEN, limit, page_size)
+
+def _fetch_news(NEWS_API_TOKEN, limit: int, page_size: int):
+    pages = max(1, -(-limit // page_size))
     try:
-        res = requests.get(
-            "https://api.thenewsapi.com/v1/news/all",
-            params={
-            'api_token': NEWS_API_TOKEN,
-            'categories': 'tech,business,general',
-            'language': "en",
-            'limit': 3,
-            },
-            timeout=10)
-    
-        res.raise_for_status()
-        news_data = res.json()
-        if 'error' in news_data:
-            raise ValueError(f"API error: {news_data['error']}")
-        return news_data.get("data", [])
+        with requests.Session() as session:
+            if pages == 1:
+                return _fetch_news_page(session, NEWS_API_TOKEN, 1, page_size)[:limit]
+            with ThreadPoolExecutor(max_workers=pages) as executor:
+                results = list(executor.map(
+                    lambda page: _fetch_news_page(session, NEWS_API_TOKEN, page, page_size), range(1, pages + 1)
+                ))
+        # Pages can overlap when new articles are published in between
+        articles, seen = [], set()
+        for article in (article for result in results for article in result):
+            key = article.get('uuid') or article.get('url')
+            if key not in seen:
+                seen.add(key)
+                articles.append(article)
+        return articles[:limit]
     except requests.exceptions.Timeout:
         print("Request timed out")
         raise TimeoutError("News API request timed out") from None
@@ -0,0 +1,127 @@
+import csv
+from datetime import datetime
+from typing import NamedTuple
+import numpy as np
+from reports import PAYMENT_CODES, STATUS_CODES
+from utils import LESSON_DATE_FORMATS, YEARLESS_LESSON_DATE_FORMATS, find_tuition_files, parse_tuition_filename
+
+TUITION_COLUMNS = ("date", "amount", "payment", "status", "makeup")
+
+class TuitionFileError(NamedTuple):
+    file: str
+    line: int       # 0 for problems with the file as a whole
+    message: str
+
+    def __str__(self):
+        return f"{self.file}:{self.line}: {self.message}" if self.line else f"{self.file}: {self.message}"
+
+def _lesson_month(date: str) -> int:
+    """
+    The month of a lesson date, 0 if it isn't a date in one of LESSON_DATE_FORMATS or
+    YEARLESS_LESSON_DATE_FORMATS.
+    """
+    date = date.strip()
+    for date_format in LESSON_DATE_FORMATS:
+        try:
+            return datetime.strptime(date, date_format).month
+        except ValueError:
+            continue
+    for date_format in YEARLESS_LESSON_DATE_FORMATS:
+        try:
+            # Parsed in a leap year so 29/02 is a date too
+            return datetime.strptime(f"2000 {date}", f"%Y {date_format}").month
+        except ValueError:
+            continue
+    return 0
+
+def validate_tuition_files(paths: list[str]) -> list[TuitionFileError]:
+    """
+    Check every tuition CSV in paths (files or folders) before anything is rendered.
+
+    The files are read once into columns and each check runs over all lessons of all
+    files at the same time: file names, headers, field counts, amounts, payment and
+    status codes, lesson dates and whether each date falls in the file's month.
+    Returns every problem found with its file and line, sorted, empty when all is well.
+    """
+    errors = []
+    columns = {name: [] for name in TUITION_COLUMNS}
+    files, lines, file_months = [], [], []
+
+    for file in find_tuition_files(paths):
+        try:
+            _, _, month = parse_tuition_filename(file)
+        except ValueError as e:
+            errors.append(TuitionFileError(file, 0, str(e)))
+            continue
+        if not 1 <= month <= 12:
+            errors.append(TuitionFileError(file, 0, f"month {month} in the file name is not between 1 and 12"))
+            continue
+        try:
+            with open(file, "r", newline="") as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if header is None:
+                    errors.append(TuitionFileError(file, 0, "file is empty"))
+                    continue
+                missing = [name for name in TUITION_COLUMNS if name not in header]
+                if missing:
+                    errors.append(TuitionFileError(file, 1, f"missing column(s) {', '.join(missing)}, expected {','.join(TUITION_COLUMNS)}"))
+                    continue
+                positions = [header.index(name) for name in TUITION_COLUMNS]
+                for row in reader:
+                    if not row:
+                        continue    # csv.DictReader skips blank lines too
+                    if len(row) > len(header):
+                        errors.append(TuitionFileError(file, reader.line_num, f"{len(row)} fields but the header has {len(header)}"))
+                    for name, position in zip(TUITION_COLUMNS, positions):
+                        columns[name].append(row[position] if position < len(row) else None)
+                    files.append(file)
+                    lines.append(reader.line_num)
+                    file_months.append(month)
+        except (OSError, UnicodeDecodeError, csv.Error) as e:
+            errors.append(TuitionFileError(file, 0, f"could not be read: {e}"))
+
+    if lines:
+        # None marks a field missing from a short row, as csv.DictReader gives it
+        present = {name: np.array([value is not None for value in values]) for name, values in columns.items()}
+        values = {name: np.array(["" if value is None else value for value in values], dtype=str) for name, values in columns.items()}
+        file_months = np.array(file_months)
+
+        # Any makeup field, even an empty one, makes a lesson a make-up lesson that isn't charged
+        is_makeup = present["makeup"]
+        amounts = np.char.strip(values["amount"])
+        bad_amount = ~np.char.isdigit(amounts) & ~(is_makeup & (amounts == ""))
+        bad_payment = ~np.isin(values["payment"], PAYMENT_CODES)
+        bad_status = ~np.isin(values["status"], STATUS_CODES)
+        empty_makeup = is_makeup & (np.char.strip(values["makeup"]) == "")
+
+        # Dates repeat a lot, each distinct one is parsed once
+        dates, date_index = np.unique(values["date"], return_inverse=True)
+        lesson_months = np.array([_lesson_month(date) for date in dates], dtype=int)[date_index]
+        bad_date = lesson_months == 0
+        wrong_month = ~bad_date & (lesson_months != file_months)
+
+        def problem(name, i, expected):
+            return f"{name} '{values[name][i]}' {expected}" if present[name][i] else f"{name} is missing"
+
+        checks = [
+            (bad_amount, lambda i: problem("amount", i, "is not a whole number of HKD")),
+            (bad_payment, lambda i: problem("payment", i, f"is not one of {', '.join(PAYMENT_CODES)}")),
+            (bad_status, lambda i: problem("status", i, f"is not one of {', '.join(STATUS_CODES)}")),
+            (bad_date, lambda i: problem("date", i, "is not a date like 2025-11-06 or 06/11")),
+            (wrong_month, lambda i: f"date {values['date'][i]} is not in month {file_months[i]} of the file name"),
+            (empty_makeup, lambda i: "makeup is empty, which makes this an uncharged make-up lesson; leave the field out for a regular lesson"),
+        ]
+        for mask, message in checks:
+            errors.extend(TuitionFileError(files[i], lines[i], message(i)) for i in np.flatnonzero(mask))
+
+    return sorted(errors, key=lambda error: (error.file, error.line))
+
+def format_validation_report(errors: list[TuitionFileError], limit: int = None) -> str:
+    """One line per problem, after a count, the first `limit` problems only if given."""
+    file_count = len({error.file for error in errors})
+    lines = [f"{len(errors)} problem(s) in {file_count} file(s):"]
+    lines.extend(str(error) for error in errors[:limit])
+    if limit is not None and len(errors) > limit:
+        lines.append(f"... and {len(errors) - limit} more")
+    return "\n".join(lines)
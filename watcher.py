@@ -0,0 +1,207 @@
+import asyncio, ctypes, ctypes.util, logging, os, select, struct, time
+from datetime import datetime
+from pdf_utils import render_tuition_debit_note
+from validation import validate_tuition_files
+from utils import TuitionParseCache, find_tuition_files, group_tuition_files, parse_tuition_filename
+
+logger = logging.getLogger(__name__)
+
+# inotify event masks, from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_Q_OVERFLOW = 0x4000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")   # wd, mask, cookie, len
+
+def _is_csv(path: str) -> bool:
+    return path.lower().endswith(".csv")
+
+class InotifyWatcher:
+    """Reports changed CSV files under a folder and its subfolders, using Linux inotify through ctypes."""
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directory = directory
+        self._dirs = {}   # watch descriptor -> directory
+        for root, _, _ in os.walk(directory):
+            self._watch(root)
+
+    def _watch(self, directory: str):
+        wd = self._add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self._dirs[wd] = directory
+
+    def changes(self, timeout: float = None) -> set[str]:
+        """Wait up to timeout seconds for changes. Returns the CSV files created, written, moved or deleted."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_length].rstrip(b"\0"))
+            offset += name_length
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped, treat every file as changed
+                changed.update(find_tuition_files([self.directory]))
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_DELETE_SELF:
+                del self._dirs[wd]
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._watch(path)
+                    changed.update(find_tuition_files([path]))
+            elif _is_csv(name):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """Reports changed CSV files by comparing the folder's file modification times every interval seconds."""
+    def __init__(self, directory: str, interval: float = 1.0):
+        self.directory = directory
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict:
+        snapshot = {}
+        for file in find_tuition_files([self.directory]):
+            try:
+                stat = os.stat(file)
+            except FileNotFoundError:
+                continue
+            snapshot[file] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def changes(self, timeout: float = None) -> set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._scan()
+            changed = {file for file in snapshot.keys() | self._snapshot.keys()
+                       if snapshot.get(file) != self._snapshot.get(file)}
+            self._snapshot = snapshot
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval if deadline is None else min(self.interval, max(0, deadline - time.monotonic())))
+
+    def close(self):
+        pass
+
+def create_watcher(directory: str, polling_interval: float = 1.0):
+    """An InotifyWatcher where inotify is available, a PollingWatcher anywhere else."""
+    try:
+        return InotifyWatcher(directory)
+    except (OSError, AttributeError) as e:
+        logger.info("inotify not available (%s), polling %s every %ss", e, directory, polling_interval)
+        return PollingWatcher(directory, polling_interval)
+
+def debounced_changes(watcher, debounce: float = 0.5):
+    """
+    Yield sets of changed files, each set once the folder has been quiet for debounce
+    seconds, so an editor saving several times in a row causes a single rebuild.
+    """
+    while True:
+        changed = watcher.changes()
+        while True:
+            more = watcher.changes(debounce)
+            if not more:
+                break
+            changed |= more
+        yield changed
+
+def watch_tuition_data(directory: str = "tuition_data", output_dir: str = "tuition_notes", debounce: float = 0.5):
+    """
+    Re-render a student's debit note into output_dir every time one of their tuition CSVs changes.
+
+    Only the changed students' files are parsed again, everything else comes from a
+    TuitionParseCache, and rendering goes through render_tuition_debit_note with fonts
+    registered once for the whole session. Runs until interrupted.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cache = TuitionParseCache()
+    watcher = create_watcher(directory)
+    logger.info("Watching %s with %s, debit notes go to %s", directory, type(watcher).__name__, output_dir)
+    try:
+        for changed in debounced_changes(watcher, debounce):
+            rebuild_students(changed, directory, output_dir, cache)
+    finally:
+        watcher.close()
+
+def rebuild_students(changed: set[str], directory: str, output_dir: str, cache: TuitionParseCache) -> list[str]:
+    """Render the debit note of every student with a changed file. Returns the paths written."""
+    students = set()
+    for file in changed:
+        cache.discard(file)
+        try:
+            course_code, student_name, _ = parse_tuition_filename(file)
+        except ValueError as e:
+            logger.warning("Skipping %s: %s", file, e)
+            continue
+        students.add((student_name, course_code))
+
+    groups = group_tuition_files([file for file in find_tuition_files([directory]) if _is_valid_name(file)])
+    written = []
+    for key in sorted(students):
+        files = groups.get(key)
+        if not files:
+            logger.info("%s (%s) has no tuition files left, nothing to render", *key)
+            continue
+        errors = validate_tuition_files(files)
+        if errors:
+            logger.error("Not rebuilding %s (%s):\n%s", *key, "\n".join(str(error) for error in errors))
+            continue
+        started = time.perf_counter()
+        try:
+            lesson_data, course_desc, student_name, months, month_name = cache.aggregate(files)
+            parsed = time.perf_counter()
+            file_name = f"TuitionFeeDebitNote_{student_name}_{month_name}_{datetime.now().year}.pdf"
+            asyncio.run(render_tuition_debit_note(
+                student_name=student_name,
+                months=months,
+                lesson_data=lesson_data,
+                course_name=course_desc,
+                filename=file_name,
+                output_path=output_dir,
+            ))
+        except Exception as e:
+            # Usually a file caught halfway through being written, the next save rebuilds it
+            logger.error("Could not rebuild %s (%s): %s", *key, e)
+            continue
+        finished = time.perf_counter()
+        written.append(os.path.join(output_dir, file_name))
+        logger.info(
+            "Rebuilt %s in %.0f ms (parse %.0f ms, render %.0f ms)",
+            file_name, (finished - started) * 1000, (parsed - started) * 1000, (finished - parsed) * 1000
+        )
+    return written
+
+def _is_valid_name(file: str) -> bool:
+    try:
+        parse_tuition_filename(file)
+        return True
+    except ValueError:
+        return False
@@ -0,0 +1,82 @@
+import asyncio, hmac, logging, secrets, signal
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+def create_webhook_app(app: Application, path: str, secret_token: str) -> web.Application:
+    """
+    An aiohttp app that feeds the updates Telegram posts to `path` into app.update_queue.
+
+    Requests without the secret token are refused with 403, as is every request when no
+    secret token is set, since anyone could post forged updates otherwise. When the update
+    queue is full the update is refused with 503, Telegram then retries it later instead
+    of this process buffering without limit.
+    """
+    async def receive_update(request: web.Request) -> web.Response:
+        if not secret_token or not hmac.compare_digest(request.headers.get(SECRET_TOKEN_HEADER, ""), secret_token):
+            logger.warning("Refused webhook request from %s: bad secret token", request.remote)
+            return web.Response(status=403)
+        try:
+            update = Update.de_json(await request.json(), app.bot)
+        except Exception as e:
+            logger.warning("Refused webhook request from %s: %s", request.remote, e)
+            return web.Response(status=400)
+        try:
+            app.update_queue.put_nowait(update)
+        except asyncio.QueueFull:
+            logger.warning("Update queue full, asking Telegram to retry update %s", update.update_id)
+            return web.Response(status=503, headers={"Retry-After": "1"})
+        return web.Response()
+
+    async def health(_: web.Request) -> web.Response:
+        return web.json_response({"running": app.running, "queued_updates": app.update_queue.qsize()})
+
+    web_app = web.Application()
+    web_app.router.add_post(path, receive_update)
+    web_app.router.add_get("/health", health)
+    return web_app
+
+async def run_webhook(app: Application, host: str, port: int, path: str, webhook_url: str = None,
+                      secret_token: str = None, stop_event: asyncio.Event = None, shutdown_timeout: float = 30):
+    """
+    Serve the bot from a webhook until SIGINT/SIGTERM (or stop_event) is received.
+
+    Shutdown is graceful: the server stops accepting updates and finishes the requests
+    it is answering, then the application handles every update already queued or running
+    before it stops. The webhook is registered with Telegram when webhook_url is given and
+    left in place on shutdown, so Telegram keeps the updates for the next start.
+
+    Without a secret_token a random one is made and registered with the webhook; when the
+    webhook is registered elsewhere (no webhook_url) the secret is required.
+    """
+    if not secret_token:
+        if not webhook_url:
+            raise ValueError("A secret token is required when the webhook is registered elsewhere")
+        secret_token = secrets.token_urlsafe(32)
+        logger.info("No webhook secret token set, registering a random one")
+    stop_event = stop_event or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # not available on Windows or outside the main thread
+
+    runner = web.AppRunner(create_webhook_app(app, path, secret_token), shutdown_timeout=shutdown_timeout)
+    async with app:
+        await app.start()
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, host, port).start()
+            if webhook_url:
+                await app.bot.set_webhook(webhook_url, secret_token=secret_token, allowed_updates=Update.ALL_TYPES)
+            logger.info("Webhook server listening on %s:%s%s", host, port, path)
+            await stop_event.wait()
+            logger.info("Stopping webhook server")
+        finally:
+            await runner.cleanup()
+            await app.stop()